@@ -1,7 +1,11 @@
 import os
 import shutil
+import subprocess
+import sys
 from pathlib import Path
 from src.version import __version__
+from src.utils.template_pack import TEMPLATE_PACK_PATH, write_pack
+from src.d2r_image.item_store import ITEM_STORE_PATH
 import argparse
 import getpass
 import random
@@ -90,6 +94,8 @@ if __name__ == "__main__":
     os.makedirs(f"{botty_dir}/config/bnip", exist_ok=True)
     shutil.copy("README.md", f"{botty_dir}/")
     shutil.copytree("assets", f"{botty_dir}/assets")
+    print(f"Packed {write_pack(f'{botty_dir}/{TEMPLATE_PACK_PATH}', root=botty_dir)} templates")
+    subprocess.run([sys.executable, "-m", "d2r_image.item_store", os.path.abspath(f"{botty_dir}/{ITEM_STORE_PATH}")], cwd="src", check=True)
     clean_up()
 
     if args.random_name:
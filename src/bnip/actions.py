@@ -191,6 +191,34 @@ def should_id(item_data) -> bool:
                     return False
     return True
 
+def needs_stats(item_data) -> bool:
+    """Checks if keeping or identifying the item can depend on the stat lines of its tooltip.
+
+        Args:
+            item_data (dict): The item data without stats, e.g. parsed from the name and base lines only.
+
+        Returns: (bool):
+            True if an expression whose property section can match the item has a stat section, or if the
+            property section depends on the ethereal flag (which is part of the stat lines).
+    """
+    ethereal = NTIPAliasFlag["ethereal"]
+    for expression in bnip_expressions:
+        if not expression or not expression.should_id_transpiled:
+            continue
+        has_stats = "#" in expression.raw
+        if not has_stats and "[flag]" not in expression.raw.lower():
+            continue
+        results = set()
+        for is_ethereal in (False, True):
+            variant = {**item_data, "NTIPAliasFlag": {**item_data["NTIPAliasFlag"], ethereal: is_ethereal}}
+            try:
+                results.add(bool(eval(expression.should_id_transpiled, globals(), {"item_data": variant})))
+            except Exception:
+                return True
+        if True in results and (has_stats or len(results) > 1):
+            return True
+    return False
+
 def _load_bnip_expressions(filepath):
     """
         Loads the BNIP expressions from the file.
@@ -10,7 +10,7 @@ from char.capabilities import CharacterCapabilities
 from ui_manager import is_visible, wait_until_visible
 from ui import skills
 from utils.custom_mouse import mouse
-from utils.misc import wait, cut_roi, is_in_roi, color_filter, arc_spread
+from utils.misc import wait, cut_roi, is_in_roi, color_mask, arc_spread
 from logger import Logger
 from config import Config
 from screen import grab, convert_monitor_to_screen, convert_screen_to_abs, convert_abs_to_monitor, convert_screen_to_monitor
@@ -134,7 +134,7 @@ class IChar:
         if img is None:
             img = grab()
         skill_img = cut_roi(img, Config().ui_roi["skill_right"])
-        charge_mask, _ = color_filter(skill_img, Config().colors["blue"])
+        charge_mask = color_mask(skill_img, Config().colors["blue"])
         if np.sum(charge_mask) > 0:
             return True
         return False
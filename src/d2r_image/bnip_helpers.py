@@ -1,6 +1,6 @@
 from d2r_image.d2data_lookup import find_base_item_from_magic_item_text, find_pattern_match, find_set_item_by_name, find_unique_item_by_name, get_base, get_rune, is_base, is_rune, is_consumable, get_consumable, get_by_name
 from d2r_image.data_models import HoveredItem, ItemQuality
-from d2r_image.bnip_data import BNIP_ALIAS_STAT_PATTERNS, NTIP_ALIAS_QUALITY_MAP, PROPS_TO_SKILLID, BNIP_ALIAS_STAT_PATTERNS_NO_INTS, BNIP_ITEM_TYPE_DATA
+from d2r_image.item_store import load_item_store
 from d2r_image.processing_data import Runeword
 from rapidfuzz.string_metric import levenshtein
 from bnip.NTIPAliasType import NTIPAliasType as NTIP_TYPES
@@ -10,6 +10,13 @@ from logger import Logger
 from parse import compile
 from functools import cache
 
+_store = load_item_store()
+BNIP_ALIAS_STAT_PATTERNS = _store.table("bnip_alias_stat_patterns")
+BNIP_ALIAS_STAT_PATTERNS_NO_INTS = _store.table("bnip_alias_stat_patterns_no_ints")
+BNIP_ITEM_TYPE_DATA = _store.table("bnip_item_types")
+NTIP_ALIAS_QUALITY_MAP = _store.value("ntip_alias_quality_map")
+PROPS_TO_SKILLID = _store.value("props_to_skillid")
+
 @cache
 def compiled_bnip_patterns():
     bnip_patterns = {}
@@ -31,8 +38,12 @@ def basename_to_types(basename: str) -> list[int]:
     return types
 
 
-def parse_item(quality, item, _call_count=1):
-    item_is_identified = True
+def parse_item(quality, item, _call_count=1, identified: bool = None):
+    """
+    :param identified: Whether the item is identified, if the text does not contain all lines of the tooltip.
+        None to look for the unidentified line in the text.
+    """
+    item_is_identified = True if identified is None else identified
     item_is_ethereal = False
     item_modifiers = {}
     lines = item.splitlines()
@@ -44,7 +55,7 @@ def parse_item(quality, item, _call_count=1):
             cleaned_lines.append(line)
     lines = cleaned_lines
     for line in lines:
-        if levenshtein(line, 'UNIDENTIFIED') < 3:
+        if identified is None and levenshtein(line, 'UNIDENTIFIED') < 3:
             item_is_identified = False
         if 'ETHEREAL' in line:
             item_is_ethereal = True
@@ -1,19 +1,24 @@
 import os
 import sys
+from dataclasses import dataclass, replace
+from functools import cache, lru_cache
 from parse import compile as compile_pattern
+from rapidfuzz.process import extractOne
+from rapidfuzz.utils import default_process
 from d2r_image.data_models import ItemQuality
-from d2r_image.d2data_data import ITEM_ARMOR, ITEM_MISC, ITEM_SET_ITEMS, ITEM_TYPES, ITEM_UNIQUE_ITEMS, ITEM_WEAPONS, REF_PATTERNS
+from d2r_image.processing_data import Runeword
+from d2r_image.item_store import StoreMapping, load_item_store
 from d2r_image.strings_store import base_items
-from utils.misc import find_best_match
+from utils.misc import BestMatchResult, find_best_match, levenshtein
 from logger import Logger
 
 item_lookup: dict = {
-    "armor": ITEM_ARMOR,
-    "weapons": ITEM_WEAPONS,
-    "set_items": ITEM_SET_ITEMS,
-    "unique_items": ITEM_UNIQUE_ITEMS,
-    "misc": ITEM_MISC,
-    "types": ITEM_TYPES,
+    "armor": None,
+    "weapons": None,
+    "set_items": None,
+    "unique_items": None,
+    "misc": None,
+    "types": None,
 }
 item_lookup_by_display_name: dict = {
     "armor": None,
@@ -24,10 +29,30 @@ item_lookup_by_display_name: dict = {
     "types": None,
 }
 item_lookup_by_quality_and_display_name: dict = {}
-bases_by_name: dict = {}
-consumables_by_name: dict = {}
-gems_by_name: dict = {}
-runes_by_name: dict ={}
+bases_by_name: StoreMapping = {}
+consumables_by_name: StoreMapping = {}
+gems_by_name: StoreMapping = {}
+runes_by_name: StoreMapping = {}
+# filled by classify(), only names of known items
+label_classes_by_name: dict = {}
+REF_PATTERNS: dict = {}
+runeword_names = frozenset(runeword.value for runeword in Runeword)
+
+
+@dataclass(frozen=True)
+class LabelClass:
+    """
+    Everything a label text names, see classify()
+    """
+    base: dict | None = None
+    consumable: dict | None = None
+    gem: dict | None = None
+    rune: dict | None = None
+    unique: dict | None = None
+    set_item: dict | None = None
+    runeword: bool = False
+
+_UNKNOWN_LABEL = LabelClass()
 
 if getattr(sys, 'frozen', False):
     application_path = os.path.dirname(sys.executable)
@@ -41,68 +66,52 @@ def magic_name(name: str):
     return find_best_match(name, magic_names).match
 
 def load_lookup():
-    for key, val in item_lookup.items():
-        # file_path = os.path.join(d2data_path, f'item_{key}.json')
-        # with open(file_path, "r",encoding = 'utf-8') as f:
-        #     data = json.load(f)
-        #     print(f"Loaded {len(data)} records from item_{key}.json")
-        #     item_lookup[key] = data
-        item_lookup_by_display_name[key] = {value:val[value] for value in val.keys()}
-    for quality_key in ['set_items', 'unique_items']:
-        item_quality = ItemQuality.Set if quality_key == 'set_items' else ItemQuality.Unique
-        if item_quality.value not in item_lookup_by_quality_and_display_name:
-            item_lookup_by_quality_and_display_name[item_quality.value] = {}
-        for quality_item in item_lookup_by_display_name[quality_key]:
-            item_lookup_by_quality_and_display_name[item_quality.value][quality_item.upper()] = item_lookup_by_display_name[quality_key][quality_item]
-    for quality_key in ['armor', 'weapons']:
-        for quality_item in item_lookup_by_display_name[quality_key]:
-            bases_by_name[quality_item.upper().replace(' ', '')] = item_lookup_by_display_name[quality_key][quality_item]
-    for extra_base in [
-        'amulet',
-        'ring',
-        'grandcharm',
-        'largecharm',
-        'smallcharm',
-        'jewel',
-        'tomeofidentify',
-        'tomeoftownportal',
-        'keyofterror',
-        'keyofhate',
-        'keyofdestruction',
-        'twistedessenceofsuffering',
-        'burningessenceofterror',
-        'chargedessenceofhatred',
-        'festeringessenceofdestruction'
-        ]:
-        bases_by_name[extra_base.upper()] = item_lookup_by_display_name['misc'][extra_base]
-    for consumable in [
-        'key',
-        'scrollofidentify', 'scrolloftownportal',
-        'arrows', 'bolts',
-        'antidotepotion', 'thawingpotion', 'staminapotion',
-        #'Fulminatingpotion', 'Explodingpotion', 'Oilpotion', 'stranglinggaspotion', 'Chokinggaspotion', 'rancidgaspotion',
-        'minorhealingpotion', 'lighthealingpotion', 'healingpotion', 'greaterhealingpotion', 'superhealingpotion',
-        'minormanapotion', 'lightmanapotion', 'manapotion', 'greatermanapotion', 'supermanapotion',
-        'rejuvenationpotion', 'fullrejuvenationpotion',
-        'gold'
-        ]:
-        consumables_by_name[consumable.upper().replace(' ', '')] = item_lookup_by_display_name['misc'][consumable]
-    for gem in [
-        'chippedruby', 'flawedruby', 'ruby', 'flawlessruby', 'perfectruby',
-        'chippedsapphire', 'flawedsapphire', 'sapphire', 'flawlesssapphire', 'perfectsapphire',
-        'chippedtopaz', 'flawedtopaz', 'topaz', 'flawlesstopaz', 'perfecttopaz',
-        'chippedemerald', 'flawedemerald', 'emerald', 'flawlessemerald', 'perfectemerald',
-        'chippeddiamond', 'flaweddiamond', 'diamond', 'flawlessdiamond', 'perfectdiamond',
-        'chippedamethyst', 'flawedamethyst', 'amethyst', 'flawlessamethyst', 'perfectamethyst',
-        'chippedskull', 'flawedskull', 'skull', 'flawlessskull', 'perfectskull'
-    ]:
-        gems_by_name[gem.upper().replace(' ', '')] = item_lookup_by_display_name['misc'][gem]
-    for misc_item in item_lookup_by_display_name['misc']:
-        if 'rune' in misc_item:
-            runes_by_name[misc_item.upper().replace(' ', '')] = item_lookup_by_display_name['misc'][misc_item]
-    pass
+    global bases_by_name, consumables_by_name, gems_by_name, runes_by_name
+    # tables and name indexes are precomputed in the item store (see item_store.py), records are loaded on first use
+    store = load_item_store()
+    for key in item_lookup:
+        item_lookup[key] = item_lookup_by_display_name[key] = store.table(key)
+    item_lookup_by_quality_and_display_name[ItemQuality.Set.value] = store.index("set_items_by_name")
+    item_lookup_by_quality_and_display_name[ItemQuality.Unique.value] = store.index("unique_items_by_name")
+    bases_by_name = store.index("bases_by_name")
+    consumables_by_name = store.index("consumables_by_name")
+    gems_by_name = store.index("gems_by_name")
+    runes_by_name = store.index("runes_by_name")
+    load_label_classes()
+
+def load_label_classes():
+    label_classes_by_name.clear()
+    classify.cache_clear()
+
+def _label_class(name: str) -> LabelClass:
+    if (label_class := label_classes_by_name.get(name)) is None:
+        uniques = item_lookup_by_quality_and_display_name[ItemQuality.Unique.value]
+        sets = item_lookup_by_quality_and_display_name[ItemQuality.Set.value]
+        if not any(name in lookup for lookup in (bases_by_name, consumables_by_name, gems_by_name, runes_by_name, uniques, sets)):
+            return _UNKNOWN_LABEL
+        label_class = label_classes_by_name[name] = LabelClass(
+            base=bases_by_name.get(name),
+            consumable=consumables_by_name.get(name),
+            gem=gems_by_name.get(name),
+            rune=runes_by_name.get(name),
+            unique=uniques.get(name),
+            set_item=sets.get(name),
+        )
+    return label_class
+
+@lru_cache(maxsize=4096)
+def classify(text: str) -> LabelClass:
+    """
+    Looks up everything a label text can name at once, the result is remembered per text
+    :param text: Label text as read, it is normalized with normalize_name(). Runewords only match their exact name.
+    """
+    label_class = _label_class(normalize_name(text))
+    if text in runeword_names:
+        label_class = replace(label_class, runeword=True)
+    return label_class
 
 def load_parsers():
+    REF_PATTERNS.update(load_item_store().value("ref_patterns"))
     for key, value in REF_PATTERNS.items():
         REF_PATTERNS[key] = {
             "compiled_pattern": compile_pattern(key),
@@ -118,27 +127,40 @@ def find_set_or_unique_item_by_name(name, quality: ItemQuality, fuzzy = False):
 
 def find_unique_item_by_name(name, fuzzy=False):
     quality = ItemQuality.Unique.value
-    normalized_name = normalize_name(name)
     if not fuzzy:
-        if normalized_name in item_lookup_by_quality_and_display_name[quality]:
-            return item_lookup_by_quality_and_display_name[quality][normalized_name]
+        return classify(name).unique
     else:
+        normalized_name = normalize_name(name)
         best_match = find_best_match(normalized_name, item_lookup_by_quality_and_display_name[quality].keys()).match
         return item_lookup_by_quality_and_display_name[quality][best_match]
 
 def find_set_item_by_name(name, fuzzy=False):
     quality = ItemQuality.Set.value
-    normalized_name = normalize_name(name)
     if not fuzzy:
-        if normalized_name in item_lookup_by_quality_and_display_name[quality]:
-            return item_lookup_by_quality_and_display_name[quality][normalized_name]
+        return classify(name).set_item
     else:
+        normalized_name = normalize_name(name)
         best_match = find_best_match(normalized_name, item_lookup_by_quality_and_display_name[quality].keys()).match
         return item_lookup_by_quality_and_display_name[quality][best_match]
 
+@cache
+def _base_item_choices() -> tuple[list[str], list[str]]:
+    """
+    :return: base_items() in iteration order and processed like find_best_match() processes them
+    """
+    names = list(base_items())
+    return names, [default_process(name) for name in names]
+
+@lru_cache(maxsize=4096)
 def fuzzy_base_item_match(item_name: str, normalized_threshold: float = 0.7):
+    """
+    The fuzzy fallback for label texts that are not a base item, the result is remembered per text
+    """
     if not item_name in base_items():
-        fuzzy_res = find_best_match(item_name, list(base_items()))
+        # same as find_best_match(item_name, list(base_items())) without processing every base name again
+        names, choices = _base_item_choices()
+        _, distance, match_idx = extractOne(default_process(item_name), choices, scorer=levenshtein, processor=None)
+        fuzzy_res = BestMatchResult(names[match_idx], distance, 1 - distance / max(1, len(item_name)))
         if fuzzy_res.match != item_name:
             if fuzzy_res.score_normalized > normalized_threshold and fuzzy_res.match in base_items():
                 Logger.debug(f"fuzzy_base_item_match: change {item_name} -> {fuzzy_res.match} (similarity: {fuzzy_res.score_normalized*100:.1f}%)")
@@ -184,43 +206,32 @@ def find_base_item_from_magic_item_text(magic_item_text, item_is_identified):
 
 
 def magic_item_is_identified(magic_item_name):
-    magic_item_name = magic_item_name.upper().replace("-", "").replace("'", "").replace(" ", "")
-    for base_by_name in bases_by_name:
-        if magic_item_name.upper() == base_by_name:
-            return False
-    return True
+    # an unidentified magic item only shows its base name
+    return classify(magic_item_name).base is None
 
 def is_base(name: str) -> bool:
-    return normalize_name(name) in bases_by_name
+    return classify(name).base is not None
 
 def get_base(name):
-    if normalize_name(name) in bases_by_name:
-        return bases_by_name[normalize_name(name)]
-    return None
+    return classify(name).base
 
 def is_consumable(name: str):
-    return normalize_name(name) in consumables_by_name
+    return classify(name).consumable is not None
 
 def get_consumable(name: str):
-    if normalize_name(name) in consumables_by_name:
-        return consumables_by_name[normalize_name(name)]
-    return None
+    return classify(name).consumable
 
 def is_gem(name: str):
-    return normalize_name(name) in gems_by_name
+    return classify(name).gem is not None
 
 def get_gem(name: str):
-    if normalize_name(name) in gems_by_name:
-        return gems_by_name[normalize_name(name)]
-    return None
+    return classify(name).gem
 
 def is_rune(name: str):
-    return normalize_name(name) in runes_by_name
+    return classify(name).rune is not None
 
 def get_rune(name: str):
-    if normalize_name(name) in runes_by_name:
-        return runes_by_name[normalize_name(name)]
-    return None
+    return classify(name).rune
 
 def get_by_name(name: str, _call_count=1):
     """
@@ -49,6 +49,10 @@ class ItemText:
     img: np.ndarray = None
     clean_img: np.ndarray = None
     ocr_result: OcrResult = None
+    # images of tooltip lines that were not read yet, see crop_item_tooltip()
+    pending_lines: list[np.ndarray] = None
+    # False if the tooltip shows the unidentified label, None if it was not checked
+    identified: bool = None
 
     def __getitem__(self, key):
         return super().__getattribute__(key)
@@ -0,0 +1,105 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+import numpy as np
+from d2r_image.data_models import GroundItemList, ItemText
+from d2r_image.processing import build_ground_loot
+from d2r_image.processing_helpers import find_text_clusters, read_text_clusters
+from logger import Logger
+
+
+@dataclass
+class GroundLootStats:
+    # labels with the same pixels as a label of the previous read, its OCR result was used
+    reused: int = 0
+    # new or changed labels, read by OCR
+    read: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        labels = self.reused + self.read
+        return self.reused / labels if labels else 0.0
+
+
+class GroundLootTracker:
+    """
+    Remembers the ground item labels of the last read. Repeated reads (e.g. between the pickups of pickit) still segment
+    the whole frame, but labels whose pixels did not change are not read again, only new or changed ones go to OCR.
+    Labels move when the character moves, the shift of the camera is measured from the labels that stayed the same.
+    """
+    def __init__(self, max_age: float = 10.0, max_shifts: int = 3):
+        """
+        :param max_age: Seconds after which the labels of the last read are not used anymore
+        :param max_shifts: Number of measured camera shifts that are tried in addition to (0, 0) and the given shift
+        """
+        self._max_age = max_age
+        self._max_shifts = max_shifts
+        # (color, x, y, w, h): label
+        self._labels: dict[tuple, ItemText] = {}
+        self._time = 0
+        self.stats = GroundLootStats()
+
+    @staticmethod
+    def _key(label: ItemText, dx: int = 0, dy: int = 0) -> tuple:
+        x, y, w, h = label.roi
+        return label.color, x - dx, y - dy, w, h
+
+    def _shifts(self, labels: list[ItemText], shift: tuple[int, int] | None) -> list[tuple[int, int]]:
+        shifts = [(0, 0)]
+        if shift:
+            shifts.append((round(shift[0]), round(shift[1])))
+        # every pair of labels of the same color and size votes for the shift between their positions
+        previous_by_size = {}
+        for color, x, y, w, h in self._labels:
+            previous_by_size.setdefault((color, w, h), []).append((x, y))
+        votes = Counter()
+        for label in labels:
+            x, y, w, h = label.roi
+            for prev_x, prev_y in previous_by_size.get((label.color, w, h), ()):
+                votes[(x - prev_x, y - prev_y)] += 1
+        for measured, _ in votes.most_common(self._max_shifts):
+            if measured not in shifts:
+                shifts.append(measured)
+        return shifts
+
+    def _find_previous(self, label: ItemText, shifts: list[tuple[int, int]]) -> ItemText | None:
+        for dx, dy in shifts:
+            previous = self._labels.get(self._key(label, dx, dy))
+            # identical pixels give an identical OCR result
+            if previous is not None and np.array_equal(previous.clean_img, label.clean_img):
+                return previous
+        return None
+
+    def get_ground_loot(self, image: np.ndarray, consolidate: bool = False, shift: tuple[int, int] = None) -> GroundItemList | None:
+        """
+        Same as processing.get_ground_loot(), but only reads the labels that changed since the last call
+        :param shift: Expected movement of the labels on screen since the last call (e.g. after a teleport), tried in
+            addition to the shifts measured from the labels
+        """
+        if time.perf_counter() - self._time > self._max_age:
+            self._labels = {}
+        labels = find_text_clusters(image)
+        shifts = self._shifts(labels, shift) if self._labels else []
+        pending = []
+        for label in labels:
+            if (previous := self._find_previous(label, shifts)) is not None:
+                label.ocr_result = previous.ocr_result
+            else:
+                pending.append(label)
+        if pending:
+            read_text_clusters(pending)
+        self.stats.reused += len(labels) - len(pending)
+        self.stats.read += len(pending)
+        self._labels = {self._key(label): label for label in labels}
+        self._time = time.perf_counter()
+        return build_ground_loot(labels, consolidate)
+
+    def reset(self):
+        """
+        Forgets the labels of the last read
+        """
+        self._labels = {}
+
+    def log_stats(self):
+        s = self.stats
+        Logger.debug(f"Ground loot tracker: {s.reused} labels reused, {s.read} read ({100 * s.reuse_rate:.1f}% reused)")
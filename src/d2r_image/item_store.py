@@ -0,0 +1,314 @@
+"""
+Item data store: the item data of d2data_data.py and bnip_data.py with the name indexes of d2data_lookup precomputed,
+in one binary file. The store is memory-mapped at runtime, tables and indexes are loaded on their first use and each
+record is only unpickled on its first lookup, so importing d2r_image does not have to build all item data.
+
+The store is rebuilt from the data modules when it is missing or older than them. build.py writes it for releases:
+    cd src && python -m d2r_image.item_store [output path]
+"""
+import io
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+from collections.abc import Mapping
+from functools import cache
+from typing import Callable
+
+ITEM_STORE_PATH = "assets/d2data.store"
+
+STORE_MAGIC = b"BOTTYD2D"
+STORE_VERSION = 1
+# magic, version, directory offset, directory size
+_HEADER = struct.Struct("<8sIQQ")
+# start and end of each record of a table
+_SPAN = struct.Struct("<QQ")
+# the store depends on the data and on how lookup_indexes() indexes it
+_SOURCE_FILES = ["d2data_data.py", "bnip_data.py", "item_store.py"]
+_MISSING = object()
+
+
+def item_data() -> tuple[dict[str, dict], dict[str, object]]:
+    """
+    :return: Tables (dicts of records) and plain values of the store, from the data modules
+    """
+    from d2r_image import bnip_data, d2data_data
+    tables = {
+        "armor": d2data_data.ITEM_ARMOR,
+        "weapons": d2data_data.ITEM_WEAPONS,
+        "set_items": d2data_data.ITEM_SET_ITEMS,
+        "unique_items": d2data_data.ITEM_UNIQUE_ITEMS,
+        "misc": d2data_data.ITEM_MISC,
+        "types": d2data_data.ITEM_TYPES,
+        "bnip_alias_stat_patterns": bnip_data.BNIP_ALIAS_STAT_PATTERNS,
+        "bnip_alias_stat_patterns_no_ints": bnip_data.BNIP_ALIAS_STAT_PATTERNS_NO_INTS,
+        "bnip_item_types": bnip_data.BNIP_ITEM_TYPE_DATA,
+    }
+    values = {
+        "ref_patterns": d2data_data.REF_PATTERNS,
+        "ntip_alias_quality_map": bnip_data.NTIP_ALIAS_QUALITY_MAP,
+        "props_to_skillid": bnip_data.PROPS_TO_SKILLID,
+    }
+    return tables, values
+
+
+def lookup_indexes(tables: dict[str, dict]) -> dict[str, dict[str, tuple[str, str]]]:
+    """
+    Name indexes of d2data_lookup
+    :return: {index name: {name: (table, key of the record)}}
+    """
+    indexes = {name: {} for name in ["set_items_by_name", "unique_items_by_name", "bases_by_name", "consumables_by_name", "gems_by_name", "runes_by_name"]}
+    for table in ["set_items", "unique_items"]:
+        for key in tables[table]:
+            indexes[f"{table}_by_name"][key.upper()] = (table, key)
+    for table in ["armor", "weapons"]:
+        for key in tables[table]:
+            indexes["bases_by_name"][key.upper().replace(' ', '')] = (table, key)
+    for extra_base in [
+        'amulet',
+        'ring',
+        'grandcharm',
+        'largecharm',
+        'smallcharm',
+        'jewel',
+        'tomeofidentify',
+        'tomeoftownportal',
+        'keyofterror',
+        'keyofhate',
+        'keyofdestruction',
+        'twistedessenceofsuffering',
+        'burningessenceofterror',
+        'chargedessenceofhatred',
+        'festeringessenceofdestruction'
+        ]:
+        indexes["bases_by_name"][extra_base.upper()] = ("misc", extra_base)
+    for consumable in [
+        'key',
+        'scrollofidentify', 'scrolloftownportal',
+        'arrows', 'bolts',
+        'antidotepotion', 'thawingpotion', 'staminapotion',
+        #'Fulminatingpotion', 'Explodingpotion', 'Oilpotion', 'stranglinggaspotion', 'Chokinggaspotion', 'rancidgaspotion',
+        'minorhealingpotion', 'lighthealingpotion', 'healingpotion', 'greaterhealingpotion', 'superhealingpotion',
+        'minormanapotion', 'lightmanapotion', 'manapotion', 'greatermanapotion', 'supermanapotion',
+        'rejuvenationpotion', 'fullrejuvenationpotion',
+        'gold'
+        ]:
+        indexes["consumables_by_name"][consumable.upper().replace(' ', '')] = ("misc", consumable)
+    for gem in [
+        'chippedruby', 'flawedruby', 'ruby', 'flawlessruby', 'perfectruby',
+        'chippedsapphire', 'flawedsapphire', 'sapphire', 'flawlesssapphire', 'perfectsapphire',
+        'chippedtopaz', 'flawedtopaz', 'topaz', 'flawlesstopaz', 'perfecttopaz',
+        'chippedemerald', 'flawedemerald', 'emerald', 'flawlessemerald', 'perfectemerald',
+        'chippeddiamond', 'flaweddiamond', 'diamond', 'flawlessdiamond', 'perfectdiamond',
+        'chippedamethyst', 'flawedamethyst', 'amethyst', 'flawlessamethyst', 'perfectamethyst',
+        'chippedskull', 'flawedskull', 'skull', 'flawlessskull', 'perfectskull'
+    ]:
+        indexes["gems_by_name"][gem.upper().replace(' ', '')] = ("misc", gem)
+    for key in tables["misc"]:
+        if 'rune' in key:
+            indexes["runes_by_name"][key.upper().replace(' ', '')] = ("misc", key)
+    for index in indexes.values():
+        for table, key in index.values():
+            if key not in tables[table]:
+                raise KeyError(f"{key} is not in the {table} table")
+    return indexes
+
+
+def _source_signatures() -> dict[str, list[int]] | None:
+    """
+    :return: {source file: [size, mtime]}, None if the sources are not available (frozen executable)
+    """
+    signatures = {}
+    for file_name in _SOURCE_FILES:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        signatures[file_name] = [stat.st_size, int(stat.st_mtime)]
+    return signatures
+
+
+def write_store(f) -> int:
+    """
+    Writes the store of the current data modules
+    :param f: Empty binary file object to write to
+    :return: Number of stored records
+    """
+    tables, values = item_data()
+    indexes = lookup_indexes(tables)
+    directory = {"sources": _source_signatures(), "tables": {}, "values": {}, "indexes": {}}
+
+    def write_blob(data: bytes) -> tuple[int, int]:
+        offset = f.tell()
+        f.write(data)
+        return offset, len(data)
+
+    f.write(b"\0" * _HEADER.size)
+    records = 0
+    for name, table in tables.items():
+        spans = []
+        for record in table.values():
+            offset, size = write_blob(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+            spans.append(_SPAN.pack(offset, offset + size))
+        records += len(spans)
+        directory["tables"][name] = {
+            "keys": write_blob(pickle.dumps(list(table.keys()), protocol=pickle.HIGHEST_PROTOCOL)),
+            "spans": write_blob(b"".join(spans)),
+        }
+    for name, value in values.items():
+        directory["values"][name] = write_blob(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    for name, index in indexes.items():
+        directory["indexes"][name] = write_blob(pickle.dumps((list(index.keys()), list(index.values())), protocol=pickle.HIGHEST_PROTOCOL))
+    directory_offset, directory_size = write_blob(pickle.dumps(directory, protocol=pickle.HIGHEST_PROTOCOL))
+    f.seek(0)
+    f.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, directory_offset, directory_size))
+    return records
+
+
+class StoreMapping(Mapping):
+    """
+    Read-only mapping over a table or index of the store, a value is materialised on first access and kept afterwards
+    """
+    def __init__(self, keys: list, load: Callable[[int], object]):
+        """
+        :param keys: Keys in their original order
+        :param load: Materialises the value of the key at a position of keys
+        """
+        self._keys = keys
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._load = load
+        self._values = [_MISSING] * len(keys)
+        self._lock = threading.Lock()
+        self._dict = None
+
+    def __getitem__(self, key):
+        i = self._positions[key]
+        if (value := self._values[i]) is _MISSING:
+            with self._lock:
+                if (value := self._values[i]) is _MISSING:
+                    value = self._values[i] = self._load(i)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> dict:
+        """
+        :return: All items as a plain dict, loads all values on the first call
+        """
+        if self._dict is None:
+            self._dict = {key: self[key] for key in self._keys}
+        return self._dict
+
+    def __or__(self, other):
+        return self.to_dict() | (other.to_dict() if isinstance(other, StoreMapping) else other)
+
+    def __ror__(self, other):
+        return other | self.to_dict()
+
+    def materialised(self) -> int:
+        return sum(value is not _MISSING for value in self._values)
+
+
+class ItemStore:
+    """
+    Tables, indexes and values of a store written by write_store()
+    """
+    def __init__(self, buffer: bytes | mmap.mmap):
+        self._buffer = buffer
+        magic, version, directory_offset, directory_size = _HEADER.unpack(buffer[:_HEADER.size])
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError(f"Not an item store (version {STORE_VERSION})")
+        directory = self._unpickle(directory_offset, directory_size)
+        self.sources = directory["sources"]
+        self._directory = directory
+        self._tables = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _unpickle(self, offset: int, size: int):
+        return pickle.loads(self._buffer[offset:offset + size])
+
+    def is_current(self) -> bool:
+        """
+        :return: Whether the store was written from the current data modules. Without the sources (frozen executable)
+            the store is used as it is.
+        """
+        return (signatures := _source_signatures()) is None or signatures == self.sources
+
+    def table(self, name: str) -> StoreMapping:
+        with self._lock:
+            if (table := self._tables.get(name)) is None:
+                entry = self._directory["tables"][name]
+                spans = memoryview(self._buffer)[entry["spans"][0]:sum(entry["spans"])].cast("Q")
+                table = self._tables[name] = StoreMapping(
+                    self._unpickle(*entry["keys"]),
+                    lambda i: self._unpickle(spans[2 * i], spans[2 * i + 1] - spans[2 * i])
+                )
+        return table
+
+    def index(self, name: str) -> StoreMapping:
+        """
+        :return: {name: record}, records are shared with their table
+        """
+        with self._lock:
+            index = self._indexes.get(name)
+        if index is None:
+            names, refs = self._unpickle(*self._directory["indexes"][name])
+            index = StoreMapping(names, lambda i: self.table(refs[i][0])[refs[i][1]])
+            with self._lock:
+                index = self._indexes.setdefault(name, index)
+        return index
+
+    def value(self, name: str):
+        """
+        :return: A new copy of the value on every call
+        """
+        return self._unpickle(*self._directory["values"][name])
+
+
+def open_store(path: str = ITEM_STORE_PATH) -> ItemStore | None:
+    """
+    :return: The store at path if it exists and is current, otherwise None
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            store = ItemStore(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (ValueError, OSError, struct.error, pickle.UnpicklingError, EOFError):
+        return None
+    return store if store.is_current() else None
+
+
+@cache
+def load_item_store(path: str = ITEM_STORE_PATH) -> ItemStore:
+    """
+    Opens the store at path, or builds it from the data modules and persists it if it is missing or outdated
+    """
+    if (store := open_store(path)) is not None:
+        return store
+    buffer = io.BytesIO()
+    write_store(buffer)
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getbuffer())
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return ItemStore(buffer.getvalue())
+
+
+if __name__ == "__main__":
+    out_path = sys.argv[1] if len(sys.argv) > 1 else ITEM_STORE_PATH
+    with open(out_path, "wb") as f:
+        print(f"Stored {write_store(f)} item records in {out_path}")
@@ -1,17 +1,116 @@
 from tesserocr import PyTessBaseAPI, OEM
+from contextlib import contextmanager
+from collections import Counter
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import numpy as np
 import cv2
-from utils.misc import erode_to_black, find_best_match
+from utils.misc import BestMatchResult, erode_to_black, find_best_match
 from d2r_image.data_models import OcrResult
-from d2r_image.ocr_data import ERROR_RESOLUTION_MAP, I_1, II_U, ONE_I, ONEONE_U
-from d2r_image.strings_store import all_words
+from d2r_image.ocr_cache import OcrCache
+from d2r_image.ocr_data import ERROR_RESOLUTION_MAP, FIX_RULES
+from d2r_image.strings_store import all_words, all_words_index
 from logger import Logger
+from config import Config
+
+ALL_WORDS_LIST = "assets/word_lists/all_words.txt"
+# (model, psm, word_list, digits_only) of the image_to_text() calls the bot makes, see warm_up_engines()
+DEFAULT_ENGINES = [
+    ("hover-eng_inconsolata_inv_th_fast", 6, ALL_WORDS_LIST, False),
+    ("ground-eng_inconsolata_inv_th_fast", 7, ALL_WORDS_LIST, False),
+    ("hover-eng_inconsolata_inv_th_fast", 7, "", True),
+    ("hover-eng_inconsolata_inv_th_fast", 13, ALL_WORDS_LIST, True),
+]
+
+# idle Tesseract engines by (model, psm, word_list, digits_only)
+_engines = {}
+_engines_lock = threading.Lock()
+_ocr_pool = None
+# results of recently read images, e.g. the ground item labels that are read again after each pickup
+result_cache = OcrCache()
+
+# confidence below which tooltip lines are read a second time, see image_to_text() retry_confidence. Ground labels are
+# read once, their second reads were more confident but almost never more correct.
+RETRY_CONFIDENCE = 60
+RETRY_SCALE = 1.5
+
+@dataclass
+class CascadeStats:
+    # images read with a second stage configured
+    reads: int = 0
+    # images that were read a second time
+    retries: int = 0
+    # second reads that were more confident than the first one
+    improved: int = 0
+
+    def log(self):
+        Logger.debug(f"OCR cascade: {self.retries} of {self.reads} reads retried ({100 * self.retries / max(1, self.reads):.1f}%), {self.improved} improved")
+
+cascade_stats = CascadeStats()
+
+@dataclass
+class RuleStats:
+    # replacements by FIX_RULES name or ERROR_RESOLUTION_MAP key
+    hits: Counter = field(default_factory=Counter)
+
+    def log(self):
+        Logger.debug(f"OCR fixes: {', '.join(f'{name} {n}' for name, n in self.hits.most_common()) or 'none'}")
+
+rule_stats = RuleStats()
+# rule_stats is updated by the OCR workers, cascade_stats by all threads calling image_to_text()
+_stats_lock = threading.Lock()
+
+def _create_engine(model: str, psm: int, word_list: str, digits_only: bool) -> PyTessBaseAPI:
+    api = PyTessBaseAPI(psm=psm, oem=OEM.LSTM_ONLY, path=f"assets/tessdata", lang=model)
+    api.ReadConfigFile("assets/tessdata/ocr_config.txt")
+    if word_list:
+        api.SetVariable("user_words_file", word_list)
+    #api.SetSourceResolution(72 * scale)
+    if digits_only:
+        api.SetVariable("tessedit_char_blacklist",
+                        ".,!?@#$%&*()<>_-+=/:;'\"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+        api.SetVariable("tessedit_char_whitelist", "0123456789")
+        api.SetVariable("classify_bln_numeric_mode", "1")
+    return api
+
+@contextmanager
+def _engine(model: str, psm: int, word_list: str, digits_only: bool):
+    """
+    Borrows an engine from the pool, or creates one if all engines of that configuration are busy.
+    Variables that differ between calls are part of the key, so an engine never needs them reset.
+    """
+    key = (model, psm, word_list, digits_only)
+    with _engines_lock:
+        idle = _engines.setdefault(key, [])
+        api = idle.pop() if idle else None
+    if api is None:
+        api = _create_engine(*key)
+    try:
+        yield api
+    finally:
+        # drop the last image and its results before the next user gets the engine
+        api.Clear()
+        with _engines_lock:
+            _engines[key].append(api)
+
+def warm_up_engines(configs: list[tuple[str, int, str, bool]] = DEFAULT_ENGINES):
+    """
+    Creates one engine per configuration up front, so the first OCR call of a run does not pay for loading the model
+    """
+    for key in configs:
+        with _engines_lock:
+            if _engines.get(key):
+                continue
+        api = _create_engine(*key)
+        with _engines_lock:
+            _engines.setdefault(key, []).append(api)
 
 def image_to_text(
     images: np.ndarray | list[np.ndarray],
     model: str = "hover-eng_inconsolata_inv_th_fast",
     psm: int = 3,
-    word_list: str = "assets/word_lists/all_words.txt",
+    word_list: str = ALL_WORDS_LIST,
     scale: float = 1.0,
     crop_pad: bool = True,
     erode: bool = False,
@@ -21,11 +120,15 @@ def image_to_text(
     fix_regexps: bool = True,
     check_known_errors: bool = True,
     correct_words: bool = True,
+    retry_confidence: float = 0,
+    retry_model: str = None,
+    retry_scale: float = RETRY_SCALE,
 ) -> list[OcrResult]:
     """
     Uses Tesseract to read image(s)
     :param images (required): image or list of images to read in OpenCV format.
-        Use a list of images rather than looping over single images where possible for best performance.
+        Use a list of images rather than looping over single images where possible for best performance,
+        lists are split across up to advanced_options ocr_workers engines which read them in parallel.
     :param model: OCR language model basename to use (in assets/tessdata folder)
     :param psm: Tesseract PSM to use. 7=single uniform text line, 6=single block of text, 3=auto without orientation.
         See https://www.pyimagesearch.com/2021/11/15/tesseract-page-segmentation-modes-psms-explained-how-to-improve-your-ocr-accuracy/
@@ -39,63 +142,118 @@ def image_to_text(
     :param fix_regexps: use regex for various cases of common errors (I <-> 1, etc.)
     :param check_known_errors: check for predefined common errors and replace
     :param correct_words: check dictionary of words and match closest match
+    :param retry_confidence: second stage of the OCR cascade. Images whose mean or any word confidence is below this
+        are read again with retry_model and retry_scale, the more confident result is kept. 0 disables the second stage.
+    :param retry_model: model of the second stage, defaults to model
+    :param retry_scale: factor the second stage scales the images by in addition to scale
     :return: Returns an OcrResult object
     """
     if type(images) == np.ndarray:
         images = [images]
-    results = []
-
-    with PyTessBaseAPI(psm=psm, oem=OEM.LSTM_ONLY, path=f"assets/tessdata", lang=model ) as api:
-        api.ReadConfigFile("assets/tessdata/ocr_config.txt")
-        if word_list:
-            api.SetVariable("user_words_file", word_list)
-        #api.SetSourceResolution(72 * scale)
-        for image in images:
-            processed_img = image
-            if scale:
-                processed_img = cv2.resize(
-                    processed_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-            if erode:
-                processed_img = erode_to_black(processed_img)
-            if crop_pad:
-                processed_img = _crop_pad(processed_img)
-            image_is_binary = (image.shape[2] if len(
-                image.shape) == 3 else 1) == 1 and image.dtype == bool
-            if not image_is_binary and threshold:
-                processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
-                processed_img = cv2.threshold(
-                    processed_img, threshold, 255, cv2.THRESH_BINARY)[1]
-            if invert:
-                if threshold or image_is_binary:
-                    processed_img = cv2.bitwise_not(processed_img)
-                else:
-                    processed_img = ~processed_img
-            api.SetImageBytes(*_img_to_bytes(processed_img))
-            if digits_only:
-                api.SetVariable("tessedit_char_blacklist",
-                                ".,!?@#$%&*()<>_-+=/:;'\"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
-                api.SetVariable("tessedit_char_whitelist", "0123456789")
-                api.SetVariable("classify_bln_numeric_mode", "1")
-            original_text = api.GetUTF8Text()
-            text = original_text
-            # replace newlines if image is a single line
-            if psm in (7, 8, 13):
-                text = text.replace('\n', '')
-            word_confidences = api.AllWordConfidences()
-            if fix_regexps:
-                text = _fix_regexps(text)
-            if check_known_errors:
-                text = _check_known_errors(text)
-            if correct_words:
-                text = _ocr_result_dictionary_check(text, word_confidences)
-            results.append(OcrResult(
-                original_text=original_text,
-                text=text,
-                #processed_img=processed_img,
-                word_confidences=word_confidences,
-                mean_confidence=api.MeanTextConf()
-            ))
+    results = _read_all(images, model, psm, word_list, scale, crop_pad, erode, invert, threshold, digits_only, fix_regexps, check_known_errors, correct_words)
+    if not retry_confidence:
         return results
+    weak = [i for i, res in enumerate(results) if _is_weak(res, retry_confidence)]
+    improved = 0
+    if weak:
+        retried = _read_all([images[i] for i in weak], retry_model or model, psm, word_list, (scale or 1.0) * retry_scale, crop_pad, erode, invert, threshold, digits_only, fix_regexps, check_known_errors, correct_words)
+        for i, res in zip(weak, retried):
+            if res.mean_confidence > results[i].mean_confidence:
+                results[i] = res
+                improved += 1
+    with _stats_lock:
+        cascade_stats.reads += len(results)
+        cascade_stats.retries += len(weak)
+        cascade_stats.improved += improved
+    return results
+
+
+def _is_weak(res: OcrResult, min_confidence: float) -> bool:
+    return res.mean_confidence < min_confidence or any(conf < min_confidence for conf in res.word_confidences)
+
+
+def _read_all(images: list[np.ndarray], model: str, psm: int, word_list: str, scale: float, crop_pad: bool, erode: bool, invert: bool, threshold: int, digits_only: bool, fix_regexps: bool, check_known_errors: bool, correct_words: bool) -> list[OcrResult]:
+    engine_key = (model, psm, word_list, digits_only)
+    preprocess = dict(scale=scale, crop_pad=crop_pad, erode=erode, invert=invert, threshold=threshold)
+    postprocess = dict(fix_regexps=fix_regexps, check_known_errors=check_known_errors, correct_words=correct_words)
+    workers = min(len(images), Config().advanced_options["ocr_workers"])
+    if workers < 2:
+        return _read_images(images, engine_key, preprocess, postprocess)
+    # contiguous chunks, one per engine, so the results can simply be concatenated in input order
+    bounds = np.linspace(0, len(images), workers + 1).astype(int)
+    pool = _get_ocr_pool()
+    futures = [pool.submit(_read_images, images[start:end], engine_key, preprocess, postprocess) for start, end in zip(bounds[:-1], bounds[1:])]
+    return [result for future in futures for result in future.result()]
+
+
+def _get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    with _engines_lock:
+        if _ocr_pool is None:
+            # Tesseract releases the GIL while recognizing, the worker count limits how many cores OCR can take at once
+            _ocr_pool = ThreadPoolExecutor(max_workers=Config().advanced_options["ocr_workers"], thread_name_prefix="OCR")
+        return _ocr_pool
+
+
+def _read_images(images: list[np.ndarray], engine_key: tuple, preprocess: dict, postprocess: dict) -> list[OcrResult]:
+    # the preprocessed image is what Tesseract sees, identical ones give identical results
+    params = engine_key + tuple(postprocess.values())
+    processed = [_preprocess(image, **preprocess) for image in images]
+    keys = [result_cache.key(processed_img, params) for processed_img in processed]
+    results = [result_cache.get(key) for key in keys]
+    if any(result is None for result in results):
+        with _engine(*engine_key) as api:
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = _recognize(api, processed[i], engine_key[1], **postprocess)
+                    result_cache.put(keys[i], results[i])
+    return results
+
+
+def _preprocess(image: np.ndarray, scale: float, crop_pad: bool, erode: bool, invert: bool, threshold: int) -> np.ndarray:
+    processed_img = image
+    if scale:
+        processed_img = cv2.resize(
+            processed_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    if erode:
+        processed_img = erode_to_black(processed_img)
+    if crop_pad:
+        processed_img = _crop_pad(processed_img)
+    image_is_binary = (image.shape[2] if len(
+        image.shape) == 3 else 1) == 1 and image.dtype == bool
+    if not image_is_binary and threshold:
+        processed_img = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+        processed_img = cv2.threshold(
+            processed_img, threshold, 255, cv2.THRESH_BINARY)[1]
+    if invert:
+        if threshold or image_is_binary:
+            processed_img = cv2.bitwise_not(processed_img)
+        else:
+            processed_img = ~processed_img
+    return processed_img
+
+
+def _recognize(api: PyTessBaseAPI, processed_img: np.ndarray, psm: int, fix_regexps: bool, check_known_errors: bool, correct_words: bool) -> OcrResult:
+    api.SetImageBytes(*_img_to_bytes(processed_img))
+    original_text = api.GetUTF8Text()
+    text = original_text
+    # replace newlines if image is a single line
+    if psm in (7, 8, 13):
+        text = text.replace('\n', '')
+    word_confidences = api.AllWordConfidences()
+    if fix_regexps:
+        text = _fix_regexps(text)
+    if check_known_errors:
+        text = _check_known_errors(text)
+    if correct_words:
+        text = _ocr_result_dictionary_check(text, word_confidences)
+    return OcrResult(
+        original_text=original_text,
+        text=text,
+        #processed_img=processed_img,
+        word_confidences=word_confidences,
+        mean_confidence=api.MeanTextConf()
+    )
 
 
 def _crop_pad(image: np.ndarray = None):
@@ -124,109 +282,39 @@ def _img_to_bytes(image: np.ndarray, colorspace: str = 'BGR'):
     return image.tobytes(), width, height, bytes_per_pixel, bytes_per_line
 
 
-def _fix_regexps(ocr_output: str, repeat_count: int = 0) -> str:
-    # case: two 1's within a string; e.g., "SIIPER MANA POTION"
-    try:
-        text = II_U.sub('U', ocr_output)
-    except:
-        # logging.error(f"Error _II_ -> _U_ on {ocr_output}")
-        text = ocr_output
-    # case: two 1's within a string; e.g., "S11PER MANA POTION"
-    try:
-        text = ONEONE_U.sub('U', text)
-    except:
-        # logging.error(f"Error _11_ -> _U_ on {ocr_output}")
-        pass
-    # case: an I within a number or by a sign; e.g., "+32I to mana attack rating"
-    try:
-        text = I_1.sub('1', text)
-    except:
-        # logging.error(f"Error I -> 1 on {ocr_output}")
-        pass
-    # case: a 1 within a string; e.g., "W1RT'S LEG"
-    try:
-        text = ONE_I.sub('I', text)
-    except:
-        # logging.error(f"Error 1 -> I on {ocr_output}")
-        pass
-    # case: a solitary I; e.g., " I TO 5 DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
-            break
-        if " I " in text:
-            text = text.replace(" I ", " 1 ")
-            continue
-        elif ' I\n' in text:
-            text = text.replace(' I\n', ' 1\n')
-            continue
-        elif '\nI ' in text:
-            text = text.replace('\nI ', '\n1 ')
-            continue
-        break
-    # case: a solitary S; e.g., " 1 TO S DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' S ' -> ' 5 ' on {ocr_output}")
-            break
-        if " S " in text:
-            text = text.replace(" S ", " 5 ")
-            continue
-        elif ' I\n' in text:
-            text = text.replace(' S\n', ' 5\n')
+def _fix_regexps(ocr_output: str) -> str:
+    text = ocr_output
+    for rule in FIX_RULES:
+        for guard in rule.guards:
+            if guard in text:
+                break
+        else:
             continue
-        elif '\nI ' in text:
-            text = text.replace('\nS ', '\n5 ')
-            continue
-        break
-    # case: a solitary O; e.g., " O TO 5 DEFENSE"
-    cnt = 0
-    while True:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error ' I ' -> ' 1 ' on {ocr_output}")
-            break
-        if (pattern := " O ") in text:
-            text = text.replace(pattern, " 0 ")
-            continue
-        elif (pattern := ' O\n') in text:
-            text = text.replace(pattern, ' 0\n')
-            continue
-        elif (pattern := '\nO ') in text:
-            text = text.replace(pattern, '\n0 ')
-            continue
-        break
-    # case: consecutive I's; e.g., "DEFENSE: II"
-    repeat = False
-    cnt = 0
-    while "II" in text:
-        cnt += 1
-        if cnt > 30:
-            # logging.error(f"Error 4 on {ocr_output}")
-            break
-        text = text.replace("II", "11")
-        repeat = True
-        repeat_count += 1
-    if repeat and repeat_count < 10:
-        _fix_regexps(text)
+        text, hits = rule.pattern.subn(rule.repl, text)
+        if hits:
+            with _stats_lock:
+                rule_stats.hits[rule.name] += hits
     return text
 
 
 def _check_known_errors(text):
     for word in text.split():
-        for key in ERROR_RESOLUTION_MAP:
-            if key == word:
-                text = text.replace(key, ERROR_RESOLUTION_MAP[key])
-                Logger.debug(f"_check_known_errors: {key} -> {ERROR_RESOLUTION_MAP[key]}")
+        if (fix := ERROR_RESOLUTION_MAP.get(word)) is not None:
+            text = text.replace(word, fix)
+            with _stats_lock:
+                rule_stats.hits[word] += 1
+            Logger.debug(f"_check_known_errors: {word} -> {fix}")
     return text
 
 def _contains_characters(word):
     return any(c.isalpha() for c in word)
 
+def _find_best_word(word: str, word_list: set) -> BestMatchResult:
+    # the default word list has a prebuilt index, other lists are scanned
+    if word_list is all_words():
+        return all_words_index().best_match(word)
+    return find_best_match(word, list(word_list))
+
 def _ocr_result_dictionary_check(
     original_text: str,
     confidences: list,
@@ -261,7 +349,7 @@ def _ocr_result_dictionary_check(
                 result = saved_result
                 saved_result = ""
             else:
-                result = find_best_match(word, list(word_list))
+                result = _find_best_word(word, word_list)
             # if the word is the last word on the line don't lookahead
             if word_cnt == (len(line) - 1):
                 if result.score_normalized >= normalized_lev_threshold:
@@ -281,8 +369,8 @@ def _ocr_result_dictionary_check(
                     new_line.append(word)
                 continue
             # fuzzy match the next word and a combination of both current and next words
-            next_result = find_best_match(next_word, list(word_list))
-            combined_result = find_best_match(f"{word} {next_word}", list(word_list))
+            next_result = _find_best_word(next_word, word_list)
+            combined_result = _find_best_word(f"{word} {next_word}", word_list)
             if combined_result.score < (result.score + next_result.score):
                 # combined lev score is superior to sum of individual lev scores, replace with combined string
                 skip_next = True
@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+import numpy as np
+from d2r_image.data_models import OcrResult
+from logger import Logger
+
+
+@dataclass
+class OcrCacheStats:
+    hits: int = 0
+    misses: int = 0
+    # entries dropped because the cache was full or they were too old
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class OcrCache:
+    """
+    LRU cache of OCR results keyed by a fingerprint of the preprocessed (binarised, crop-padded) image and the OCR parameters.
+    Labels that did not change between two reads, e.g. the remaining ground items after a pickup, are only read once.
+    """
+    def __init__(self, max_size: int = 512, max_age: float = 120.0):
+        """
+        :param max_size: Number of results kept, the least recently used one is dropped first
+        :param max_age: Seconds after which a result is not used anymore
+        """
+        self._max_size = max_size
+        self._max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = OcrCacheStats()
+
+    @staticmethod
+    def key(processed_img: np.ndarray, params: tuple) -> tuple:
+        """
+        :param processed_img: Image exactly as it is passed to Tesseract
+        :param params: Hashable OCR parameters that influence the result
+        """
+        img = np.ascontiguousarray(processed_img)
+        digest = hashlib.blake2b(img.data, digest_size=16).digest()
+        return digest, img.shape, img.dtype.str, params
+
+    def get(self, key: tuple) -> OcrResult | None:
+        now = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self._max_age:
+                del self._entries[key]
+                self.stats.evictions += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+        # callers may modify their result, never hand out the cached instance
+        return _copy(entry[0])
+
+    def put(self, key: tuple, result: OcrResult):
+        with self._lock:
+            self._entries[key] = (_copy(result), time.perf_counter())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def log_stats(self):
+        s = self.stats
+        Logger.debug(f"OCR cache: {s.hits} hits, {s.misses} misses, {s.evictions} evictions ({100 * s.hit_rate:.1f}% hit rate)")
+
+
+def _copy(result: OcrResult) -> OcrResult:
+    return replace(result, word_confidences=list(result.word_confidences) if result.word_confidences is not None else None)
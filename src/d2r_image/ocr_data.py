@@ -1,4 +1,5 @@
 import re
+from dataclasses import dataclass
 from enum import Enum
 
 I_1 = re.compile(r"(?<=[%I0-9\-+])I|I(?=[%I0-9\-+])")
@@ -6,6 +7,36 @@ II_U = re.compile(r"(?<=[A-Z])II|II(?=[A-Z])|1?=[a-z]")
 ONE_I = re.compile(r"(?<=[A-Z])1|1(?=[A-Z])|1?=[a-z]")
 ONEONE_U = re.compile(r"(?<=[A-Z])11|11(?=[A-Z])|1?=[a-z]")
 
+
+@dataclass(frozen=True)
+class TextRule:
+    name: str
+    pattern: re.Pattern
+    repl: str
+    # the pattern can only match if one of these substrings is in the text, checking them is much faster than a search
+    guards: tuple[str, ...] = ()
+
+
+# fixes of common misreads, applied in this order by ocr._fix_regexps()
+FIX_RULES = [
+    # two 1's within a string; e.g., "SIIPER MANA POTION"
+    TextRule("II_U", II_U, "U", ("II", "=")),
+    # two 1's within a string; e.g., "S11PER MANA POTION"
+    TextRule("ONEONE_U", ONEONE_U, "U", ("11", "=")),
+    # an I within a number or by a sign; e.g., "+32I to mana attack rating"
+    TextRule("I_1", I_1, "1", ("I",)),
+    # a 1 within a string; e.g., "W1RT'S LEG"
+    TextRule("ONE_I", ONE_I, "I", ("1", "=")),
+    # a solitary I; e.g., " I TO 5 DEFENSE"
+    TextRule("SOLITARY_I", re.compile(r"(?<= )I(?=[ \n])|(?<=\n)I(?= )"), "1", (" I ", " I\n", "\nI ")),
+    # a solitary S; e.g., " 1 TO S DEFENSE"
+    TextRule("SOLITARY_S", re.compile(r"(?<= )S(?= )"), "5", (" S ",)),
+    # a solitary O; e.g., " O TO 5 DEFENSE"
+    TextRule("SOLITARY_O", re.compile(r"(?<= )O(?=[ \n])|(?<=\n)O(?= )"), "0", (" O ", " O\n", "\nO ")),
+    # consecutive I's; e.g., "DEFENSE: II"
+    TextRule("II_11", re.compile(r"II"), "11", ("II",)),
+]
+
 ERROR_RESOLUTION_MAP = {
     'SHIFLD': 'SHIELD',
     'SPFAR': 'SPEAR',
@@ -6,7 +6,7 @@ import numpy as np
 from d2r_image.data_models import GroundItemList, HoveredItem, ItemQuality, ItemText
 from d2r_image.bnip_helpers import parse_item
 
-from d2r_image.processing_helpers import build_d2_items, crop_text_clusters, crop_item_tooltip, get_items_by_quality, consolidate_clusters, find_base_and_remove_items_without_a_base, set_set_and_unique_base_items
+from d2r_image.processing_helpers import build_d2_items, crop_text_clusters, crop_item_tooltip, read_pending_tooltip_lines, get_items_by_quality, consolidate_clusters, find_base_and_remove_items_without_a_base, set_set_and_unique_base_items
 import numpy as np
 
 from logger import Logger
@@ -16,7 +16,12 @@ import os
 os.makedirs("./log/screenshots/info", exist_ok=True)
 
 def get_ground_loot(image: np.ndarray, consolidate: bool = False) -> GroundItemList | None:
-    crop_result = crop_text_clusters(image)
+    return build_ground_loot(crop_text_clusters(image), consolidate)
+
+def build_ground_loot(crop_result: list[ItemText], consolidate: bool = False) -> GroundItemList | None:
+    """
+    Turns read ground item labels into items, pairs names with their bases
+    """
     items_by_quality = get_items_by_quality(crop_result)
     if consolidate:
         consolidate_clusters(items_by_quality)
@@ -26,13 +31,31 @@ def get_ground_loot(image: np.ndarray, consolidate: bool = False) -> GroundItemL
 
 import traceback #TODO REMOV THIS
 
-def get_hovered_item(image: np.ndarray, model = "hover-eng_inconsolata_inv_th_fast") -> tuple[HoveredItem, ItemText]:
-    res, quality = crop_item_tooltip(image, model)
+def get_hovered_item(image: np.ndarray, model = "hover-eng_inconsolata_inv_th_fast", header_only: bool = False) -> tuple[HoveredItem, ItemText]:
+    """
+    :param header_only: Only read the name and base lines of the tooltip. The item has no stats then, use
+        read_hovered_item_stats() if the decision needs them.
+    """
+    res, quality = crop_item_tooltip(image, model, header_only)
+    return _parse_hovered_item(res, quality), res
+
+def read_hovered_item_stats(res: ItemText, model = "hover-eng_inconsolata_inv_th_fast") -> tuple[HoveredItem, ItemText]:
+    """
+    Reads the remaining lines of a tooltip from get_hovered_item(header_only=True) and parses the complete item
+    """
+    read_pending_tooltip_lines(res, model)
+    return _parse_hovered_item(res, res.quality), res
+
+def _parse_hovered_item(res: ItemText, quality: str) -> HoveredItem | None:
     parsed_item = None
     if res.ocr_result:
         try:
-            parsed_item = parse_item(quality, res.ocr_result.text)
+            parsed_item = parse_item(quality, res.ocr_result.text, identified=res.identified if res.pending_lines else None)
         except Exception as e:
+            if res.pending_lines:
+                # the header alone was not enough, the caller reads the remaining lines
+                Logger.debug(f"Could not parse item from its tooltip header: {e}")
+                return None
             Logger.warning(f"\nparsed_item ERROR {e}\n {traceback.format_exc()}")
             # * Log the screenshot to log/screenshots/info directory.
             t = time.time()
@@ -44,7 +67,7 @@ def get_hovered_item(image: np.ndarray, model = "hover-eng_inconsolata_inv_th_fa
 
 {traceback.format_exc()}
 --------------------------------------------------------------------------------""")
-    return parsed_item, res
+    return parsed_item
 
 
 if __name__ == "__main__":
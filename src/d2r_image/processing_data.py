@@ -6,8 +6,16 @@ ITEM_COLORS = ['white', 'gray', 'blue', 'green', 'yellow', 'gold', 'orange']
 GAUS_FILTER = (21, 1)
 EXPECTED_HEIGHT_RANGE = [round(num) for num in [x / 1.5 for x in [14, 40]]]
 EXPECTED_WIDTH_RANGE = [round(num) for num in [x / 1.5 for x in [60, 1280]]]
+# mean intensity of the item color in a label box, the text is on a black background so brighter boxes are no labels
+LABEL_MAX_TEXT_INTENSITY = 35
+# a joined label with this much of a second item color is a group of labels next to each other, separated by color
+MIXED_LABEL_COLOR_SHARE = 0.2
 BOX_EXPECTED_WIDTH_RANGE = [200, 900]
 BOX_EXPECTED_HEIGHT_RANGE = [24, 710]
+# tooltip lines that are read right away when the stat lines are read lazily (name and base)
+TOOLTIP_HEADER_LINES = 2
+# rows of a tooltip line are brighter than this, gaps between lines are not
+TOOLTIP_TEXT_THRESHOLD = 60
 
 QUALITY_COLOR_MAP = {
     'white': ItemQuality.Normal,
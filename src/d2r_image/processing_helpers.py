@@ -3,91 +3,194 @@ import numpy as np
 import re
 import time
 import math
-import copy
+from bisect import bisect_left, insort
 
-from d2r_image.data_models import GroundItem, GroundItemList, ItemQuality, ItemQualityKeyword, ItemText
-from d2r_image.bnip_data import NTIP_ALIAS_QUALITY_MAP
-from d2r_image.bnip_helpers import basename_to_types
+from d2r_image.data_models import GroundItem, GroundItemList, ItemQuality, ItemQualityKeyword, ItemText, OcrResult
+from d2r_image.bnip_helpers import NTIP_ALIAS_QUALITY_MAP, basename_to_types
 from d2r_image.ocr import image_to_text
-from d2r_image.processing_data import Runeword
 import d2r_image.d2data_lookup as d2data_lookup
 from d2r_image.d2data_lookup import fuzzy_base_item_match
-from d2r_image.processing_data import EXPECTED_HEIGHT_RANGE, EXPECTED_WIDTH_RANGE, GAUS_FILTER, ITEM_COLORS, QUALITY_COLOR_MAP, Runeword, BOX_EXPECTED_HEIGHT_RANGE, BOX_EXPECTED_WIDTH_RANGE
+from d2r_image.processing_data import EXPECTED_HEIGHT_RANGE, EXPECTED_WIDTH_RANGE, GAUS_FILTER, ITEM_COLORS, QUALITY_COLOR_MAP, LABEL_MAX_TEXT_INTENSITY, MIXED_LABEL_COLOR_SHARE, BOX_EXPECTED_HEIGHT_RANGE, BOX_EXPECTED_WIDTH_RANGE, TOOLTIP_HEADER_LINES, TOOLTIP_TEXT_THRESHOLD
 from d2r_image.strings_store import base_items
-from utils.misc import color_filter, erode_to_black, slugify
-from d2r_image.ocr import image_to_text
-from ui_manager import get_hud_mask
+from utils.misc import color_mask, erode_to_black, slugify
+from d2r_image.ocr import image_to_text, RETRY_CONFIDENCE
+from ui_manager import ScreenObjects, get_hud_mask, is_visible
 
 from screen import convert_screen_to_monitor
-from utils.misc import color_filter, cut_roi, roi_center
+from utils.misc import color_classes, cut_roi, roi_center
+from utils.frame import cached_gray
 from logger import Logger
 from config import Config
 import template_finder
 
 gold_regex = re.compile(r'(^[0-9]+)\sGOLD')
 
-import time
+def _expected_label_size(w: int, h: int) -> bool:
+    return EXPECTED_HEIGHT_RANGE[0] < h < EXPECTED_HEIGHT_RANGE[1] and EXPECTED_WIDTH_RANGE[0] < w < EXPECTED_WIDTH_RANGE[1]
+
+def _pad_label(y: int, h: int, padding_y: int) -> tuple[int, int]:
+    # increase height a bit to make sure we have the full item name in the cluster
+    return (y - padding_y if y > padding_y else 0), h + padding_y * 2
+
+def _join_label_text(mask: np.ndarray) -> tuple[int, np.ndarray, np.ndarray]:
+    """
+    Joins the glyphs and words of each label line by a horizontal dilation, same reach as a GAUS_FILTER blur of bright text
+    :return: Number of labels (including the background label 0), label image and x, y, w, h, area stats per label
+    """
+    joined = cv2.dilate(mask, np.ones((1, GAUS_FILTER[0]), np.uint8))
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    return n, labels, stats
+
+def _color_sums(color_bits: np.ndarray, gray: np.ndarray, labels: np.ndarray, n: int) -> np.ndarray:
+    """
+    :return: Summed intensity of the pixels of each ITEM_COLORS color (columns) per label (rows)
+    """
+    # only a small part of the screen is text
+    text_pixels = np.flatnonzero(color_bits)
+    bits, labels, gray = color_bits.ravel()[text_pixels], labels.ravel()[text_pixels], gray.ravel()[text_pixels]
+    sums = np.zeros((n, len(ITEM_COLORS)))
+    for i in range(len(ITEM_COLORS)):
+        selected = (bits & (1 << i)) > 0
+        sums[:, i] = np.bincount(labels[selected], weights=gray[selected], minlength=n)
+    return sums
+
+def _split_mixed_label(color_bits: np.ndarray, gray: np.ndarray, padding_y: int) -> list[tuple[int, int, int, int, str]]:
+    """
+    Searches each color on its own in a region with labels of different colors next to each other
+    :return: (x, y, w, h, color) of each label, relative to the region
+    """
+    labels = []
+    for i, key in enumerate(ITEM_COLORS):
+        single_color = cv2.bitwise_and(color_bits, 1 << i)
+        if not single_color.any():
+            continue
+        n, _, stats = _join_label_text(single_color)
+        for x, y, w, h, _ in stats[1:]:
+            if not _expected_label_size(w, h):
+                continue
+            y, h = _pad_label(y, h, padding_y)
+            box_bits = color_bits[y:y+h, x:x+w]
+            sums = _color_sums(box_bits, gray[y:y+h, x:x+w], np.zeros(box_bits.shape, np.int32), 1)[0]
+            if sums.argmax() == i and sums[i] / (w * h) < LABEL_MAX_TEXT_INTENSITY:
+                labels.append((x, y, w, h, key))
+    return labels
+
+def find_item_labels(color_bits: np.ndarray, gray: np.ndarray, padding_y: int = 5) -> list[tuple[int, int, int, int, str]]:
+    """
+    Finds the ground item labels in one pass over all item colors
+    :param color_bits: Item text colors of the screen, bit i is set for pixels of ITEM_COLORS[i] (see color_classes())
+    :param gray: Grayscale of the screen
+    :return: (x, y, w, h, color) of each label
+    """
+    n, labels, stats = _join_label_text(color_bits)
+    sums = _color_sums(color_bits, gray, labels, n)
+    item_labels = []
+    for label in range(1, n):
+        x, y, w, h, _ = stats[label]
+        if not _expected_label_size(w, h):
+            continue
+        order = np.argsort(sums[label])[::-1]
+        if sums[label, order[1]] > MIXED_LABEL_COLOR_SHARE * sums[label, order[0]]:
+            item_labels += [(x + lx, y + ly, lw, lh, key) for lx, ly, lw, lh, key in _split_mixed_label(color_bits[y:y+h, x:x+w], gray[y:y+h, x:x+w], padding_y)]
+            continue
+        y, h = _pad_label(y, h, padding_y)
+        # the label background is black, only the text has the item color
+        if sums[label, order[0]] / (w * h) < LABEL_MAX_TEXT_INTENSITY:
+            item_labels.append((x, y, w, h, ITEM_COLORS[order[0]]))
+    return item_labels
+
 def crop_text_clusters(inp_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
+    return read_text_clusters(find_text_clusters(inp_img, padding_y))
+
+def find_text_clusters(inp_img: np.ndarray, padding_y: int = 5) -> list[ItemText]:
+    """
+    Segments the ground item labels without reading them, see read_text_clusters()
+    """
     cleaned_img = clean_img(inp_img)
+    color_bits = color_classes(cleaned_img, [Config().colors[key] for key in ITEM_COLORS])
+    # white text has some gray on border of glyphs, erode
+    gray_bit = 1 << ITEM_COLORS.index("gray")
+    gray_text = cv2.erode(cv2.bitwise_and(color_bits, gray_bit), np.ones((2, 1), 'uint8'), None, iterations=1)
+    color_bits = cv2.bitwise_or(cv2.bitwise_and(color_bits, 0xff ^ gray_bit), gray_text)
     # Cluster item names
     item_clusters = []
-    for key in ITEM_COLORS:
-        _, filtered_img = color_filter(cleaned_img, Config().colors[key])
-        filtered_img_gray = cv2.cvtColor(filtered_img, cv2.COLOR_BGR2GRAY)
-        gaus = GAUS_FILTER
-        if key == "gray":
-            # white text has some gray on border of glyphs, erode
-            filtered_img_gray = cv2.erode(filtered_img_gray, np.ones((2, 1), 'uint8'), None, iterations=1)
-            gaus = (GAUS_FILTER[0] + 4, GAUS_FILTER[1])
-        blured_img = np.clip(cv2.GaussianBlur(
-            filtered_img_gray, gaus, cv2.BORDER_DEFAULT), 0, 255)
-        contours = cv2.findContours(
-            blured_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = contours[0] if len(contours) == 2 else contours[1]
-        for cntr in contours:
-            x, y, w, h = cv2.boundingRect(cntr)
-            expected_height = EXPECTED_HEIGHT_RANGE[0] < h < EXPECTED_HEIGHT_RANGE[1]
-            expected_width = EXPECTED_WIDTH_RANGE[0] < w < EXPECTED_WIDTH_RANGE[1]
-            if not (expected_height and expected_width): continue
-            # increase height a bit to make sure we have the full item name in the cluster
-            y = y - padding_y if y > padding_y else 0
-            h += padding_y * 2
-            cropped_item = filtered_img[y:y+h, x:x+w]
-            avg = int(np.average(filtered_img_gray[y:y+h, x:x+w]))
-            contains_black = np.min(cropped_item) < 14
-            mostly_dark = avg < 35
-            if contains_black and mostly_dark:
-                # double-check item color
-                color_averages = []
-                for key2 in ITEM_COLORS:
-                    _, extracted_img = color_filter(cropped_item, Config().colors[key2])
-                    extr_avg = np.average(cv2.cvtColor(
-                        extracted_img, cv2.COLOR_BGR2GRAY))
-                    color_averages.append(extr_avg)
-                max_idx = color_averages.index(max(color_averages))
-                if key == ITEM_COLORS[max_idx]:
-                    item_clusters.append(ItemText(
-                        color=key,
-                        quality=QUALITY_COLOR_MAP[key],
-                        roi=[x, y, w, h],
-                        img=inp_img[y:y+h, x:x+w],
-                        clean_img=cleaned_img[y:y+h, x:x+w]
-                    ))
+    for x, y, w, h, key in find_item_labels(color_bits, cv2.cvtColor(cleaned_img, cv2.COLOR_BGR2GRAY), padding_y):
+        item_clusters.append(ItemText(
+            color=key,
+            quality=QUALITY_COLOR_MAP[key],
+            roi=[x, y, w, h],
+            img=inp_img[y:y+h, x:x+w],
+            clean_img=cleaned_img[y:y+h, x:x+w]
+        ))
+    return item_clusters
+
+def read_text_clusters(item_clusters: list[ItemText]) -> list[ItemText]:
+    """
+    Sets the OCR result of labels from find_text_clusters()
+    """
     cluster_images = [key["clean_img"] for key in item_clusters]
     results = image_to_text(cluster_images, model="ground-eng_inconsolata_inv_th_fast", psm=7, erode=True)
     for count, cluster in enumerate(item_clusters):
         setattr(cluster, "ocr_result", results[count])
     return item_clusters
 
-def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv_th_fast") -> tuple[ItemText, str]:
+def split_tooltip_lines(img: np.ndarray) -> list[np.ndarray]:
+    """
+    Splits a tooltip box into its text lines by the row projection of the text
+    :param img: Tooltip box as cropped by crop_item_tooltip()
+    :return: Image of each line, top to bottom
+    """
+    rows = np.max(cached_gray(img), axis=1) > TOOLTIP_TEXT_THRESHOLD
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows, [0])).astype(np.int8)))
+    lines = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        # single bright rows are noise (e.g. the box border), not text
+        if end - start < 5:
+            continue
+        lines.append(img[max(0, start - 2):end + 2])
+    return lines
+
+def _join_ocr_results(results: list[OcrResult]) -> OcrResult:
+    word_confidences = [conf for r in results for conf in r.word_confidences]
+    return OcrResult(
+        text="\n".join(r.text for r in results),
+        original_text="\n".join(r.original_text for r in results),
+        word_confidences=word_confidences,
+        mean_confidence=float(np.mean(word_confidences)) if word_confidences else 0,
+    )
+
+def _is_price_line(text: str) -> bool:
+    return 'SELL VALUE' in text or 'COST' in text
+
+def _read_tooltip_header(lines: list[np.ndarray], model: str) -> tuple[OcrResult, list[np.ndarray]]:
+    """
+    Reads the first TOOLTIP_HEADER_LINES lines, price lines (vendor open) do not count
+    :return: OCR result of the header and the remaining lines
+    """
+    results = image_to_text(lines[:TOOLTIP_HEADER_LINES], psm=7, model=model, retry_confidence=RETRY_CONFIDENCE)
+    while len(results) < len(lines) and sum(not _is_price_line(r.text) for r in results) < TOOLTIP_HEADER_LINES:
+        results += image_to_text(lines[len(results)], psm=7, model=model, retry_confidence=RETRY_CONFIDENCE)
+    return _join_ocr_results(results), lines[len(results):]
+
+def read_pending_tooltip_lines(res: ItemText, model: str = "hover-eng_inconsolata_inv_th_fast") -> ItemText:
+    """
+    Reads the lines of a tooltip that crop_item_tooltip(header_only=True) skipped and appends them to its ocr_result
+    """
+    if res.pending_lines:
+        res.ocr_result = _join_ocr_results([res.ocr_result] + image_to_text(res.pending_lines, psm=7, model=model, retry_confidence=RETRY_CONFIDENCE))
+    res.pending_lines = None
+    return res
+
+def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv_th_fast", header_only: bool = False) -> tuple[ItemText, str]:
     """
     Crops visible item description boxes / tooltips
     :inp_img: image from hover over item of interest.
     :model: which ocr model to use
+    :header_only: only read the name and base lines, the other lines are kept in pending_lines for read_pending_tooltip_lines()
     """
     res = ItemText()
     quality = None
-    black_mask = color_filter(image, Config().colors["black"])[0]
+    black_mask = color_mask(image, Config().colors["black"])
     contours = cv2.findContours(
         black_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     contours = contours[0] if len(contours) == 2 else contours[1]
@@ -100,7 +203,7 @@ def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv
         if not (expected_width := BOX_EXPECTED_WIDTH_RANGE[0] < w < BOX_EXPECTED_WIDTH_RANGE[1]):
             continue
 
-        avg = np.average(cv2.cvtColor(cropped_item, cv2.COLOR_BGR2GRAY))
+        avg = np.average(cached_gray(cropped_item))
         if not (mostly_dark := 0 < avg < 35):
             continue
         if not (contains_black := np.min(cropped_item) < 14):
@@ -110,7 +213,7 @@ def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv
         contains_orange = False
         if not contains_white:
             # check for orange (like key of destruction, etc.)
-            orange_mask, _ = color_filter(cropped_item, Config().colors["orange"])
+            orange_mask = color_mask(cropped_item, Config().colors["orange"])
             contains_orange = np.min(orange_mask) > 0
         if not (contains_white or contains_orange):
             continue
@@ -131,8 +234,13 @@ def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv
         footer_h = 720 - footer_y
         found_footer = template_finder.search(["TO_TOOLTIP"], image, threshold=0.8, roi=[x, footer_y, w, footer_h]).valid
         if found_footer:
-            res.ocr_result = image_to_text(cropped_item, psm=6, model=model)[0]
-            first_row = cut_roi(copy.deepcopy(cropped_item), (0, 0, w, 26))
+            if header_only:
+                res.ocr_result, res.pending_lines = _read_tooltip_header(split_tooltip_lines(cropped_item), model)
+                # the stat lines tell whether the item is identified, without them look for the label
+                res.identified = not is_visible(ScreenObjects.Unidentified, cropped_item)
+            else:
+                res.ocr_result = image_to_text(cropped_item, psm=6, model=model)[0]
+            first_row = cut_roi(cropped_item, (0, 0, w, 26))
             if _contains_color(first_row, "green"):
                 quality = ItemQuality.Set.value
             elif _contains_color(first_row, "gold"):
@@ -154,11 +262,12 @@ def crop_item_tooltip(image: np.ndarray, model: str = "hover-eng_inconsolata_inv
                 quality = ItemQuality.Normal.value
             res.roi = [x, y, w, h]
             res.img = cropped_item
+            res.quality = quality
             break
     return res, quality
 
 def _contains_color(img: np.ndarray, color: str) -> bool:
-    mask = color_filter(img, Config().colors[color])[0]
+    mask = color_mask(img, Config().colors[color])
     return np.average(mask) > 0
 
 
@@ -166,8 +275,11 @@ def clean_img(inp_img: np.ndarray, black_thresh: int = 14) -> np.ndarray:
     img = inp_img[:, :, :]
     if img.shape[0] == get_hud_mask().shape[0] and img.shape[1] == get_hud_mask().shape[1]:
         img = cv2.bitwise_and(img, img, mask=get_hud_mask())
+    else:
+        # inp_img might be a shared screen frame, don't paint into it
+        img = img.copy()
     # In order to not filter out highlighted items, change their color to black
-    highlight_mask = color_filter(img, Config().colors["item_highlight"])[0]
+    highlight_mask = color_mask(img, Config().colors["item_highlight"])
     img[highlight_mask > 0] = (0, 0, 0)
     img = erode_to_black(img, black_thresh)
     return img
@@ -186,13 +298,7 @@ def get_items_by_quality(crop_result: list[ItemText]):
             else:
                 quality = ItemQuality.Crafted
         elif item.quality.value == ItemQuality.Unique.value:
-            is_runeword = False
-            try:
-                Runeword(item.ocr_result.text)
-                is_runeword = True
-            except:
-                pass
-            quality = ItemQuality.Runeword if is_runeword else item.quality
+            quality = ItemQuality.Runeword if d2data_lookup.classify(item.ocr_result.text).runeword else item.quality
         elif item.quality.value == ItemQuality.Gray.value:
             quality = ItemQuality.Gray
         else:
@@ -241,13 +347,59 @@ def consolidate_clusters(items_by_quality):
     # print(f'CCO: {cco}\tCCR: {ccr}\tCCS: {ccs}\tCCU: {ccu}\tCCRW: {ccrw}')
 
 
+def _rows(labels: list[dict]) -> list[tuple[int, int, dict]]:
+    """
+    :return: (y, position in labels, label) of all labels, sorted by y. Label positions on screen are looked up in
+        this instead of scanning all labels.
+    """
+    return sorted((label['y'], order, label) for order, label in enumerate(labels))
+
+
+def _in_rows(rows: list[tuple[int, int, dict]], y_min: int, y_max: int) -> list[dict]:
+    """
+    :return: Labels with y_min <= y <= y_max in their order in the original list
+    """
+    window = rows[bisect_left(rows, (y_min,)):bisect_left(rows, (y_max + 1,))]
+    return [label for _, _, label in sorted(window, key=lambda row: row[1])]
+
+
+def _closest_label(rows: list[tuple[int, int, dict]], x: int, y: int, min_y: int = None) -> dict | None:
+    """
+    :param min_y: Only labels with a y greater than this are considered
+    :return: Label with the smallest distance (rounded to whole pixels) of its top left corner to (x, y), the first one
+        in the original list if several are equally close
+    """
+    best = None
+    start = bisect_left(rows, (y,))
+    # rows above (x, y) from the closest one upwards, then the rows below
+    for candidates in (rows[start - 1::-1] if start else [], rows[start:]):
+        for label_y, order, label in candidates:
+            # all further labels are at least as far away in y alone
+            if best is not None and abs(label_y - y) > best[0] + 1:
+                break
+            if min_y is not None and label_y <= min_y:
+                if label_y < y:
+                    break
+                continue
+            candidate = (round(math.dist((x, y), (label['x'], label_y)), 0), order, label)
+            if best is None or candidate[:2] < best[:2]:
+                best = candidate
+    return best[2] if best is not None else None
+
+
+def _remove_row(rows: list[tuple[int, int, dict]], label: dict):
+    rows.pop(next(i for i in range(bisect_left(rows, (label['y'],)), len(rows)) if rows[i][2] is label))
+
+
 def consolidate_overlapping_names(items_by_quality):
     items_to_remove = {}
     for quality in items_by_quality:
+        rows = _rows(items_by_quality[quality])
+        order = {id(label): i for i, label in enumerate(items_by_quality[quality])}
         for item in items_by_quality[quality]:
             overlapping_item = None
-            for item_to_check in items_by_quality[quality]:
-                if item == item_to_check or abs(item['y'] - item_to_check['y']) > 3:
+            for item_to_check in _in_rows(rows, item['y'] - 3, item['y'] + 3):
+                if item == item_to_check:
                     continue
                 if quality in items_to_remove:
                     if item in items_to_remove[quality] or item_to_check in items_to_remove[quality]:
@@ -273,7 +425,10 @@ def consolidate_overlapping_names(items_by_quality):
                 first_item['text'] = new_text
                 first_item['name'] = new_text
                 first_item['x'] = first_item['x'] if second_item['x'] > first_item['x'] else second_item['x']
-                first_item['y'] = first_item['y'] if second_item['y'] > first_item['y'] else second_item['y']
+                if second_item['y'] < first_item['y']:
+                    _remove_row(rows, first_item)
+                    first_item['y'] = second_item['y']
+                    insort(rows, (first_item['y'], order[id(first_item)], first_item))
                 first_item['w'] = second_item['x'] + second_item['w'] - first_item['x']
                 first_item['h'] = first_item['h']
                 if quality not in items_to_remove:
@@ -285,24 +440,16 @@ def consolidate_overlapping_names(items_by_quality):
 
 
 def consolidate_rares(items_by_quality):
-    for item in items_by_quality[ItemQuality.Rare.value]:
-        closest_dist = 99999
-        closest_base = None
-        d2data_base = None
+    rares = items_by_quality[ItemQuality.Rare.value]
+    # bases are not changed below, their rows stay valid
+    base_rows = _rows([item for item in rares if d2data_lookup.is_base(item['text'])])
+    bases_to_remove = []
+    for item in rares:
         if not d2data_lookup.is_base(item['text']):
-            for base in items_by_quality[ItemQuality.Rare.value]:
-                if d2data_lookup.is_base(base['text']):
-                    base_item = d2data_lookup.get_base(base['text'])
-                    dist = round(math.dist(
-                        (item['x'], item['y']),
-                        (base['x'], base['y'])
-                        ), 0)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_base = base
-                        d2data_base = base_item
+            closest_base = _closest_label(base_rows, item['x'], item['y'])
             if not closest_base:
-                return
+                break
+            d2data_base = d2data_lookup.get_base(closest_base['text'])
             item['x'] = item['x'] if closest_base['x'] > item['x'] else closest_base['x']
             item['y'] = item['y'] if closest_base['y'] > item['y'] else closest_base['y']
             item['w'] = item['w'] if closest_base['w'] < item['w'] else closest_base['w']
@@ -310,28 +457,24 @@ def consolidate_rares(items_by_quality):
             item['base'] = d2data_base
             item['item'] = d2data_base
             item['identified'] = True
-            items_by_quality[ItemQuality.Rare.value].remove(closest_base)
+            # each base belongs to one name, it is removed from the rares after the loop
+            _remove_row(base_rows, closest_base)
+            bases_to_remove.append(closest_base)
+    for base in bases_to_remove:
+        rares.remove(base)
 
 
 def consolidate_quality(quality_items, potential_bases):
     bases_to_remove = []
+    base_rows = _rows([base for base in potential_bases if d2data_lookup.is_base(base['text'])])
     for item in quality_items:
         if not d2data_lookup.is_base(item['text']):
             # result = d2data_lookup.find_item_by_display_name(item['text'])
             result = d2data_lookup.find_set_or_unique_item_by_name(item['text'], item['quality'])
             if not result:
                 continue
-            closest_dist = 99999
-            closest_base = None
-            for base in potential_bases:
-                if base['y'] > item['y'] and d2data_lookup.is_base(base['text']):
-                    dist = round(math.dist(
-                        (item['x'], item['y']),
-                        (base['x'], base['y'])
-                        ), 0)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_base = base
+            # closest base below the name
+            closest_base = _closest_label(base_rows, item['x'], item['y'], min_y=item['y'])
             if not closest_base:
                 continue
             item['x'] = item['x'] if closest_base['x'] > item['x'] else closest_base['x']
@@ -342,6 +485,7 @@ def consolidate_quality(quality_items, potential_bases):
             item['name'] = result['DisplayName']
             item['base'] = d2data_lookup.get_base(closest_base['text'])
             item['identified'] = True
+            _remove_row(base_rows, closest_base)
             bases_to_remove.append(closest_base)
     for base_to_remove in bases_to_remove:
         potential_bases.remove(base_to_remove)
@@ -352,6 +496,8 @@ def find_base_and_remove_items_without_a_base(items_by_quality) -> dict:
     gray_normal_magic_removed = {}
     items_to_add = {}
     resolved_runewords = []
+    # rows of the gray labels, built when the first runeword needs its base
+    gray_rows = None
     for quality in items_by_quality:
         if quality in [ItemQuality.Gray.value, ItemQuality.Normal.value, ItemQuality.Magic]:
             gray_normal_magic_removed.update(set_gray_and_normal_and_magic_base_items(items_by_quality))
@@ -360,17 +506,17 @@ def find_base_and_remove_items_without_a_base(items_by_quality) -> dict:
             if not normalized_text in base_items() and not any(chr.isdigit() for chr in item['text']) and not gold_regex.search(item['text']):
                 item['text'] = f"{quality_keyword} {fuzzy_base_item_match(normalized_text)}".strip()
             if 'base' not in item:
+                label_class = d2data_lookup.classify(item['text'])
                 if quality == ItemQuality.Magic.value:
-                    base = d2data_lookup.get_base(item['text'])
-                    if base:
-                        item['base'] = base
+                    if label_class.base:
+                        item['base'] = label_class.base
                 elif quality == ItemQuality.Rune.value:
-                    if d2data_lookup.is_rune(item['text']):
-                        item['base'] = d2data_lookup.get_rune(item['text'])
-                        item['item'] = d2data_lookup.get_rune(item['text'])
+                    if label_class.rune is not None:
+                        item['base'] = label_class.rune
+                        item['item'] = label_class.rune
                         item['identified'] = True
-                elif d2data_lookup.is_base(item['text']):
-                    item['base'] = d2data_lookup.get_base(item['text'])
+                elif label_class.base is not None:
+                    item['base'] = label_class.base
                     item['name'] = item['base']['DisplayName']
                 else:
                     if quality not in items_to_remove:
@@ -407,17 +553,11 @@ def find_base_and_remove_items_without_a_base(items_by_quality) -> dict:
                             unique_item['identified'] = True
             elif quality == ItemQuality.Runeword.value:
                 if 'item' not in item:
-                    closest_dist = 99999
-                    closest_base = None
-                    for possible_base in items_by_quality[ItemQuality.Gray.value]:
-                        dist = round(math.dist(
-                            (item['x'], item['y']),
-                            (possible_base['x'], possible_base['y'])
-                            ), 0)
-                        if dist < closest_dist:
-                            closest_dist = dist
-                            closest_base = possible_base
+                    if gray_rows is None:
+                        gray_rows = _rows(items_by_quality[ItemQuality.Gray.value])
+                    closest_base = _closest_label(gray_rows, item['x'], item['y'])
                     if closest_base:
+                        _remove_row(gray_rows, closest_base)
                         closest_base['quality'] = ItemQuality.Runeword
                         closest_base['name'] = item['text']
                         closest_base['x'] = item['x'] if item['x'] < closest_base['x'] else closest_base['x']
@@ -500,11 +640,12 @@ def set_gray_and_normal_and_magic_base_items(items_by_quality):
                     if quality_keyword:
                         item['quality'] = quality_keyword
                 else:
-                    if d2data_lookup.is_consumable(item['text']):
-                        item['base'] = d2data_lookup.get_consumable(item['text'])
+                    label_class = d2data_lookup.classify(item['text'])
+                    if label_class.consumable is not None:
+                        item['base'] = label_class.consumable
                         item['name'] = item['base']['DisplayName']
-                    elif d2data_lookup.is_gem(item['text']):
-                        item['base'] = d2data_lookup.get_gem(item['text'])
+                    elif label_class.gem is not None:
+                        item['base'] = label_class.gem
                         item['name'] = item['base']['DisplayName']
                     else:
                         if quality not in items_to_remove:
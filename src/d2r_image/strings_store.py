@@ -1,4 +1,5 @@
 from functools import cache
+from utils.fuzzy_index import FuzzyIndex
 
 _WORD_LIST_DIR = "assets/word_lists"
 
@@ -7,6 +8,10 @@ def all_words():
     with open(f"{_WORD_LIST_DIR}/all_words.txt", 'r') as f:
         return set(line.strip() for line in f.read().splitlines())
 
+@cache
+def all_words_index() -> FuzzyIndex:
+    return FuzzyIndex.open(f"{_WORD_LIST_DIR}/all_words.index.json", all_words())
+
 @cache
 def base_items():
     with open(f"{_WORD_LIST_DIR}/base_items.txt", 'r') as f:
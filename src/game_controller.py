@@ -6,6 +6,7 @@ from utils.auto_settings import check_settings
 from bot import Bot
 from config import Config
 from death_manager import DeathManager
+from d2r_image.ocr import warm_up_engines
 from game_recovery import GameRecovery
 from game_stats import GameStats
 from health_manager import HealthManager
@@ -104,6 +105,8 @@ class GameController:
             Logger.warning("Your D2R settings differ from the requiered ones. Please use Auto Settings to adjust them. The differences are:")
             Logger.warning(f"{diff}")
         set_d2r_always_on_top()
+        # load the OCR models while the rest is starting up
+        threading.Thread(target=warm_up_engines, daemon=True, name="OCR-warm-up").start()
         self.setup_screen()
         self.start_health_manager_thread()
         self.start_death_manager_thread()
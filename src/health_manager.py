@@ -6,7 +6,7 @@ import keyboard
 from utils.custom_mouse import mouse
 from utils.misc import wait
 from logger import Logger
-from screen import grab
+from screen import grab, grab_registered_rois, register_roi, FRAME_INTERVAL
 import time
 from config import Config
 from inventory import common
@@ -16,6 +16,9 @@ from random import uniform
 
 pause_state = True
 panel_check_paused = False
+# regions checked every frame, everything else only needs a full frame every few frames
+VITALS_ROIS = ["gamebar_anchor", "health_slice", "mana_slice"]
+FULL_FRAME_CHECK_INTERVAL = 3 * FRAME_INTERVAL
 
 def get_pause_state():
     return pause_state
@@ -50,6 +53,7 @@ class HealthManager:
         self._callback = None
         self._last_chicken_screenshot = None
         self._count_panel_detects = 0
+        self._last_full_frame_check = 0
 
     def stop_monitor(self):
         self._do_monitor = False
@@ -80,21 +84,48 @@ class HealthManager:
         self._did_chicken = True
         set_pause_state(True)
 
+    def _check_full_frame(self, img):
+        # check merc
+        if any([Config().char[x] for x in ["heal_rejuv_merc", "merc_chicken", "heal_merc"]]):
+            if is_visible(ScreenObjects.MercIcon, img):
+                merc_health_percentage = meters.get_merc_health(img)
+                merc_hp_potion_delay = 0 if merc_health_percentage == 1 else uniform(9, 10)
+                last_drink = time.time() - self._last_merc_heal
+                if Config().char["merc_chicken"] and (merc_health_percentage <= Config().char["merc_chicken"]):
+                    Logger.warning(f"Trying to chicken, merc HP {(merc_health_percentage*100):.1f}%!")
+                    self._do_chicken(img)
+                if Config().char["heal_rejuv_merc"] and (merc_health_percentage <= Config().char["heal_rejuv_merc"] and last_drink > 4.0):
+                    belt.drink_potion("rejuv", merc=True, stats=[merc_health_percentage])
+                    self._last_merc_heal = time.time()
+                elif Config().char["heal_merc"] and (merc_health_percentage <= Config().char["heal_merc"] and last_drink > merc_hp_potion_delay):
+                    belt.drink_potion("health", merc=True, stats=[merc_health_percentage])
+                    self._last_merc_heal = time.time()
+        if not get_panel_check_paused() and (is_visible(ScreenObjects.LeftPanel, img) or is_visible(ScreenObjects.RightPanel, img)):
+            Logger.warning(f"Found an open inventory / quest / skill / stats page. Close it.")
+            self._count_panel_detects += 1
+            if self._count_panel_detects >= 2:
+                self._count_panel_detects = 0
+                Logger.warning(f"Found an open inventory / quest / skill / stats page again. Chicken to dismiss.")
+                self._do_chicken(img)
+            common.close()
+
     def start_monitor(self):
         Logger.info("Start health monitoring")
         self._do_monitor = True
         self._did_chicken = False
         start = time.time()
+        for key in VITALS_ROIS:
+            register_roi(key, Config().ui_roi[key])
 
         while self._do_monitor:
             if self._did_chicken or get_pause_state():
                 wait(1)
                 continue
             fn_start = time.perf_counter()
-            img = grab()
-            if is_visible(ScreenObjects.InGame, img):
-                health_percentage = meters.get_health(img)
-                mana_percentage = meters.get_mana(img)
+            vitals = grab_registered_rois()
+            if is_visible(ScreenObjects.InGame, vitals["gamebar_anchor"], cropped=True):
+                health_percentage = meters.get_health(vitals["health_slice"], cropped=True)
+                mana_percentage = meters.get_mana(vitals["mana_slice"], cropped=True)
 
                 lp_hp_potion_delay = 0 if health_percentage >= 0.99 else uniform(9, 10)
                 lp_mp_potion_delay = 0 if mana_percentage >= 0.99 else uniform(9, 10)
@@ -116,39 +147,18 @@ class HealthManager:
                     # give the chicken a 6 sec delay to give time for a healing pot and avoid endless loop of chicken
                     elif health_percentage <= Config().char["chicken"] and (time.time() - start) > 6:
                         Logger.warning(f"Trying to chicken, player HP {(health_percentage*100):.1f}%!")
-                        self._do_chicken(img)
+                        self._do_chicken(grab())
                     # check mana
                     last_drink = time.time() - self._last_mana
                     if mana_percentage <= Config().char["take_mana_potion"] and last_drink > lp_mp_potion_delay:
                         belt.drink_potion("mana", stats=[health_percentage, mana_percentage])
                         self._last_mana = time.time()
-                # check merc
-                if any([Config().char[x] for x in ["heal_rejuv_merc", "merc_chicken", "heal_merc"]]):
-                    if is_visible(ScreenObjects.MercIcon, img):
-                        merc_health_percentage = meters.get_merc_health(img)
-                        merc_hp_potion_delay = 0 if merc_health_percentage == 1 else uniform(9, 10)
-                        last_drink = time.time() - self._last_merc_heal
-                        if Config().char["merc_chicken"] and (merc_health_percentage <= Config().char["merc_chicken"]):
-                            Logger.warning(f"Trying to chicken, merc HP {(merc_health_percentage*100):.1f}%!")
-                            self._do_chicken(img)
-                        if Config().char["heal_rejuv_merc"] and (merc_health_percentage <= Config().char["heal_rejuv_merc"] and last_drink > 4.0):
-                            belt.drink_potion("rejuv", merc=True, stats=[merc_health_percentage])
-                            self._last_merc_heal = time.time()
-                        elif Config().char["heal_merc"] and (merc_health_percentage <= Config().char["heal_merc"] and last_drink > merc_hp_potion_delay):
-                            belt.drink_potion("health", merc=True, stats=[merc_health_percentage])
-                            self._last_merc_heal = time.time()
-                if not get_panel_check_paused() and (is_visible(ScreenObjects.LeftPanel, img) or is_visible(ScreenObjects.RightPanel, img)):
-                    Logger.warning(f"Found an open inventory / quest / skill / stats page. Close it.")
-                    self._count_panel_detects += 1
-                    if self._count_panel_detects >= 2:
-                        self._count_panel_detects = 0
-                        Logger.warning(f"Found an open inventory / quest / skill / stats page again. Chicken to dismiss.")
-                        self._do_chicken(img)
-                    common.close()
-            fn_end = time.perf_counter()
-            wait_time = 3/25 - (fn_start - fn_end)
+                if not self._did_chicken and fn_start - self._last_full_frame_check >= FULL_FRAME_CHECK_INTERVAL:
+                    self._last_full_frame_check = fn_start
+                    self._check_full_frame(grab())
+            wait_time = FRAME_INTERVAL - (time.perf_counter() - fn_start)
             if wait_time > 0:
-                wait(wait_time) # wait 3 frames before rechecking
+                wait(wait_time) # wait 1 frame before rechecking the vitals
         Logger.debug("Stop health monitoring")
 
 
@@ -7,7 +7,7 @@ from inventory import common, personal
 from ui import view
 from ui_manager import is_visible, wait_until_visible, ScreenObjects, wait_until_hidden
 from utils.custom_mouse import mouse
-from utils.misc import cut_roi, wait, color_filter
+from utils.misc import cut_roi, wait, color_mask
 from config import Config
 from screen import convert_abs_to_monitor, convert_monitor_to_screen, convert_screen_to_monitor, grab
 import keyboard
@@ -46,13 +46,13 @@ def _potion_type(img: np.ndarray) -> str:
         return "empty"
     score_list = []
     # rejuv
-    mask, _ = color_filter(img, Config().colors["rejuv_potion"])
+    mask = color_mask(img, Config().colors["rejuv_potion"])
     score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
     # health
-    mask, _ = color_filter(img, Config().colors["health_potion"])
+    mask = color_mask(img, Config().colors["health_potion"])
     score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
     # mana
-    mask, _ = color_filter(img, Config().colors["mana_potion"])
+    mask = color_mask(img, Config().colors["mana_potion"])
     score_list.append((float(np.sum(mask)) / mask.size) * (1/255.0))
     # find max score
     max_val = np.max(score_list)
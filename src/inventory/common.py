@@ -7,13 +7,13 @@ import itertools
 from utils.custom_mouse import mouse
 from ui_manager import detect_screen_object, ScreenObjects, is_visible, wait_until_hidden, center_mouse
 import template_finder
-from utils.misc import wait, trim_black, color_filter, cut_roi
+from utils.misc import wait, trim_black, color_mask, cut_roi
 from item import consumables
 from ui import view
 from screen import convert_screen_to_monitor, grab
 from logger import Logger
 from template_finder import TemplateMatch
-from d2r_image import ocr
+from d2r_image import ocr, glyph_ocr
 
 def get_slot_pos_and_img(img: np.ndarray, column: int, row: int) -> tuple[tuple[int, int],  np.ndarray]:
     """
@@ -82,9 +82,9 @@ def calc_item_roi(img_pre, img_post):
         gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
         diff_thresh = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)[1]
 
-        blue_mask, _ = color_filter(img_pre, Config().colors["blue_slot"])
-        red_mask, _ = color_filter(img_pre, Config().colors["red_slot"])
-        green_mask, _ = color_filter(img_post, Config().colors["green_slot"])
+        blue_mask = color_mask(img_pre, Config().colors["blue_slot"])
+        red_mask = color_mask(img_pre, Config().colors["red_slot"])
+        green_mask = color_mask(img_post, Config().colors["green_slot"])
 
         blue_red_mask = np.bitwise_or(blue_mask, red_mask)
         final = np.bitwise_and.reduce([blue_red_mask, green_mask, diff_thresh])
@@ -136,23 +136,27 @@ def read_gold(img: np.ndarray = None, type: str = "inventory"):
         return False
     img = img if img is not None else grab()
     img = cut_roi(img, Config().ui_roi[f"{type}_gold_digits"])
-    # _, img = color_filter(img, Config().colors["gold_numbers"])
-    img = np.pad(img, pad_width=[(8, 8),(8, 8),(0, 0)], mode='constant')
-    ocr_result = ocr.image_to_text(
-        images = img,
-        model = "hover-eng_inconsolata_inv_th_fast",
-        psm = 13,
-        scale = 1.2,
-        crop_pad = False,
-        erode = False,
-        invert = False,
-        threshold = 76,
-        digits_only = True,
-        fix_regexps = False,
-        check_known_errors = False,
-        correct_words = False,
-    )[0]
-    number=int(ocr_result.text.strip())
+    glyphs = glyph_ocr.read_glyphs(glyph_ocr.text_intensity(img, 76))
+    if glyphs.confidence >= glyph_ocr.MIN_CONFIDENCE and glyphs.text.isdigit():
+        number = int(glyphs.text)
+    else:
+        # _, img = color_filter(img, Config().colors["gold_numbers"])
+        img = np.pad(img, pad_width=[(8, 8),(8, 8),(0, 0)], mode='constant')
+        ocr_result = ocr.image_to_text(
+            images = img,
+            model = "hover-eng_inconsolata_inv_th_fast",
+            psm = 13,
+            scale = 1.2,
+            crop_pad = False,
+            erode = False,
+            invert = False,
+            threshold = 76,
+            digits_only = True,
+            fix_regexps = False,
+            check_known_errors = False,
+            correct_words = False,
+        )[0]
+        number=int(ocr_result.text.strip())
     Logger.debug(f"{type.upper()} gold: {number}")
     return number
 
@@ -170,13 +174,13 @@ def left_inventory_ready(img = np.ndarray):
     # on laggy PC's or online the vendor may take longer to have all of its inventory ready
     if is_visible(ScreenObjects.LeftPanel, img):
         # check for tab text
-        text, _ = color_filter(img, Config().colors["tab_text"])
+        text = color_mask(img, Config().colors["tab_text"])
         text = cut_roi(text, Config().ui_roi["left_inventory_tabs"])
         # check for red slots in inventory space
-        red, _ = color_filter(img, Config().colors["red_slot"])
+        red = color_mask(img, Config().colors["red_slot"])
         red = cut_roi(red, Config().ui_roi["left_inventory"])
         # check for blue slots in inventory space
-        blue, _ = color_filter(img, Config().colors["blue_slot"])
+        blue = color_mask(img, Config().colors["blue_slot"])
         blue = cut_roi(blue, Config().ui_roi["left_inventory"])
         # if none of the above are true, then inventory is empty and there are no tabs (not loaded yet)
         return any(np.sum(i) > 0 for i in [text, red, blue])
@@ -230,7 +234,7 @@ if __name__ == "__main__":
     import keyboard
     from config import Config
     from screen import start_detecting_window, stop_detecting_window
-    from utils.misc import color_filter
+    from utils.misc import color_mask
     start_detecting_window()
     keyboard.add_hotkey('f12', lambda: Logger.info('Force Exit (f12)') or stop_detecting_window() or os._exit(1))
     print("Move to d2r window and press f11")
@@ -244,7 +248,7 @@ if __name__ == "__main__":
         img = grab()
 
         a = cut_roi(img, Config().ui_roi["deposit_ok"])
-        b, _ = color_filter(img, Config().colors["tab_text"])
+        b = color_mask(img, Config().colors["tab_text"])
 
         print(np.sum(b))
 
@@ -21,7 +21,7 @@ from d2r_image.data_models import HoveredItem, ItemText
 from screen import grab, convert_screen_to_monitor
 from item import consumables
 from bnip.NTIPAliasStat import NTIPAliasStat as NTIP_STATS
-from bnip.actions import should_id, should_keep
+from bnip.actions import needs_stats, should_id, should_keep
 
 inv_gold_full = False
 messenger = Messenger()
@@ -194,6 +194,15 @@ def log_item_fail(hovered_item, slot):
     if Config().general["info_screenshots"]:
         cv2.imwrite("./log/screenshots/info/failed_item_box_" + time.strftime("%Y%m%d_%H%M%S") + ".png", hovered_item)
 
+def _read_hovered_item(hovered_item: np.ndarray) -> tuple[HoveredItem, ItemText]:
+    """
+    Reads the name and base of the hovered item and its stat lines only if the pickit rules for it depend on them
+    """
+    item_properties, item_box = d2r_image.get_hovered_item(hovered_item, header_only=True)
+    if item_box.pending_lines and (item_properties is None or needs_stats(item_properties.as_dict())):
+        item_properties, item_box = d2r_image.read_hovered_item_stats(item_box)
+    return item_properties, item_box
+
 def inspect_items(inp_img: np.ndarray = None, close_window: bool = True, game_stats: GameStats = None, ignore_sell: bool = False) -> list[BoxInfo]:
     """
     Iterate over all picked items in inventory--ID items and decide which to stash
@@ -227,7 +236,7 @@ def inspect_items(inp_img: np.ndarray = None, close_window: bool = True, game_st
         # get the item description box
         item_properties, item_box = (None, None)
         try: # ! This happens because we don't know the items slot count. To get more context remove the try and catch and see what happens
-            item_properties, item_box = d2r_image.get_hovered_item(hovered_item)
+            item_properties, item_box = _read_hovered_item(hovered_item)
         except Exception as e:
             Logger.error(f"personal.inspect_items(): Failed to get item properties for slot {slot}")
             failed = True
@@ -296,7 +305,7 @@ def inspect_items(inp_img: np.ndarray = None, close_window: bool = True, game_st
                         mouse.move(x_m, y_m, randomize = 4, delay_factor = delay)
                         wait(0.05, 0.1)
                         hovered_item = grab(True)
-                        item_properties, item_box = d2r_image.get_hovered_item(hovered_item)
+                        item_properties, item_box = _read_hovered_item(hovered_item)
 
                     if item_box is not None:
                         log_item(item_box, item_properties)
@@ -324,6 +333,9 @@ def inspect_items(inp_img: np.ndarray = None, close_window: bool = True, game_st
 
                         # if item is to be kept and is already ID'd or doesn't need ID, log and stash
                         if (box.keep and not box.need_id):
+                            if item_box.pending_lines:
+                                # kept items are reported with their complete tooltip
+                                item_properties = d2r_image.read_hovered_item_stats(item_box)[0] or item_properties
                             if game_stats is not None:
                                 game_stats.log_item_keep(item_name, True, item_box.img, item_box.ocr_result.text, expression, item_properties.as_dict())
                         # if item is to be kept or still needs to be sold or identified, append to list
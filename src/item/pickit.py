@@ -9,8 +9,9 @@ import uuid
 
 from char import IChar
 from config import Config
-from d2r_image import processing as d2r_image
 from d2r_image.data_models import GroundItemList, GroundItem, EnhancedJSONEncoder
+from d2r_image.ground_loot_tracker import GroundLootTracker
+from d2r_image.ocr import cascade_stats as ocr_cascade_stats, result_cache as ocr_cache, rule_stats as ocr_rule_stats
 from inventory import personal
 from item import consumables
 from item.consumables import ITEM_CONSUMABLES_MAP
@@ -37,6 +38,8 @@ class PickIt:
         self._fail_pickup_count = 0
         self._picked_up_items = []
         self._picked_up_item = False
+        # labels that are still on the ground after a pickup are not read again
+        self._loot_tracker = GroundLootTracker()
         self.timeout = 30
 
     @staticmethod
@@ -46,11 +49,10 @@ class PickIt:
             with open(f"log/screenshots/pickit/{_uuid }_{counter}.json", 'w', encoding='utf-8') as f:
                 json.dump(items, f, ensure_ascii=False, sort_keys=False, cls=EnhancedJSONEncoder, indent=2)
 
-    @staticmethod
-    def _locate_items() -> tuple[GroundItemList, ndarray]:
+    def _locate_items(self) -> tuple[GroundItemList, ndarray]:
         img = grab()
         start = time.time()
-        items = d2r_image.get_ground_loot(img).items.copy()
+        items = self._loot_tracker.get_ground_loot(img).items.copy()
         Logger.debug(f"Read {len(items)} ground items in {round(time.time() - start, 3)} seconds")
         items = sorted(items, key=lambda item: item.Distance)
         return items, img
@@ -61,6 +63,7 @@ class PickIt:
         self._fail_pickup_count = 0
         self._picked_up_items = []
         self._picked_up_item = False
+        self._loot_tracker.reset()
 
     @staticmethod
     def _ignore_gold(item: GroundItem):
@@ -181,6 +184,10 @@ class PickIt:
             item_count+=1
 
         keyboard.send(Config().char["show_items"])
+        self._loot_tracker.log_stats()
+        ocr_cache.log_stats()
+        ocr_cascade_stats.log()
+        ocr_rule_stats.log()
         return len(self._picked_up_items) >= 1
 
 
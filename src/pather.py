@@ -12,6 +12,7 @@ from config import Config
 from logger import Logger
 from screen import convert_screen_to_monitor, convert_abs_to_screen, convert_abs_to_monitor, convert_screen_to_abs, grab, stop_detecting_window
 import template_finder
+from template_tracker import TemplateTracker
 from char import IChar
 from ui_manager import detect_screen_object, ScreenObjects, is_visible, select_screen_object_match, get_closest_non_hud_pixel
 
@@ -91,6 +92,8 @@ class Pather:
     """
 
     def __init__(self):
+        # remembers where the node templates were found, see find_abs_node_pos()
+        self._tracker = TemplateTracker()
         self._range_x = [-Config().ui_pos["center_x"] + 7, Config().ui_pos["center_x"] - 7]
         self._range_y = [-Config().ui_pos["center_y"] + 7, Config().ui_pos["center_y"] - Config().ui_pos["skill_bar_height"] - 33]
         self._nodes = {
@@ -536,15 +539,21 @@ class Pather:
         return True
 
 
-    def find_abs_node_pos(self, node_idx: int, img: np.ndarray, threshold: float = 0.68) -> tuple[float, float]:
+    def find_abs_node_pos(self, node_idx: int, img: np.ndarray, threshold: float = 0.68, use_pyramid: bool = False, shift: tuple[float, float] = None) -> tuple[float, float]:
+        """
+        :param shift: Expected movement of the node templates on screen since the last call for this node (e.g. after moving the char)
+        """
         node = self._nodes[node_idx]
-        template_match = template_finder.search(
+        template_match = self._tracker.search(
             [*node],
             img,
+            context=node_idx,
+            shift=shift,
             best_match=False,
             threshold=threshold,
             roi=Config().ui_roi["cut_skill_bar"],
-            use_grayscale=True
+            use_grayscale=True,
+            use_pyramid=use_pyramid
         )
         if template_match.valid:
             # Get reference position of template in abs coordinates
@@ -604,6 +613,7 @@ class Pather:
             last_move = time.time()
             did_force_move = False
             teleport_count = 0
+            expected_shift = None
             while not continue_to_next_node:
                 img = grab(force_new=True)
                 # Handle timeout
@@ -621,6 +631,7 @@ class Pather:
                             if Config().general["info_screenshots"]:
                                 cv2.imwrite("./log/screenshots/info/info_pather_got_stuck_" + time.strftime("%Y%m%d_%H%M%S") + ".png", img)
                             Logger.error("Got stuck exit pather")
+                        self._tracker.log_stats()
                         return False
 
                 # Sometimes we get stuck at rocks and stuff, after a few seconds force a move into the last known direction
@@ -651,7 +662,8 @@ class Pather:
                 teleport_count += 1
 
                 # Find any template and calc node position from it
-                node_pos_abs = self.find_abs_node_pos(node_idx, img, threshold=threshold)
+                node_pos_abs = self.find_abs_node_pos(node_idx, img, threshold=threshold, shift=expected_shift)
+                expected_shift = None
                 if node_pos_abs is not None:
                     dist = math.dist(node_pos_abs, (0, 0))
                     if dist < Config().ui_pos["reached_node_dist"]:
@@ -662,7 +674,10 @@ class Pather:
                         char.move((x_m, y_m), force_tp=force_tp, force_move=force_move)
                         last_direction = node_pos_abs
                         last_move = time.time()
+                        # moving towards the node shifts the templates towards the opposite direction
+                        expected_shift = (-node_pos_abs[0], -node_pos_abs[1])
 
+        self._tracker.log_stats()
         return True
 
 
@@ -1,21 +1,33 @@
 import numpy as np
-from mss import mss
+import cv2
 from logger import Logger
 from utils.misc import WindowSpec, find_d2r_window, wait
 from config import Config
+from collections import deque
+from utils.frame import Frame
+from utils.capture import MssCapture, SessionWriter
 import threading
 import time
 
-sct = mss()
-monitor_roi = sct.monitors[0]
+# with 25fps we have 40ms per frame
+FRAME_INTERVAL = 1 / 25
+FRAME_BUFFER_SIZE = 8
+
+capture_backend = None
+session_writer = None
+monitor_roi = {"top": 0, "left": 0, "width": Config().ui_pos["screen_width"], "height": Config().ui_pos["screen_height"]}
 found_offsets = False
 monitor_x_range = None
 monitor_y_range = None
 detect_window = True
 detect_window_thread = None
-last_grab = None
-cached_img = None
-cached_img_lock = threading.Lock()
+produce_frames = False
+frame_producer_thread = None
+frame_buffer = deque(maxlen=FRAME_BUFFER_SIZE)
+frame_cond = threading.Condition()
+next_frame_id = 0
+registered_rois = {}
+registered_rois_lock = threading.Lock()
 
 FIND_WINDOW = WindowSpec(
     title_regex=Config().advanced_options["hwnd_window_title"],
@@ -33,6 +45,7 @@ def start_detecting_window():
         Logger.debug(f"Using WinAPI to search for window: {FIND_WINDOW}")
         detect_window_thread = threading.Thread(target=detect_window_position)
         detect_window_thread.start()
+    start_frame_producer()
 
 def detect_window_position():
     global detect_window
@@ -65,23 +78,169 @@ def set_window_position(offset_x: int, offset_y: int):
 def stop_detecting_window():
     global detect_window, detect_window_thread
     detect_window = False
+    stop_frame_producer()
     if detect_window_thread:
         detect_window_thread.join()
 
-def grab(force_new: bool = False) -> np.ndarray:
-    global monitor_roi
-    global cached_img
-    global last_grab
-    # with 25fps we have 40ms per frame. If we check for 20ms range to make sure we can still get each frame if we want.
-    if not force_new and cached_img is not None and last_grab is not None and time.perf_counter() - last_grab < 0.04:
-        return cached_img
-    else:
-        with cached_img_lock:
-            last_grab = time.perf_counter()
-        img = np.array(sct.grab(monitor_roi))
-        with cached_img_lock:
-            cached_img = img[:, :, :3]
-        return cached_img
+def get_capture_backend():
+    global capture_backend
+    if capture_backend is None:
+        capture_backend = MssCapture()
+    return capture_backend
+
+def set_capture_backend(backend):
+    """
+    Replaces the capture backend, e.g. with a utils.capture.ReplayCapture to run the vision code on a recorded session
+    :param backend: Object with a grab(region: dict) -> np.ndarray method returning a BGR or BGRA image of the region
+    """
+    global capture_backend
+    capture_backend = backend
+    with frame_cond:
+        frame_buffer.clear()
+
+def start_recording(path: str):
+    """
+    Records every captured full frame with its timestamp to a session file that can be replayed with utils.capture.ReplayCapture
+    """
+    global session_writer
+    stop_recording()
+    Logger.info(f"Recording frames to {path}")
+    session_writer = SessionWriter(path)
+
+def stop_recording():
+    global session_writer
+    if session_writer is not None:
+        writer, session_writer = session_writer, None
+        writer.close()
+
+def start_frame_producer():
+    """
+    Starts a single capture thread that publishes frames into the ring buffer. As long as it is running,
+    grab() and the frame functions below are served from the buffer instead of capturing on the calling thread.
+    """
+    global produce_frames, frame_producer_thread
+    produce_frames = True
+    if frame_producer_thread is None:
+        frame_producer_thread = threading.Thread(target=produce_frames_loop, daemon=True, name="Frame-producer")
+        frame_producer_thread.start()
+
+def stop_frame_producer():
+    global produce_frames, frame_producer_thread
+    produce_frames = False
+    if frame_producer_thread:
+        frame_producer_thread.join()
+        frame_producer_thread = None
+
+def frame_producer_running() -> bool:
+    return frame_producer_thread is not None and frame_producer_thread.is_alive()
+
+def produce_frames_loop():
+    while produce_frames:
+        # no point in capturing before we know where the d2r window is
+        if not found_offsets:
+            time.sleep(0.1)
+            continue
+        start = time.perf_counter()
+        _capture_frame()
+        remaining = FRAME_INTERVAL - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+    Logger.debug('Frame producer thread stopped')
+
+def _capture_frame() -> Frame:
+    global next_frame_id
+    img = get_capture_backend().grab(monitor_roi)[:, :, :3]
+    timestamp = time.perf_counter()
+    # frames are shared between all consumers, nobody is allowed to draw into them
+    img.flags.writeable = False
+    with frame_cond:
+        frame = Frame(frame_id=next_frame_id, timestamp=timestamp, img=img)
+        next_frame_id += 1
+        frame_buffer.append(frame)
+        frame_cond.notify_all()
+    if (writer := session_writer) is not None:
+        writer.write(img, timestamp)
+    return frame
+
+def latest_frame() -> Frame | None:
+    with frame_cond:
+        return frame_buffer[-1] if frame_buffer else None
+
+def frame_newer_than(frame_id: int) -> Frame | None:
+    """
+    Returns the latest buffered frame if it is newer than frame_id, otherwise None
+    """
+    frame = latest_frame()
+    return frame if frame is not None and frame.frame_id > frame_id else None
+
+def wait_for_frame(frame_id: int = None, timeout: float = 1.0) -> Frame | None:
+    """
+    Blocks until a frame newer than frame_id is published
+    :param frame_id: Frame ID the returned frame must be newer than. Defaults to the latest frame at call time.
+    :param timeout: Maximum time in seconds to wait for the frame producer
+    :return: The new frame or None in case of timeout. Captures directly if the frame producer is not running.
+    """
+    if not frame_producer_running():
+        return _capture_frame()
+    with frame_cond:
+        if frame_id is None:
+            frame_id = frame_buffer[-1].frame_id if frame_buffer else -1
+        if frame_cond.wait_for(lambda: frame_buffer and frame_buffer[-1].frame_id > frame_id, timeout):
+            return frame_buffer[-1]
+    return None
+
+def grab_frame(force_new: bool = False) -> Frame:
+    frame = latest_frame()
+    if frame_producer_running():
+        if frame is None or force_new or frame.age > 3 * FRAME_INTERVAL:
+            frame = wait_for_frame(frame.frame_id if frame is not None else -1, timeout=3 * FRAME_INTERVAL)
+        if frame is not None:
+            return frame
+    elif not force_new and frame is not None and frame.age < FRAME_INTERVAL:
+        return frame
+    return _capture_frame()
+
+def _capture_region(roi: list[int]) -> np.ndarray:
+    x, y, w, h = [int(v) for v in roi]
+    region = {"left": monitor_roi["left"] + x, "top": monitor_roi["top"] + y, "width": w, "height": h}
+    img = get_capture_backend().grab(region)
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR) if img.shape[2] == 4 else img
+
+def _grab_regions(rois: list[list[int]], force_new: bool = False) -> list[np.ndarray]:
+    frame = latest_frame()
+    if not force_new and frame is not None and frame.age < FRAME_INTERVAL:
+        return [np.ascontiguousarray(frame.img[y:y+h, x:x+w]) for x, y, w, h in rois]
+    return [_capture_region(roi) for roi in rois]
+
+def grab(force_new: bool = False, roi: list[int] | list[list[int]] = None) -> np.ndarray | list[np.ndarray]:
+    """
+    Grabs the current screen
+    :param force_new: Do not reuse a frame that is younger than FRAME_INTERVAL
+    :param roi: Optional region [left, top, width, height] or list of regions in screen coordinates.
+        Only these pixels are captured and returned as contiguous BGR arrays (a list if a list of regions was passed).
+    :return: Full (read-only) frame, or the requested region(s)
+    """
+    if roi is None:
+        return grab_frame(force_new).img
+    if np.ndim(roi) == 1:
+        return _grab_regions([roi], force_new)[0]
+    return _grab_regions(roi, force_new)
+
+def register_roi(key: str, roi: list[int]):
+    """
+    Registers a region that is sampled by grab_registered_rois(), e.g. the vitals checked by the health manager
+    """
+    with registered_rois_lock:
+        registered_rois[key] = [int(v) for v in roi]
+
+def unregister_roi(key: str):
+    with registered_rois_lock:
+        registered_rois.pop(key, None)
+
+def grab_registered_rois(force_new: bool = False) -> dict[str, np.ndarray]:
+    with registered_rois_lock:
+        keys, rois = list(registered_rois.keys()), list(registered_rois.values())
+    return dict(zip(keys, _grab_regions(rois, force_new)))
 
 # TODO: Move the below funcs to utils(?)
 
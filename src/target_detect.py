@@ -8,6 +8,7 @@ from utils.misc import color_filter, is_in_roi
 import json
 from dataclasses import dataclass
 from ui_manager import get_hud_mask
+from utils.frame import cached_hud_masked
 
 FILTER_RANGES=[
     {"erode": 1, "blur": 3, "lh": 38, "ls": 169, "lv": 50, "uh": 70, "us": 255, "uv": 255}, # poison
@@ -121,8 +122,8 @@ def _process_image(img, mask_char:bool=False, mask_hud:bool=True, erode:int=None
     """
     img = img
     if mask_hud:
-        img = cv2.bitwise_and(img, img, mask=get_hud_mask())
-    if mask_char: img = cv2.rectangle(img, (600,250), (700,400), (0,0,0), -1) # black out character by drawing a black box above him (e.g. ignore set glow)
+        img = cached_hud_masked(img)
+    if mask_char: img = cv2.rectangle(img.copy(), (600,250), (700,400), (0,0,0), -1) # black out character by drawing a black box above him (e.g. ignore set glow)
     if erode:
         kernel = np.ones((erode, erode), 'uint8')
         img = cv2.erode(img, kernel, None, iterations=1)
@@ -1,17 +1,35 @@
 import cv2
 import threading
 from screen import convert_screen_to_monitor, grab
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import numpy as np
 from logger import Logger
 import time
 import os
 from config import Config
-from utils.misc import cut_roi, load_template, list_files_in_folder, alpha_to_mask, roi_center, color_filter, mask_by_roi
+from utils.misc import cut_roi, load_template, alpha_to_mask, roi_center, color_filter, color_range_key
+from utils.frame import cached_gray
+from utils.template_pack import TEMPLATE_PATHS, TEMPLATE_PACK_PATH, open_pack, template_files, template_variants
 from functools import cache
+from concurrent.futures import ThreadPoolExecutor
 
 templates_lock = threading.Lock()
 
+# worker threads for matching several templates at once
+MATCH_WORKERS = min(4, os.cpu_count() or 1)
+_match_pool = None
+_match_pool_lock = threading.Lock()
+
+# pyramid matching (see search(use_pyramid=True)): the coarse match runs on images scaled by PYRAMID_SCALE, the best
+# PYRAMID_CANDIDATES positions are then refined at full resolution within REFINE_RADIUS pixels
+PYRAMID_SCALE = 0.5
+REFINE_RADIUS = 4
+PYRAMID_CANDIDATES = 3
+# templates smaller than this (in px, after scaling) are always matched at full resolution
+PYRAMID_MIN_SIZE = 8
+# per template overrides {template name: (scale, refine radius)}
+PYRAMID_SETTINGS = {}
+
 @dataclass
 class Template:
     name: str = None
@@ -19,6 +37,22 @@ class Template:
     img_bgr: np.ndarray = None
     img_gray: np.ndarray = None
     alpha_mask: np.ndarray = None
+    pyramid_scale: float = PYRAMID_SCALE
+    refine_radius: int = REFINE_RADIUS
+    # downscaled template images and masks by (scale, image kind)
+    _scaled: dict = field(default_factory=dict, repr=False)
+    # color_filter() results by color range key
+    _color_filtered: dict = field(default_factory=dict, repr=False)
+
+    def color_filtered(self, color_range: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        :param color_range: Color range (format Config().colors["color"])
+        :return: (mask, filtered image) of color_filter() on img_bgr, computed once per color range
+        """
+        key = color_range_key(color_range)
+        if (res := self._color_filtered.get(key)) is None:
+            res = self._color_filtered[key] = color_filter(self.img_bgr, color_range)
+        return res
 
 @dataclass
 class TemplateMatch:
@@ -31,33 +65,22 @@ class TemplateMatch:
     valid: bool = False
 
 
-TEMPLATE_PATHS = [
-    "assets\\templates",
-    "assets\\npc",
-    "assets\\shop",
-    "assets\\item_properties",
-    "assets\\chests",
-    "assets\\gamble",
-]
+def _make_template(key: str, variants: dict[str, np.ndarray]) -> Template:
+    template = Template(name = key, **variants)
+    if key in PYRAMID_SETTINGS:
+        template.pyramid_scale, template.refine_radius = PYRAMID_SETTINGS[key]
+    return template
 
 @cache
 def stored_templates() -> dict[Template]:
-    paths = []
+    # the pack (see build.py / utils/template_pack.py) is memory-mapped and only materialises the templates that are used
+    if (pack := open_pack(TEMPLATE_PACK_PATH, _make_template, TEMPLATE_PATHS)) is not None:
+        Logger.debug(f"Using template pack {TEMPLATE_PACK_PATH} ({len(pack)} templates)")
+        return pack
     templates = {}
-    for path in TEMPLATE_PATHS:
-        paths += list_files_in_folder(path)
-    for file_path in paths:
-        file_name: str = os.path.basename(file_path)
-        if file_name.lower().endswith('.png'):
-            key = file_name[:-4].upper()
-            template_img = load_template(file_path)
-            templates[key] = Template(
-                name = key,
-                img_bgra = template_img,
-                img_bgr = cv2.cvtColor(template_img, cv2.COLOR_BGRA2BGR),
-                img_gray = cv2.cvtColor(template_img, cv2.COLOR_BGRA2GRAY),
-                alpha_mask = alpha_to_mask(template_img)
-            )
+    for key, file_path in template_files(TEMPLATE_PATHS).items():
+        template_img = load_template(file_path)
+        templates[key] = _make_template(key, template_variants(template_img))
     return templates
 
 def get_template(key):
@@ -81,10 +104,12 @@ def _process_template_refs(ref: str | np.ndarray | list[str]) -> list[Template]:
             ))
     return templates
 
-def _single_template_match(template: Template, inp_img: np.ndarray = None, roi: list = None, color_match: list = None, use_grayscale: bool = False) -> TemplateMatch:
+def _prepare_image(inp_img: np.ndarray = None, roi: list = None, color_match: list = None, use_grayscale: bool = False) -> tuple[np.ndarray, list]:
+    """
+    Crops and converts the input image once, so it can be shared by all templates of a search
+    :return: prepared image and the roi it was cropped to
+    """
     inp_img = inp_img if inp_img is not None else grab()
-    template_match = TemplateMatch()
-
     # crop image to roi
     if roi is None:
         # if no roi is provided roi = full inp_img
@@ -94,36 +119,163 @@ def _single_template_match(template: Template, inp_img: np.ndarray = None, roi:
 
     # filter for desired color or make grayscale
     if color_match:
-        template_img,  = color_filter(template.img_bgr, color_match)[1],
         img = color_filter(img, color_match)[1]
     elif use_grayscale:
-        template_img = template.img_gray
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    else:
-        template_img = template.img_bgr
+        img = cached_gray(img)
+    return img, roi
+
+def _scaled_image(img: np.ndarray, scale: float, scaled_imgs: dict) -> np.ndarray:
+    # concurrent matches might scale the same image twice, that is fine
+    if (scaled := scaled_imgs.get(scale)) is None:
+        scaled = scaled_imgs[scale] = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return scaled
+
+def _scaled_template(template: Template, template_img: np.ndarray, kind: str | None, scale: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :param kind: Key the scaled template is cached under, None to not cache it (e.g. color filtered templates)
+    :return: scaled template image and mask
+    """
+    if kind is None or (scaled := template._scaled.get((scale, kind))) is None:
+        small = cv2.resize(template_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        mask = None
+        if template.alpha_mask is not None:
+            mask = cv2.resize(template.alpha_mask, (small.shape[1], small.shape[0]), interpolation=cv2.INTER_NEAREST)
+        scaled = (small, mask)
+        if kind is not None:
+            template._scaled[(scale, kind)] = scaled
+    return scaled
+
+def _match_pyramid(img: np.ndarray, small_img: np.ndarray, template: Template, template_img: np.ndarray, kind: str | None) -> tuple[float, tuple[int, int]]:
+    """
+    Coarse to fine matching: finds candidates on the scaled image and refines them at full resolution.
+    The returned score is a full resolution TM_CCOEFF_NORMED score, i.e. comparable to regular matching.
+    :return: best score and its position in img, score is -1 if no candidate could be refined
+    """
+    scale, radius = template.pyramid_scale, template.refine_radius
+    small_template, small_mask = _scaled_template(template, template_img, kind, scale)
+    res = cv2.matchTemplate(small_img, small_template, cv2.TM_CCOEFF_NORMED, mask = small_mask)
+    np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    th, tw = template_img.shape[:2]
+    sh, sw = small_template.shape[:2]
+    best_val, best_pos = -1.0, (0, 0)
+    for _ in range(PYRAMID_CANDIDATES):
+        _, _, _, (sx, sy) = cv2.minMaxLoc(res)
+        # suppress the candidate's neighbourhood, so the next one is at a different position
+        res[max(0, sy - sh // 2):sy + sh // 2 + 1, max(0, sx - sw // 2):sx + sw // 2 + 1] = -1
+        x, y = round(sx / scale), round(sy / scale)
+        x0, y0 = max(0, x - radius), max(0, y - radius)
+        window = img[y0:min(img.shape[0], y + th + radius), x0:min(img.shape[1], x + tw + radius)]
+        if window.shape[0] < th or window.shape[1] < tw:
+            continue
+        refined = cv2.matchTemplate(window, template_img, cv2.TM_CCOEFF_NORMED, mask = template.alpha_mask)
+        np.nan_to_num(refined, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        _, val, _, pos = cv2.minMaxLoc(refined)
+        if val > best_val:
+            best_val, best_pos = val, (x0 + pos[0], y0 + pos[1])
+    return best_val, best_pos
+
+def _pyramid_applicable(img: np.ndarray, template: Template, template_img: np.ndarray) -> bool:
+    scale = template.pyramid_scale
+    th, tw = template_img.shape[:2]
+    if not scale or min(th, tw) * scale < PYRAMID_MIN_SIZE:
+        return False
+    # not worth it if the image is not much bigger than the refine windows
+    return img.shape[0] > th + 4 * template.refine_radius and img.shape[1] > tw + 4 * template.refine_radius
+
+def _template_image(template: Template, color_match: list = None, use_grayscale: bool = False) -> tuple[np.ndarray, str | tuple]:
+    """
+    :return: template image to match with and the kind of image it is (key of scaled template cache)
+    """
+    if color_match:
+        return template.color_filtered(color_match)[1], color_range_key(color_match)
+    elif use_grayscale:
+        return template.img_gray, "gray"
+    return template.img_bgr, "bgr"
+
+def _template_match(name: str, score: float, x: int, y: int, template_img: np.ndarray) -> TemplateMatch:
+    template_match = TemplateMatch()
+    # save rectangle corresponding to matched region
+    rec_x = int(x)
+    rec_y = int(y)
+    rec_w = int(template_img.shape[1])
+    rec_h = int(template_img.shape[0])
+    template_match.region = [rec_x, rec_y, rec_w, rec_h]
+    template_match.region_monitor = [*convert_screen_to_monitor((rec_x, rec_y)), rec_w, rec_h]
+    template_match.center = roi_center(template_match.region)
+    template_match.center_monitor = convert_screen_to_monitor(template_match.center)
+    template_match.name = name
+    template_match.score = score
+    template_match.valid = True
+    return template_match
+
+def _match_prepared(
+    template: Template,
+    img: np.ndarray,
+    roi: list,
+    color_match: list = None,
+    use_grayscale: bool = False,
+    use_pyramid: bool = False,
+    scaled_imgs: dict = None
+) -> TemplateMatch:
+    template_match = TemplateMatch()
+    rx, ry = roi[:2]
+    template_img, kind = _template_image(template, color_match, use_grayscale)
 
     if not (img.shape[0] > template_img.shape[0] and img.shape[1] > template_img.shape[1]):
         Logger.error(f"Image shape and template shape are incompatible: {template.name}. Image: {img.shape}, Template: {template_img.shape}, roi: {roi}")
     else:
-        res = cv2.matchTemplate(img, template_img, cv2.TM_CCOEFF_NORMED, mask = template.alpha_mask)
-        np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
-        _, max_val, _, max_pos = cv2.minMaxLoc(res)
-
-        # save rectangle corresponding to matched region
-        rec_x = int((max_pos[0] + rx))
-        rec_y = int((max_pos[1] + ry))
-        rec_w = int(template_img.shape[1])
-        rec_h = int(template_img.shape[0])
-        template_match.region = [rec_x, rec_y, rec_w, rec_h]
-        template_match.region_monitor = [*convert_screen_to_monitor((rec_x, rec_y)), rec_w, rec_h]
-        template_match.center = roi_center(template_match.region)
-        template_match.center_monitor = convert_screen_to_monitor(template_match.center)
-        template_match.name = template.name
-        template_match.score = max_val
-        template_match.valid = True
+        if use_pyramid and _pyramid_applicable(img, template, template_img):
+            small_img = _scaled_image(img, template.pyramid_scale, scaled_imgs if scaled_imgs is not None else {})
+            max_val, max_pos = _match_pyramid(img, small_img, template, template_img, kind)
+        else:
+            res = cv2.matchTemplate(img, template_img, cv2.TM_CCOEFF_NORMED, mask = template.alpha_mask)
+            np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            _, max_val, _, max_pos = cv2.minMaxLoc(res)
+        template_match = _template_match(template.name, max_val, max_pos[0] + rx, max_pos[1] + ry, template_img)
 
     return template_match
 
+def _single_template_match(template: Template, inp_img: np.ndarray = None, roi: list = None, color_match: list = None, use_grayscale: bool = False) -> TemplateMatch:
+    img, roi = _prepare_image(inp_img, roi, color_match, use_grayscale)
+    return _match_prepared(template, img, roi, color_match, use_grayscale)
+
+def _get_match_pool() -> ThreadPoolExecutor:
+    global _match_pool
+    with _match_pool_lock:
+        if _match_pool is None:
+            _match_pool = ThreadPoolExecutor(max_workers=MATCH_WORKERS, thread_name_prefix="Template-match")
+        return _match_pool
+
+def match_templates(
+    ref: str | np.ndarray | list[str],
+    inp_img: np.ndarray,
+    roi: list[float] = None,
+    use_grayscale: bool = False,
+    color_match: list = False,
+    use_pyramid: bool = False,
+):
+    """
+    Matches all templates against a shared crop/conversion of inp_img. Multiple templates are matched on a worker pool,
+    cv2.matchTemplate releases the GIL.
+    Params are the same as for template_finder.search()
+    :return: Generator over one TemplateMatch per template in the order of ref. Closing it early cancels the pending matches.
+    """
+    templates = _process_template_refs(ref)
+    img, roi = _prepare_image(inp_img, roi, color_match, use_grayscale)
+    # downscaled versions of img for pyramid matching, shared by all templates
+    scaled_imgs = {}
+    if len(templates) < 2:
+        for template in templates:
+            yield _match_prepared(template, img, roi, color_match, use_grayscale, use_pyramid, scaled_imgs)
+        return
+    pool = _get_match_pool()
+    futures = [pool.submit(_match_prepared, template, img, roi, color_match, use_grayscale, use_pyramid, scaled_imgs) for template in templates]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
 
 def search(
     ref: str | np.ndarray | list[str],
@@ -132,7 +284,8 @@ def search(
     roi: list[float] = None,
     use_grayscale: bool = False,
     color_match: list = False,
-    best_match: bool = False
+    best_match: bool = False,
+    use_pyramid: bool = False
 ) -> TemplateMatch:
     """
     Search for a template in an image
@@ -143,14 +296,17 @@ def search(
     :param use_grayscale: Use grayscale template matching for speed up
     :param color_match: Pass a color to be used by misc.color_filter to filter both image of interest and template image (format Config().colors["color"])
     :param best_match: If list input, will search for list of templates by best match. Default behavior is first match.
+    :param use_pyramid: Match on downscaled images first and refine the best candidates at full resolution.
+        Much faster for large rois, scale and refine radius can be set per template (see PYRAMID_SETTINGS).
     :return: Returns a TemplateMatch object with a valid flag
     """
-    templates = _process_template_refs(ref)
     matches = []
-    for template in templates:
-        match = _single_template_match(template, inp_img, roi, color_match, use_grayscale)
+    results = match_templates(ref, inp_img, roi, use_grayscale, color_match, use_pyramid)
+    for match in results:
         if match.score >= threshold:
             if not best_match:
+                # first match in the order of ref, the remaining matches are cancelled
+                results.close()
                 return match
             else:
                 matches.append(match)
@@ -169,6 +325,7 @@ def search_and_wait(
     color_match: list = False,
     best_match: bool = False,
     suppress_debug: bool = False,
+    use_pyramid: bool = False,
 ) -> TemplateMatch:
     """
     Helper function that will loop and keep searching for a template
@@ -184,7 +341,7 @@ def search_and_wait(
         img = grab()
         is_loading_black_roi = np.average(img[:, 0:Config().ui_roi["loading_left_black"][2]]) < 1.0
         if not is_loading_black_roi or "LOADING" in ref:
-            template_match = search(ref, img, roi=roi, threshold=threshold, use_grayscale=use_grayscale, color_match=color_match, best_match=best_match)
+            template_match = search(ref, img, roi=roi, threshold=threshold, use_grayscale=use_grayscale, color_match=color_match, best_match=best_match, use_pyramid=use_pyramid)
             if template_match.valid:
                 break
     if not time_remains:
@@ -194,6 +351,31 @@ def search_and_wait(
     return template_match
 
 
+def _response_peaks(template: Template, img: np.ndarray, roi: list, threshold: float, max_peaks: int | None, color_match: list = None, use_grayscale: bool = False) -> list[TemplateMatch]:
+    """
+    Computes the response map of a template once and extracts all peaks above threshold.
+    Positions at which the template would overlap an already extracted peak are suppressed.
+    """
+    template_img, _ = _template_image(template, color_match, use_grayscale)
+    if not (img.shape[0] > template_img.shape[0] and img.shape[1] > template_img.shape[1]):
+        Logger.error(f"Image shape and template shape are incompatible: {template.name}. Image: {img.shape}, Template: {template_img.shape}, roi: {roi}")
+        return []
+    res = cv2.matchTemplate(img, template_img, cv2.TM_CCOEFF_NORMED, mask = template.alpha_mask)
+    np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    th, tw = template_img.shape[:2]
+    rx, ry = roi[:2]
+    peaks = []
+    while max_peaks is None or len(peaks) < max_peaks:
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if max_val < threshold:
+            break
+        peaks.append(_template_match(template.name, max_val, x + rx, y + ry, template_img))
+        res[max(0, y - th + 1):y + th, max(0, x - tw + 1):x + tw] = -1
+    return peaks
+
+def _overlap(a: list[float], b: list[float]) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
 def search_all(
     ref: str | np.ndarray | list[str],
     inp_img: np.ndarray,
@@ -201,24 +383,30 @@ def search_all(
     roi: list[float] = None,
     use_grayscale: bool = False,
     color_match: list = False,
+    max_results: int = None,
+    cross_template_suppression: bool = True,
 ) -> list[TemplateMatch]:
     """
-    Returns a list of all templates scoring above set threshold on the screen
+    Returns a list of all templates scoring above set threshold on the screen.
+    Every template is matched once, all instances are extracted from its response map (non-maximum suppression).
+    :param max_results: Maximum number of returned matches, the highest scores are kept
+    :param cross_template_suppression: Drop matches that overlap a higher scoring match of another template
     :Other params are the same as for template_finder.search()
-    :return: Returns a list of TemplateMatch objects
+    :return: Returns a list of TemplateMatch objects sorted by score
     """
     templates = _process_template_refs(ref)
+    img, roi = _prepare_image(inp_img, roi, color_match, use_grayscale)
+    if len(templates) < 2:
+        peaks = [_response_peaks(template, img, roi, threshold, max_results, color_match, use_grayscale) for template in templates]
+    else:
+        pool = _get_match_pool()
+        peaks = list(pool.map(lambda template: _response_peaks(template, img, roi, threshold, max_results, color_match, use_grayscale), templates))
     matches = []
-    img = inp_img.copy()
-    while True:
-        any_found = False
-        for template in templates:
-            match = _single_template_match(template, img, roi, color_match, use_grayscale)
-            if (ind_found := match.score >= threshold):
-                matches.append(match)
-                img = mask_by_roi(img, match.region, "inverse")
-                any_found |= ind_found
-        if not any_found:
+    for match in sorted((peak for template_peaks in peaks for peak in template_peaks), key=lambda obj: obj.score, reverse=True):
+        if cross_template_suppression and any(_overlap(match.region, other.region) for other in matches):
+            continue
+        matches.append(match)
+        if max_results is not None and len(matches) >= max_results:
             break
     return matches
 
@@ -0,0 +1,124 @@
+import threading
+import time
+from dataclasses import dataclass
+import numpy as np
+import template_finder
+from template_finder import TemplateMatch
+from logger import Logger
+
+
+@dataclass
+class TrackerStats:
+    # found in the window around the predicted position
+    hits: int = 0
+    # had a prediction, but had to fall back to searching the full roi
+    misses: int = 0
+    # no prediction available, searched the full roi right away
+    untracked: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        tracked = self.hits + self.misses
+        return self.hits / tracked if tracked else 0.0
+
+
+class TemplateTracker:
+    """
+    Remembers where templates were found per search context (e.g. a pather node). Repeated searches look in a small window
+    around the last position (or where it is predicted to be after a move) first and only fall back to the full roi if
+    no template scores above the threshold there.
+    """
+    def __init__(self, margin: int = 40, max_age: float = 2.0):
+        """
+        :param margin: Pixels the search window extends the last match region in every direction
+        :param max_age: Seconds after which a remembered position is not used anymore
+        """
+        self._margin = margin
+        self._max_age = max_age
+        self._last = {}
+        self._lock = threading.Lock()
+        self.stats: dict[object, TrackerStats] = {}
+
+    def _windows(self, context, names: list[str], roi: list[float], shift: tuple[float, float] | None) -> list[tuple[str, list[int]]]:
+        rx, ry, rw, rh = [int(v) for v in roi]
+        windows = []
+        now = time.perf_counter()
+        with self._lock:
+            for name in names:
+                if (last := self._last.get((context, name))) is None or now - last[1] > self._max_age:
+                    continue
+                x, y, w, h = last[0]
+                for dx, dy in [(0, 0)] if not shift else [(0, 0), shift]:
+                    x0, y0 = max(rx, int(x + dx) - self._margin), max(ry, int(y + dy) - self._margin)
+                    x1, y1 = min(rx + rw, int(x + dx) + w + self._margin), min(ry + rh, int(y + dy) + h + self._margin)
+                    # the window has to be bigger than the template
+                    if x1 - x0 > w and y1 - y0 > h:
+                        windows.append((name, [x0, y0, x1 - x0, y1 - y0]))
+        return windows
+
+    def _count(self, context, outcome: str):
+        with self._lock:
+            stats = self.stats.setdefault(context, TrackerStats())
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def _remember(self, context, match: TemplateMatch):
+        with self._lock:
+            self._last[(context, match.name)] = (match.region, time.perf_counter())
+
+    def search(
+        self,
+        ref: list[str],
+        inp_img: np.ndarray,
+        context = None,
+        shift: tuple[float, float] = None,
+        threshold: float = 0.68,
+        roi: list[float] = None,
+        use_grayscale: bool = False,
+        color_match: list = False,
+        best_match: bool = False,
+        use_pyramid: bool = False,
+    ) -> TemplateMatch:
+        """
+        Same as template_finder.search(), but tries the remembered positions first
+        :param ref: Key of a loaded template or list of such keys
+        :param context: Key that separates independent searches for the same templates, e.g. the pather node
+        :param shift: Expected movement of the templates on screen since the last search (e.g. after a teleport).
+            The window around the shifted position is searched in addition to the one around the last position.
+        :Other params are the same as for template_finder.search()
+        """
+        names = [ref.upper()] if type(ref) == str else [name.upper() for name in ref]
+        roi = roi if roi is not None else [0, 0, inp_img.shape[1], inp_img.shape[0]]
+        if windows := self._windows(context, names, roi, shift):
+            local_matches = []
+            for name, window in windows:
+                match = template_finder.search(name, inp_img, threshold=threshold, roi=window, use_grayscale=use_grayscale, color_match=color_match)
+                if match.valid:
+                    local_matches.append(match)
+                    if not best_match:
+                        break
+            if local_matches:
+                self._count(context, "hits")
+                match = max(local_matches, key=lambda m: m.score)
+                self._remember(context, match)
+                return match
+            self._count(context, "misses")
+        else:
+            self._count(context, "untracked")
+        match = template_finder.search(names, inp_img, threshold=threshold, roi=roi, use_grayscale=use_grayscale, color_match=color_match, best_match=best_match, use_pyramid=use_pyramid)
+        if match.valid:
+            self._remember(context, match)
+        return match
+
+    def reset(self, context = None):
+        """
+        Forgets the remembered positions of one context or, if None is passed, of all contexts
+        """
+        with self._lock:
+            self._last = {} if context is None else {key: val for key, val in self._last.items() if key[0] != context}
+
+    def log_stats(self):
+        with self._lock:
+            hits = sum(s.hits for s in self.stats.values())
+            misses = sum(s.misses for s in self.stats.values())
+            untracked = sum(s.untracked for s in self.stats.values())
+        Logger.debug(f"Template tracker: {hits} hits, {misses} misses, {untracked} untracked ({100 * hits / max(1, hits + misses):.1f}% hit rate)")
@@ -1,21 +1,24 @@
 import cv2
 import numpy as np
-from utils.misc import cut_roi, color_filter
+from utils.misc import cut_roi, color_mask
 from config import Config
 
-def get_health(img: np.ndarray) -> float:
+def get_health(img: np.ndarray, cropped: bool = False) -> float:
+    """
+    :param img: Full screen image or, if cropped is set, only the health_slice region (see screen.grab(roi=...))
+    """
     # red mask
-    health_img = cut_roi(img, Config().ui_roi["health_slice"])
-    mask, _ = color_filter(health_img, Config().colors["health_globe_red"])
+    health_img = img if cropped else cut_roi(img, Config().ui_roi["health_slice"])
+    mask = color_mask(health_img, Config().colors["health_globe_red"])
     health_percentage = (float(np.sum(mask)) / mask.size) * (1/255.0)
     # green (in case of poison)
-    mask, _ = color_filter(health_img, Config().colors["health_globe_green"])
+    mask = color_mask(health_img, Config().colors["health_globe_green"])
     health_percentage_green = (float(np.sum(mask)) / mask.size) * (1/255.0)
     return max(health_percentage, health_percentage_green)
 
-def get_mana(img: np.ndarray) -> float:
-    mana_img = cut_roi(img, Config().ui_roi["mana_slice"])
-    mask, _ = color_filter(mana_img, Config().colors["mana_globe"])
+def get_mana(img: np.ndarray, cropped: bool = False) -> float:
+    mana_img = img if cropped else cut_roi(img, Config().ui_roi["mana_slice"])
+    mask = color_mask(mana_img, Config().colors["mana_globe"])
     mana_percentage = (float(np.sum(mask)) / mask.size) * (1/255.0)
     return mana_percentage
 
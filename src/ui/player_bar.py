@@ -1,10 +1,13 @@
 from config import Config
 from screen import convert_screen_to_monitor, grab
 from utils.custom_mouse import mouse
-from utils.misc import cut_roi, wait
+from utils.misc import cut_roi, erode_to_black, wait
 from logger import Logger
 from config import Config
-from d2r_image import ocr
+from d2r_image import ocr, glyph_ocr
+
+# characters of the experience bar text
+XP_CHARSET = "0123456789EXPRIENC:,./"
 
 def get_experience():
     # mouseover exp bar
@@ -17,6 +20,9 @@ def get_experience():
 
     mouse.move(x_m, y_m-50, randomize = (8,1))
     crop = cut_roi(img, Config().ui_roi["xp_bar_text"])
+    glyphs = glyph_ocr.read_glyphs(glyph_ocr.text_intensity(erode_to_black(crop), 25), XP_CHARSET)
+    if glyphs.confidence >= glyph_ocr.MIN_CONFIDENCE and (exp := _parse_experience(glyphs.text, log_errors=False)) is not None:
+        return exp
     ocr_result = ocr.image_to_text(
         images = crop,
         model = "ground-eng_inconsolata_inv_th_fast",
@@ -31,16 +37,25 @@ def get_experience():
         correct_words = False
     )[0]
 
-    split_text = ocr_result.text.split(' ')
+    if (exp := _parse_experience(ocr_result.text)) is None:
+        return 0,0
+    return exp
 
+def _parse_experience(text: str, log_errors: bool = True) -> tuple[int, int] | None:
+    """
+    :param text: Text of the experience bar, e.g. "EXPERIENCE: 1,234,567 / 2,000,000"
+    :return: (current, required) experience, None if the text can not be parsed
+    """
+    split_text = text.split(' ')
     try:
         split_text = split_text[split_text.index("EXPERIENCE:"):]
         current_exp = int(split_text[1].replace(',', '').replace('.', ''))
         required_exp = int(split_text[3].replace(',', '').replace('.', ''))
         return current_exp, required_exp
     except Exception as e:
-        Logger.warning(f"EXP OCR Error: {split_text}. Exception: {e}")
-        return 0,0
+        if log_errors:
+            Logger.warning(f"EXP OCR Error: {split_text}. Exception: {e}")
+        return None
 
 
 if __name__ == "__main__":
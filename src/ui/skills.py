@@ -3,12 +3,12 @@ from logger import Logger
 import cv2
 import time
 import numpy as np
-from utils.misc import cut_roi, color_filter, wait
+from utils.misc import cut_roi, color_mask, wait
 from screen import grab
 from config import Config
 import template_finder
 from ui_manager import wait_until_visible, ScreenObjects
-from d2r_image import ocr
+from d2r_image import ocr, glyph_ocr
 
 def is_left_skill_selected(template_list: list[str]) -> bool:
     """
@@ -73,7 +73,10 @@ def get_skill_charges(img: np.ndarray = None):
     y = y + round(h/2)
     h = round(h/2 + 5)
     img = cut_roi(img, [x, y, w, h])
-    mask, _ = color_filter(img, Config().colors["skill_charges"])
+    mask = color_mask(img, Config().colors["skill_charges"])
+    glyphs = glyph_ocr.read_glyphs(mask)
+    if glyphs.confidence >= glyph_ocr.MIN_CONFIDENCE and glyphs.text.isdigit():
+        return int(glyphs.text)
     ocr_result = ocr.image_to_text(
         images = mask,
         model = "hover-eng_inconsolata_inv_th_fast",
@@ -32,6 +32,7 @@ class ScreenObject:
     use_grayscale: bool = False
     color_match: list[np.array] = None
     suppress_debug: bool = False
+    use_pyramid: bool = False
 
     def __call__(self, cls):
         cls._screen_object = self
@@ -265,8 +266,11 @@ class ScreenObjects:
         threshold=0.8,
     )
 
-def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None) -> TemplateMatch:
-    roi = Config().ui_roi[screen_object.roi] if screen_object.roi else None
+def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None, cropped: bool = False) -> TemplateMatch:
+    """
+    :param cropped: img only contains the screen object's roi (see screen.grab(roi=...)), match positions are relative to it
+    """
+    roi = Config().ui_roi[screen_object.roi] if screen_object.roi and not cropped else None
     img = grab() if img is None else img
     return template_finder.search(
         ref = screen_object.ref,
@@ -275,6 +279,7 @@ def detect_screen_object(screen_object: ScreenObject, img: np.ndarray = None) ->
         roi = roi,
         best_match = screen_object.best_match,
         use_grayscale = screen_object.use_grayscale,
+        use_pyramid = screen_object.use_pyramid,
         )
 
 def select_screen_object_match(match: TemplateMatch, delay_factor: tuple[float, float] = (0.9, 1.1)) -> None:
@@ -283,8 +288,8 @@ def select_screen_object_match(match: TemplateMatch, delay_factor: tuple[float,
     mouse.click("left")
     wait(0.05, 0.09)
 
-def is_visible(screen_object: ScreenObject, img: np.ndarray = None) -> bool:
-    return detect_screen_object(screen_object, img).valid
+def is_visible(screen_object: ScreenObject, img: np.ndarray = None, cropped: bool = False) -> bool:
+    return detect_screen_object(screen_object, img, cropped).valid
 
 def wait_until_visible(screen_object: ScreenObject, timeout: float = 30, suppress_debug: bool = False) -> TemplateMatch:
     if not (match := _wait_until(lambda: detect_screen_object(screen_object), lambda match: match.valid, timeout)[0]).valid:
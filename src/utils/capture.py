@@ -0,0 +1,164 @@
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from logger import Logger
+
+# Session files: a header followed by one record per frame. Each record is (timestamp, keyframe flag, payload size)
+# plus the zlib compressed payload. Keyframes store the raw BGR pixels, all other frames the xor with the previous
+# frame, which is mostly zeros for consecutive frames of the game and therefore compresses very well.
+SESSION_MAGIC = b"BOTTYREC"
+SESSION_VERSION = 1
+_HEADER = struct.Struct("<8sIIII")
+_RECORD = struct.Struct("<dBI")
+
+
+class MssCapture:
+    """
+    Captures the screen with mss. The mss instance is created on first use, so importing screen does not need a display.
+    """
+    def __init__(self):
+        self._sct = None
+
+    @property
+    def sct(self):
+        if self._sct is None:
+            from mss import mss
+            self._sct = mss()
+        return self._sct
+
+    def grab(self, region: dict) -> np.ndarray:
+        """
+        :param region: Dict with left, top, width and height in monitor coordinates
+        :return: BGRA image of the region
+        """
+        return np.array(self.sct.grab(region))
+
+
+class SessionWriter:
+    """
+    Writes frames to a session file. Compression and IO run on a writer thread, so the capturing thread is not slowed down.
+    Frames are queued by reference, they must not be modified after write() (screen frames are read-only).
+    """
+    def __init__(self, path: str, keyframe_interval: int = 50, compression_level: int = 1):
+        self._path = path
+        self._keyframe_interval = keyframe_interval
+        self._compression_level = compression_level
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True, name="Session-writer")
+        self._thread.start()
+
+    def write(self, img: np.ndarray, timestamp: float):
+        self._queue.put((img, timestamp))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write_loop(self):
+        prev = None
+        count = 0
+        with open(self._path, "wb") as f:
+            while (item := self._queue.get()) is not None:
+                img, timestamp = item
+                img = np.ascontiguousarray(img[:, :, :3])
+                if prev is None:
+                    f.write(_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, *img.shape[:2], 3))
+                elif img.shape != prev.shape:
+                    Logger.warning(f"Session recording: skipping frame with shape {img.shape}, expected {prev.shape}")
+                    continue
+                keyframe = prev is None or count % self._keyframe_interval == 0
+                payload = img if keyframe else np.bitwise_xor(img, prev)
+                data = zlib.compress(payload.tobytes(), self._compression_level)
+                f.write(_RECORD.pack(timestamp, keyframe, len(data)))
+                f.write(data)
+                prev = img
+                count += 1
+        Logger.debug(f"Session recording: wrote {count} frames to {self._path}")
+
+
+def read_session(path: str):
+    """
+    Generator over all frames of a session file
+    :return: (timestamp, BGR image) for each recorded frame
+    """
+    with open(path, "rb") as f:
+        magic, version, height, width, channels = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != SESSION_MAGIC or version != SESSION_VERSION:
+            raise ValueError(f"{path} is not a session recording (version {SESSION_VERSION})")
+        prev = None
+        while len(record := f.read(_RECORD.size)) == _RECORD.size:
+            timestamp, keyframe, size = _RECORD.unpack(record)
+            img = np.frombuffer(zlib.decompress(f.read(size)), dtype=np.uint8).reshape(height, width, channels)
+            if not keyframe:
+                img = np.bitwise_xor(img, prev)
+            prev = img
+            yield timestamp, img
+
+
+class ReplayCapture:
+    """
+    Plays back a session file instead of capturing the screen. Use screen.set_window_position(0, 0) when replaying,
+    the requested regions are then in the coordinates of the recorded frames.
+    """
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        """
+        :param path: Session file written by SessionWriter (see screen.start_recording())
+        :param realtime: Play frames at their recorded timing. Otherwise every full frame grab advances by one frame,
+            i.e. the session is processed as fast as the consumer can go.
+        :param loop: Start over at the end of the session, otherwise the last frame is repeated and finished is set
+        """
+        self._path = path
+        self._realtime = realtime
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._frames = None
+        self._current = None
+        self._next = None
+        self._start = None
+        self.finished = False
+        self.frame_count = 0
+        self._open()
+
+    def _open(self):
+        self._frames = read_session(self._path)
+        self._current = next(self._frames, None)
+        if self._current is None:
+            raise ValueError(f"{self._path} does not contain any frames")
+        self._next = next(self._frames, None)
+        self._start = None
+
+    def _advance(self):
+        if self._next is not None:
+            self._current = self._next
+            self._next = next(self._frames, None)
+        elif self._loop:
+            self._open()
+        else:
+            self.finished = True
+
+    def grab(self, region: dict) -> np.ndarray:
+        """
+        :param region: Dict with left, top, width and height in frame coordinates
+        :return: BGR image of the region
+        """
+        with self._lock:
+            height, width = self._current[1].shape[:2]
+            x, y, w, h = region["left"], region["top"], region["width"], region["height"]
+            full_frame = (x, y, w, h) == (0, 0, width, height)
+            if self._realtime:
+                now = time.perf_counter()
+                if self._start is None:
+                    self._start = (now, self._current[0])
+                target = self._start[1] + now - self._start[0]
+                while self._next is not None and self._next[0] <= target:
+                    self._advance()
+                if self._next is None and target > self._current[0]:
+                    self._advance()
+            elif full_frame and self.frame_count > 0:
+                self._advance()
+            if full_frame:
+                self.frame_count += 1
+            return self._current[1][y:y+h, x:x+w].copy()
@@ -0,0 +1,70 @@
+"""
+Compares erode_to_black() with the former iterative reconstruction on the test/assets ground loot frames, on the full
+frames (as in clean_img()) and on the label crops that are read with erode=True.
+
+    python src/utils/erode_benchmark.py [repeats]
+"""
+import os
+import sys
+import timeit
+import cv2
+import numpy as np
+from utils.misc import erode_to_black
+
+GROUND_LOOT_PATH = "test/assets/ground_loot"
+
+def reference_erode_to_black(img: np.ndarray, threshold: int = 14) -> np.ndarray:
+    """
+    Former implementation: grows the border pixels by dilation within the thresholded image until nothing changes
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)[1]
+    kernel = np.ones((3, 3), np.uint8)
+    marker = thresh.copy()
+    marker[1:-1, 1:-1] = 0
+    while True:
+        tmp = marker.copy()
+        marker = cv2.dilate(marker, kernel)
+        marker = cv2.min(thresh, marker)
+        difference = cv2.subtract(marker, tmp)
+        if cv2.countNonZero(difference) <= 0:
+            break
+    mask_r = cv2.bitwise_not(marker)
+    mask_color_r = cv2.cvtColor(mask_r, cv2.COLOR_GRAY2BGR)
+    return cv2.bitwise_and(img, mask_color_r)
+
+def load_images() -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    :return: Ground loot frames and the item label crops found on them
+    """
+    from d2r_image.processing_helpers import clean_img, find_item_labels
+    from d2r_image.processing_data import ITEM_COLORS
+    from utils.misc import color_classes
+    from config import Config
+    frames, labels = [], []
+    for filename in sorted(os.listdir(GROUND_LOOT_PATH)):
+        if filename.lower().endswith(".png"):
+            frame = cv2.imread(f"{GROUND_LOOT_PATH}/{filename}")
+            frames.append(frame)
+            cleaned = clean_img(frame)
+            color_bits = color_classes(cleaned, [Config().colors[key] for key in ITEM_COLORS])
+            for x, y, w, h, _ in find_item_labels(color_bits, cv2.cvtColor(cleaned, cv2.COLOR_BGR2GRAY)):
+                labels.append(cleaned[y:y+h, x:x+w])
+    return frames, labels
+
+def compare(images: list[np.ndarray], repeats: int) -> tuple[float, float, int]:
+    """
+    :return: Mean seconds per image of erode_to_black() and of the reference, number of images with a different result
+    """
+    mismatches = sum(not np.array_equal(erode_to_black(img), reference_erode_to_black(img)) for img in images)
+    fast = min(timeit.repeat(lambda: [erode_to_black(img) for img in images], number=1, repeat=repeats))
+    reference = min(timeit.repeat(lambda: [reference_erode_to_black(img) for img in images], number=1, repeat=repeats))
+    return fast / max(1, len(images)), reference / max(1, len(images)), mismatches
+
+if __name__ == "__main__":
+    import utils.download_test_assets # downloads assets if they don't already exist
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    frames, labels = load_images()
+    for name, images in (("frames", frames), ("labels", labels)):
+        fast, reference, mismatches = compare(images, repeats)
+        print(f"{len(images)} {name}: {1000 * fast:.2f}ms vs {1000 * reference:.2f}ms reference ({reference / max(fast, 1e-9):.0f}x), {mismatches} mismatches")
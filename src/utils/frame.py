@@ -0,0 +1,128 @@
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Callable
+import cv2
+import numpy as np
+
+# captured frames by the id() of the buffer their image is a view of. Entries disappear together with the frame,
+# so an id can not be reused while it is still in here.
+_live_frames = weakref.WeakValueDictionary()
+
+@dataclass(frozen=True, eq=False)
+class Frame:
+    """
+    A captured screen image plus lazily computed derived images (grayscale, HSV, HUD masked).
+    Each derived image is computed at most once per frame and, like the frame itself, is read-only.
+    """
+    frame_id: int
+    timestamp: float
+    img: np.ndarray
+    _derived: dict = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        _live_frames[id(_buffer_of(self.img))] = self
+
+    @property
+    def age(self) -> float:
+        return time.perf_counter() - self.timestamp
+
+    def gray(self, roi: tuple[int, int, int, int] = None) -> np.ndarray:
+        return self._derive("gray", roi, lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+
+    def hsv(self, roi: tuple[int, int, int, int] = None) -> np.ndarray:
+        return self._derive("hsv", roi, lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+
+    def hud_masked(self, roi: tuple[int, int, int, int] = None) -> np.ndarray:
+        # the mask only fits the full frame, regions are cropped from the masked frame
+        return self._derive("hud_masked", roi, lambda img: cv2.bitwise_and(img, img, mask=_hud_mask()), full_only=True)
+
+    def _derive(self, kind: str, roi: tuple | None, func: Callable, full_only: bool = False) -> np.ndarray:
+        """
+        :param kind: Name of the derived image
+        :param roi: Region [x, y, w, h] of the frame. None for the full frame.
+        :param func: Computes the derived image from the (cropped) frame image
+        :param full_only: func can only be applied to the full frame, roi is cropped from its result
+        """
+        full = self._derived.get((kind, None))
+        if full is None and (roi is None or full_only):
+            full = self._store((kind, None), func(self.img))
+        if full is not None:
+            return _crop(full, roi)
+        key = (kind, tuple(int(v) for v in roi))
+        if (res := self._derived.get(key)) is None:
+            res = self._store(key, func(_crop(self.img, roi)))
+        return res
+
+    def _store(self, key: tuple, img: np.ndarray) -> np.ndarray:
+        img.flags.writeable = False
+        # concurrent readers might compute it twice, whichever is stored last wins which is fine
+        self._derived[key] = img
+        return img
+
+def _hud_mask() -> np.ndarray:
+    # local import, ui_manager (indirectly) depends on screen which depends on this module
+    from ui_manager import get_hud_mask
+    return get_hud_mask()
+
+def _crop(img: np.ndarray, roi: tuple | None) -> np.ndarray:
+    if roi is None:
+        return img
+    x, y, w, h = roi
+    return img[y:y+h, x:x+w]
+
+def _buffer_of(img: np.ndarray) -> np.ndarray:
+    return img if img.base is None else img.base
+
+def find_frame(img: np.ndarray) -> tuple[Frame, tuple[int, int, int, int] | None] | None:
+    """
+    Maps an image back to the live frame it belongs to, i.e. the frame image itself or a (cropped) view of it
+    :param img: Image to look up
+    :return: (frame, roi) with roi being None for the full frame, or None if img is not part of a live frame
+    """
+    if not isinstance(img, np.ndarray) or img.ndim != 3:
+        return None
+    frame = _live_frames.get(id(_buffer_of(img)))
+    if frame is None:
+        return None
+    if img is frame.img:
+        return frame, None
+    full = frame.img
+    if img.strides != full.strides or img.shape[2] != full.shape[2]:
+        return None
+    offset = img.__array_interface__["data"][0] - full.__array_interface__["data"][0]
+    if offset < 0:
+        return None
+    y, rest = divmod(offset, full.strides[0])
+    x, rest = divmod(rest, full.strides[1])
+    h, w = img.shape[:2]
+    if rest != 0 or x + w > full.shape[1] or y + h > full.shape[0]:
+        return None
+    if (x, y, w, h) == (0, 0, full.shape[1], full.shape[0]):
+        return frame, None
+    return frame, (x, y, w, h)
+
+def cached_gray(img: np.ndarray) -> np.ndarray:
+    """
+    Same as cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), but served from the frame cache if img is (part of) a captured frame
+    """
+    if (found := find_frame(img)) is not None:
+        return found[0].gray(found[1])
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def cached_hsv(img: np.ndarray) -> np.ndarray:
+    """
+    Same as cv2.cvtColor(img, cv2.COLOR_BGR2HSV), but served from the frame cache if img is (part of) a captured frame
+    """
+    if (found := find_frame(img)) is not None:
+        return found[0].hsv(found[1])
+    return cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+def cached_hud_masked(img: np.ndarray) -> np.ndarray:
+    """
+    Same as cv2.bitwise_and(img, img, mask=get_hud_mask()), but served from the frame cache if img is a captured frame.
+    The result might be read-only, copy it before drawing into it.
+    """
+    if (found := find_frame(img)) is not None and found[1] is None:
+        return found[0].hud_masked()
+    return cv2.bitwise_and(img, img, mask=_hud_mask())
@@ -0,0 +1,143 @@
+"""
+Deletion index (SymSpell) over a word list for best match lookups under the Levenshtein distance.
+Returns the same result as find_best_match(in_str, list(words)), but instead of scanning every word it looks up the
+words that share a deletion variant with the input. Two strings within edit distance k always share a variant with
+at most k deletions each, so every word within MAX_DISTANCE is found and the closest of them is the global best match.
+Only inputs without any word within MAX_DISTANCE fall back to the full scan.
+
+The index only depends on the words, it is persisted next to the word list and rebuilt when the list changes.
+"""
+import hashlib
+import json
+import os
+from rapidfuzz.utils import default_process
+from utils.misc import BestMatchResult, find_best_match, levenshtein
+
+INDEX_VERSION = 1
+MAX_DISTANCE = 2
+
+
+def _deletes(key: str, max_distance: int) -> set[str]:
+    """
+    :return: key and all strings created by deleting up to max_distance characters from it
+    """
+    variants = {key}
+    edge = {key}
+    for _ in range(max_distance):
+        edge = {variant[:i] + variant[i + 1:] for variant in edge for i in range(len(variant))} - variants
+        variants |= edge
+    return variants
+
+
+class FuzzyIndex:
+    def __init__(self, keys: list[str], members: list[list[str]], deletes: dict[str, list[int]], digest: str, max_distance: int):
+        """
+        Use FuzzyIndex.build() or FuzzyIndex.open()
+        :param keys: Processed (see rapidfuzz default_process) words
+        :param members: Words of each key, several words can have the same processed form
+        :param deletes: {deletion variant: indices of the keys it was created from}
+        :param digest: Fingerprint of the indexed words
+        :param max_distance: Deletions per key in the index
+        """
+        self._keys = keys
+        self._members = members
+        self._deletes = deletes
+        self.digest = digest
+        self.max_distance = max_distance
+        self._words = []
+        self._rank = {}
+
+    @staticmethod
+    def words_digest(words) -> str:
+        return hashlib.sha1("\n".join(sorted(words)).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(cls, words, max_distance: int = MAX_DISTANCE) -> "FuzzyIndex":
+        words = list(words)
+        keys, members, deletes = [], [], {}
+        key_idx = {}
+        for word in words:
+            key = default_process(word)
+            if (idx := key_idx.get(key)) is not None:
+                members[idx].append(word)
+                continue
+            idx = key_idx[key] = len(keys)
+            keys.append(key)
+            members.append([word])
+            for variant in _deletes(key, max_distance):
+                deletes.setdefault(variant, []).append(idx)
+        index = cls(keys, members, deletes, cls.words_digest(words), max_distance)
+        index.set_order(words)
+        return index
+
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "digest": self.digest,
+            "max_distance": self.max_distance,
+            "keys": self._keys,
+            "members": self._members,
+            "deletes": self._deletes,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FuzzyIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path} is not a fuzzy index (version {INDEX_VERSION})")
+        return cls(data["keys"], data["members"], data["deletes"], data["digest"], data["max_distance"])
+
+    @classmethod
+    def open(cls, path: str, words, max_distance: int = MAX_DISTANCE) -> "FuzzyIndex":
+        """
+        Loads the index persisted at path, or builds and persists it if it is missing or was built from other words
+        :param words: Words to index. Their iteration order decides between equally good matches, like the list
+            order does for find_best_match()
+        """
+        words = list(words)
+        index = None
+        if os.path.isfile(path):
+            try:
+                index = cls.load(path)
+            except (ValueError, KeyError, json.JSONDecodeError):
+                index = None
+            if index is not None and (index.digest != cls.words_digest(words) or index.max_distance != max_distance):
+                index = None
+        if index is None:
+            index = cls.build(words, max_distance)
+            try:
+                index.save(path)
+            except OSError:
+                pass
+        index.set_order(words)
+        return index
+
+    def set_order(self, words):
+        self._words = list(words)
+        self._rank = {word: i for i, word in enumerate(self._words)}
+
+    def best_match(self, in_str: str) -> BestMatchResult:
+        """
+        Same as find_best_match(in_str, words)
+        """
+        query = default_process(in_str)
+        candidates = set()
+        for variant in _deletes(query, self.max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+        best_dist, best = None, []
+        for idx in candidates:
+            dist = levenshtein(query, self._keys[idx])
+            if best_dist is None or dist < best_dist:
+                best_dist, best = dist, [idx]
+            elif dist == best_dist:
+                best.append(idx)
+        # shared variants can also come from words further away, those might not be the closest ones
+        if best_dist is None or best_dist > self.max_distance:
+            return find_best_match(in_str, self._words)
+        match = min((word for idx in best for word in self._members[idx]), key=self._rank.__getitem__)
+        return BestMatchResult(match, best_dist, 1 - best_dist / max(1, len(in_str)))
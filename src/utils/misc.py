@@ -4,25 +4,35 @@ import time
 import random
 import ctypes
 import numpy as np
-from copy import deepcopy
 import unicodedata
 import re
+from functools import cache
 
 from pyparsing import Regex
 
 from logger import Logger
+from utils.frame import cached_hsv
 import cv2
 import os
 from math import cos, sin, dist
 import subprocess
-from win32con import HWND_TOPMOST, SWP_NOMOVE, SWP_NOSIZE, HWND_NOTOPMOST
-from win32gui import GetWindowText, SetWindowPos, EnumWindows, GetClientRect, ClientToScreen
-from win32api import GetMonitorInfo, MonitorFromWindow
-from win32process import GetWindowThreadProcessId
+try:
+    from win32con import HWND_TOPMOST, SWP_NOMOVE, SWP_NOSIZE, HWND_NOTOPMOST
+    from win32gui import GetWindowText, SetWindowPos, EnumWindows, GetClientRect, ClientToScreen
+    from win32api import GetMonitorInfo, MonitorFromWindow
+    from win32process import GetWindowThreadProcessId
+except ImportError:
+    # pywin32 is Windows only. Without it there is no window handling, but the vision code can still run on replays (see utils.capture)
+    pass
 import psutil
 
 from rapidfuzz.process import extractOne
-from rapidfuzz.string_metric import levenshtein
+try:
+    # rapidfuzz >= 2 ranks string_metric.levenshtein like a similarity in extractOne (highest distance wins),
+    # the distance scorer keeps the lowest distance
+    from rapidfuzz.distance.Levenshtein import distance as levenshtein
+except ImportError:
+    from rapidfuzz.string_metric import levenshtein
 
 def close_down_d2():
     subprocess.call(["taskkill","/F","/IM","D2R.exe"], stderr=subprocess.DEVNULL)
@@ -122,58 +132,89 @@ def trim_black(image):
     return img, roi
 
 def erode_to_black(img: np.ndarray, threshold: int = 14):
-    # Cleanup image with erosion image as marker with morphological reconstruction
+    # Blacks out everything brighter than threshold that is (8-)connected to the image border, i.e. the morphological
+    # reconstruction of the border pixels. A bright frame around the image joins all those regions, so a single flood
+    # fill from the frame finds them.
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)[1]
-    kernel = np.ones((3, 3), np.uint8)
-    marker = thresh.copy()
-    marker[1:-1, 1:-1] = 0
-    while True:
-        tmp = marker.copy()
-        marker = cv2.dilate(marker, kernel)
-        marker = cv2.min(thresh, marker)
-        difference = cv2.subtract(marker, tmp)
-        if cv2.countNonZero(difference) <= 0:
-            break
-    mask_r = cv2.bitwise_not(marker)
-    mask_color_r = cv2.cvtColor(mask_r, cv2.COLOR_GRAY2BGR)
-    img = cv2.bitwise_and(img, mask_color_r)
+    framed = cv2.copyMakeBorder(thresh, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=255)
+    cv2.floodFill(framed, None, (0, 0), 0, flags=8)
+    # keep what is dark or was not reached by the fill
+    keep_mask = cv2.bitwise_or(cv2.bitwise_not(thresh), framed[1:-1, 1:-1])
+    img = cv2.bitwise_and(img, img, mask=keep_mask)
     return img
 
 def roi_center(roi: list[float] = None):
     x, y, w, h = roi
     return round(x + w/2), round(y + h/2)
 
-def color_filter(img, color_range):
-    color_ranges=[]
+def color_range_key(color_range) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Hashable form of a color range (format Config().colors["color"]), e.g. to cache results per color
+    """
+    return tuple(tuple(int(v) for v in bound) for bound in color_range)
+
+@cache
+def _compile_color_range(key: tuple) -> list[tuple[np.ndarray, np.ndarray]]:
+    # hue wraps around at 180, such ranges are split into two
+    lower, upper = np.array(key[0]), np.array(key[1])
+    color_ranges = []
     # ex: [array([ -9, 201,  25]), array([ 9, 237,  61])]
-    if color_range[0][0] < 0:
-        lower_range = deepcopy(color_range)
-        lower_range[0][0] = 0
-        color_ranges.append(lower_range)
-        upper_range = deepcopy(color_range)
-        upper_range[0][0] = 180 + color_range[0][0]
-        upper_range[1][0] = 180
-        color_ranges.append(upper_range)
+    if lower[0] < 0:
+        color_ranges.append((np.array([0, *lower[1:]]), upper))
+        color_ranges.append((np.array([180 + lower[0], *lower[1:]]), np.array([180, *upper[1:]])))
     # ex: [array([ 170, 201,  25]), array([ 188, 237,  61])]
-    elif color_range[1][0] > 180:
-        upper_range = deepcopy(color_range)
-        upper_range[1][0] = 180
-        color_ranges.append(upper_range)
-        lower_range = deepcopy(color_range)
-        lower_range[0][0] = 0
-        lower_range[1][0] = color_range[1][0] - 180
-        color_ranges.append(lower_range)
+    elif upper[0] > 180:
+        color_ranges.append((lower, np.array([180, *upper[1:]])))
+        color_ranges.append((np.array([0, *lower[1:]]), np.array([upper[0] - 180, *upper[1:]])))
     else:
-        color_ranges.append(color_range)
-    color_masks = []
-    for color_range in color_ranges:
-        hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv_img, color_range[0], color_range[1])
-        color_masks.append(mask)
-    color_mask = np.bitwise_or.reduce(color_masks) if len(color_masks) > 0 else color_masks[0]
-    filtered_img = cv2.bitwise_and(img, img, mask=color_mask)
-    return color_mask, filtered_img
+        color_ranges.append((lower, upper))
+    return color_ranges
+
+def color_mask(img, color_range) -> np.ndarray:
+    """
+    Same as color_filter(img, color_range)[0], for callers that do not need the filtered image
+    """
+    hsv_img = cached_hsv(img)
+    color_ranges = _compile_color_range(color_range_key(color_range))
+    mask = cv2.inRange(hsv_img, *color_ranges[0])
+    for lower, upper in color_ranges[1:]:
+        mask = cv2.bitwise_or(mask, cv2.inRange(hsv_img, lower, upper))
+    return mask
+
+def color_filter(img, color_range):
+    mask = color_mask(img, color_range)
+    filtered_img = cv2.bitwise_and(img, img, mask=mask)
+    return mask, filtered_img
+
+@cache
+def _compile_color_class_luts(keys: tuple) -> list[np.ndarray]:
+    # one table per HSV channel, bit i of an entry is set if the channel value is within color range i.
+    # The ranges split at the hue wrap only differ in hue, so a pixel is within a range if all three channels are.
+    values = np.arange(256)
+    luts = [np.zeros(256, dtype=np.uint8) for _ in range(3)]
+    for bit, key in enumerate(keys):
+        for channel, lut in enumerate(luts):
+            inside = np.zeros(256, dtype=bool)
+            for lower, upper in _compile_color_range(key):
+                inside |= (values >= lower[channel]) & (values <= upper[channel])
+            lut[inside] |= 1 << bit
+    return luts
+
+def color_classes(img, color_ranges: list) -> np.ndarray:
+    """
+    Masks of several color ranges in a single pass over the image, same pixels as the masks of color_filter()
+    :param color_ranges: Up to 8 color ranges (format Config().colors["color"])
+    :return: Single channel image, bit i of a pixel is set if it is within color_ranges[i]
+    """
+    if len(color_ranges) > 8:
+        raise ValueError(f"color_classes() supports up to 8 color ranges, got {len(color_ranges)}")
+    luts = _compile_color_class_luts(tuple(color_range_key(color_range) for color_range in color_ranges))
+    channels = cv2.split(cached_hsv(img))
+    classes = cv2.LUT(channels[0], luts[0])
+    for channel, lut in zip(channels[1:], luts[1:]):
+        classes = cv2.bitwise_and(classes, cv2.LUT(channel, lut))
+    return classes
 
 def hms(seconds: int):
     seconds = int(seconds)
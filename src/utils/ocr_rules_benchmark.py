@@ -0,0 +1,60 @@
+"""
+Measures the OCR text fixes (d2r_image.ocr._fix_regexps() and _check_known_errors()) on the raw Tesseract output of
+the test/nip item images and prints how often each rule fired.
+
+    python src/utils/ocr_rules_benchmark.py [repeats]
+"""
+import os
+import sys
+import timeit
+import cv2
+import screen
+from d2r_image import ocr, processing
+
+ASSET_PATHS = {
+    "test/assets/hovered_items": lambda img: processing.get_hovered_item(img),
+    "test/assets/ground_loot": lambda img: processing.get_ground_loot(img),
+}
+
+def collect_corpus() -> list[str]:
+    """
+    :return: Every text the item readers pass to the fixes while reading the test images
+    """
+    corpus = []
+    fix_regexps = ocr._fix_regexps
+
+    def recording_fix_regexps(text: str) -> str:
+        corpus.append(text)
+        return fix_regexps(text)
+
+    ocr._fix_regexps = recording_fix_regexps
+    try:
+        for path, read in ASSET_PATHS.items():
+            for filename in sorted(os.listdir(path)):
+                if filename.lower().endswith(".png"):
+                    read(cv2.imread(f"{path}/{filename}"))
+    finally:
+        ocr._fix_regexps = fix_regexps
+    return corpus
+
+def run(corpus: list[str], repeats: int) -> float:
+    """
+    :return: Mean seconds to fix one text of the corpus
+    """
+    def fix_all():
+        for text in corpus:
+            ocr._check_known_errors(ocr._fix_regexps(text))
+    seconds = min(timeit.repeat(fix_all, number=1, repeat=repeats))
+    # count the rule hits of a single pass over the corpus
+    ocr.rule_stats.hits.clear()
+    fix_all()
+    return seconds / max(1, len(corpus))
+
+if __name__ == "__main__":
+    import utils.download_test_assets # downloads assets if they don't already exist
+    screen.set_window_position(0, 0)
+    corpus = collect_corpus()
+    mean = run(corpus, int(sys.argv[1]) if len(sys.argv) > 1 else 20)
+    print(f"{len(corpus)} texts, {1e6 * mean:.2f}us per text")
+    for name, hits in ocr.rule_stats.hits.most_common():
+        print(f"{name:>20}: {hits}")
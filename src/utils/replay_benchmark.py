@@ -0,0 +1,79 @@
+"""
+Records a live session, or runs the vision stack on a recorded one to measure its throughput without the game.
+
+    python src/utils/replay_benchmark.py record <session file> <seconds>
+    python src/utils/replay_benchmark.py replay <session file> [--realtime] [--profile]
+"""
+import cProfile
+import pstats
+import sys
+import time
+from collections import defaultdict
+import screen
+from utils.capture import ReplayCapture
+
+def record(path: str, seconds: float):
+    screen.start_detecting_window()
+    print("Waiting for the D2R window...")
+    while not screen.get_offset_state():
+        time.sleep(0.5)
+    screen.start_recording(path)
+    time.sleep(seconds)
+    screen.stop_recording()
+    screen.stop_detecting_window()
+
+def replay(path: str, realtime: bool = False) -> dict[str, list[float]]:
+    # imported here, they pull in the templates and OCR models which is part of the startup and not of the benchmark
+    import template_finder
+    from d2r_image.processing import get_ground_loot
+    from pather import Pather
+    from target_detect import get_visible_targets
+    from ui_manager import detect_screen_object, ScreenObjects
+
+    backend = ReplayCapture(path, realtime=realtime)
+    screen.set_capture_backend(backend)
+    screen.set_window_position(0, 0)
+    template_finder.stored_templates()
+    pather = Pather()
+    stages = {
+        "screen_objects": lambda img: [detect_screen_object(obj, img) for obj in (ScreenObjects.InGame, ScreenObjects.Loading, ScreenObjects.MainMenu)],
+        "find_abs_node_pos": lambda img: [pather.find_abs_node_pos(idx, img) for idx in pather._nodes],
+        "target_detect": lambda img: get_visible_targets(img),
+        "ground_loot": lambda img: get_ground_loot(img),
+    }
+    timings = defaultdict(list)
+    while True:
+        start = time.perf_counter()
+        img = screen.grab(force_new=True)
+        if backend.finished:
+            break
+        timings["grab"].append(time.perf_counter() - start)
+        for name, stage in stages.items():
+            start = time.perf_counter()
+            stage(img)
+            timings[name].append(time.perf_counter() - start)
+    return timings
+
+def print_timings(timings: dict[str, list[float]]):
+    frames = len(timings["grab"])
+    total = sum(sum(t) for t in timings.values())
+    print(f"{frames} frames in {total:.2f}s ({frames / total:.1f} fps)")
+    for name, values in timings.items():
+        values = sorted(values)
+        print(f"{name:>20}: mean {1000 * sum(values) / len(values):7.2f}ms, p50 {1000 * values[len(values) // 2]:7.2f}ms, max {1000 * values[-1]:7.2f}ms")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "replay"):
+        print(__doc__)
+        sys.exit(1)
+    from logger import Logger
+    Logger.init()
+    if sys.argv[1] == "record":
+        record(sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 60)
+    elif "--profile" in sys.argv:
+        profiler = cProfile.Profile()
+        timings = profiler.runcall(replay, sys.argv[2], "--realtime" in sys.argv)
+        print_timings(timings)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(40)
+    else:
+        print_timings(replay(sys.argv[2], "--realtime" in sys.argv))
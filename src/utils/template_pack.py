@@ -0,0 +1,178 @@
+"""
+Template pack: all template assets, decoded to raw BGRA, in one binary file. The pack is memory-mapped at runtime and
+each template is only materialised on its first lookup, the derived images (BGR, grayscale, alpha mask) are computed then.
+Only BGRA is stored to keep the pack small, deriving the other images is cheap compared to decoding the PNG.
+
+This module only depends on numpy and cv2, so build.py can import it to write the pack.
+    python src/utils/template_pack.py [output path]
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Callable
+import cv2
+import numpy as np
+
+TEMPLATE_PATHS = [
+    "assets/templates",
+    "assets/npc",
+    "assets/shop",
+    "assets/item_properties",
+    "assets/chests",
+    "assets/gamble",
+]
+TEMPLATE_PACK_PATH = "assets/templates.pack"
+
+PACK_MAGIC = b"BOTTYTPL"
+PACK_VERSION = 2
+# magic, version, index offset, index size
+_HEADER = struct.Struct("<8sIQQ")
+_ALIGNMENT = 64
+
+
+def template_variants(img_bgra: np.ndarray) -> dict[str, np.ndarray | None]:
+    """
+    Derived images of a template asset, loaded with cv2.IMREAD_UNCHANGED
+    """
+    alpha_mask = None
+    # create a mask from template where alpha == 0
+    if img_bgra.shape[2] == 4 and np.min(img_bgra[:, :, 3]) == 0:
+        alpha_mask = cv2.threshold(img_bgra[:, :, 3], 1, 255, cv2.THRESH_BINARY)[1]
+    return {
+        "img_bgra": img_bgra,
+        "img_bgr": cv2.cvtColor(img_bgra, cv2.COLOR_BGRA2BGR),
+        "img_gray": cv2.cvtColor(img_bgra, cv2.COLOR_BGRA2GRAY),
+        "alpha_mask": alpha_mask,
+    }
+
+
+def template_files(template_paths: list[str] = TEMPLATE_PATHS, root: str = ".") -> dict[str, str]:
+    """
+    :return: {template key: path relative to root}. Like stored_templates(), later files override earlier ones with the same name.
+    """
+    files = {}
+    for path in template_paths:
+        for dir_path, _, file_names in os.walk(os.path.join(root, path)):
+            for file_name in file_names:
+                if file_name.lower().endswith(".png"):
+                    files[file_name[:-4].upper()] = os.path.relpath(os.path.join(dir_path, file_name), root).replace("\\", "/")
+    return files
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def _file_signature(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, int(stat.st_mtime), _file_hash(path)]
+
+
+def _matches_signature(path: str, signature: list) -> bool:
+    size, mtime, content_hash = signature
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return False
+    # mtimes change when a release is unzipped or the repo checked out again, the content decides then
+    return int(stat.st_mtime) == mtime or _file_hash(path) == content_hash
+
+
+def write_pack(pack_path: str = TEMPLATE_PACK_PATH, template_paths: list[str] = TEMPLATE_PATHS, root: str = ".") -> int:
+    """
+    Decodes all template assets below root and writes them into a pack
+    :return: Number of packed templates
+    """
+    index = {"sources": {}, "templates": {}}
+    with open(pack_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for key, rel_path in template_files(template_paths, root).items():
+            file_path = os.path.join(root, rel_path)
+            img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+            if img is None:
+                raise ValueError(f"Could not load template: {file_path}")
+            index["sources"][rel_path] = _file_signature(file_path)
+            f.write(b"\0" * (-f.tell() % _ALIGNMENT))
+            index["templates"][key] = [f.tell(), list(img.shape)]
+            f.write(np.ascontiguousarray(img).tobytes())
+        index_data = json.dumps(index).encode("utf-8")
+        index_offset = f.tell()
+        f.write(index_data)
+        f.seek(0)
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, index_offset, len(index_data)))
+    return len(index["templates"])
+
+
+class TemplatePack(Mapping):
+    """
+    Read-only mapping {template key: factory(key, template_variants(image))} over a memory-mapped pack. image is a
+    read-only view into the pack, a template is materialised on first access and kept afterwards.
+    """
+    def __init__(self, pack_path: str, factory: Callable = None):
+        self._mm = np.memmap(pack_path, dtype=np.uint8, mode="r")
+        magic, version, index_offset, index_size = _HEADER.unpack(self._mm[:_HEADER.size].tobytes())
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"{pack_path} is not a template pack (version {PACK_VERSION})")
+        index = json.loads(self._mm[index_offset:index_offset + index_size].tobytes())
+        self.sources = index["sources"]
+        self._index = index["templates"]
+        self._factory = factory or (lambda key, variants: variants)
+        self._materialised = {}
+        self._lock = threading.Lock()
+
+    def is_current(self, template_paths: list[str] = TEMPLATE_PATHS, root: str = ".") -> bool:
+        """
+        :return: Whether the pack contains exactly the template assets below root in their current version. A frozen
+            executable uses the pack it was shipped with as it is.
+        """
+        if getattr(sys, "frozen", False):
+            return True
+        files = template_files(template_paths, root)
+        if set(files.keys()) != set(self._index.keys()) or set(files.values()) != set(self.sources.keys()):
+            return False
+        return all(_matches_signature(os.path.join(root, path), signature) for path, signature in self.sources.items())
+
+    def image(self, key: str) -> np.ndarray:
+        """
+        :return: The template asset as it was decoded, read-only view into the pack
+        """
+        offset, shape = self._index[key]
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._mm, offset=offset)
+
+    def __getitem__(self, key: str):
+        if (item := self._materialised.get(key)) is None:
+            with self._lock:
+                if (item := self._materialised.get(key)) is None:
+                    item = self._materialised[key] = self._factory(key, template_variants(self.image(key)))
+        return item
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def open_pack(pack_path: str = TEMPLATE_PACK_PATH, factory: Callable = None, template_paths: list[str] = TEMPLATE_PATHS) -> TemplatePack | None:
+    """
+    :return: The pack if it exists and matches the template assets, otherwise None
+    """
+    if not os.path.isfile(pack_path):
+        return None
+    try:
+        pack = TemplatePack(pack_path, factory)
+    except (ValueError, struct.error, json.JSONDecodeError):
+        return None
+    return pack if pack.is_current(template_paths) else None
+
+
+if __name__ == "__main__":
+    out_path = sys.argv[1] if len(sys.argv) > 1 else TEMPLATE_PACK_PATH
+    print(f"Packed {write_pack(out_path)} templates into {out_path}")
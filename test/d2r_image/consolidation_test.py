@@ -0,0 +1,53 @@
+import math
+import random
+from d2r_image.data_models import ItemQuality
+from d2r_image.processing_helpers import _closest_label, _rows, consolidate_quality, consolidate_rares
+
+
+def _label(text, x, y, quality=ItemQuality.Rare):
+    return {'color': 'yellow', 'quality': quality, 'x': x, 'y': y, 'w': 11 * len(text), 'h': 25, 'text': text}
+
+
+def test_closest_label_matches_full_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        labels = [_label("SHAKO", rng.randrange(0, 1200), rng.randrange(0, 700)) for _ in range(rng.randrange(0, 40))]
+        x, y = rng.randrange(0, 1200), rng.randrange(0, 700)
+        min_y = y if rng.random() < 0.5 else None
+        expected = None
+        closest_dist = 99999
+        for label in labels:
+            dist = round(math.dist((x, y), (label['x'], label['y'])), 0)
+            if (min_y is None or label['y'] > min_y) and dist < closest_dist:
+                closest_dist = dist
+                expected = label
+        assert _closest_label(_rows(labels), x, y, min_y) is expected
+
+
+def test_consolidate_rares_keeps_every_name():
+    # taking the base in front of the first name must not skip the name after it
+    rares = [
+        _label("SHAKO", 100, 125),
+        _label("GRIM SHELL", 100, 100),
+        _label("DEATH WRAP", 400, 100),
+        _label("HYDRA BOW", 400, 125),
+    ]
+    items_by_quality = {ItemQuality.Rare.value: rares}
+    consolidate_rares(items_by_quality)
+    assert [(item['text'], item['base']['DisplayName']) for item in items_by_quality[ItemQuality.Rare.value]] == [
+        ("GRIM SHELL", "Shako"),
+        ("DEATH WRAP", "Hydra Bow"),
+    ]
+
+
+def test_consolidate_quality_bases_are_used_once():
+    # both names are closest to the same base
+    uniques = [
+        _label("HARLEQUIN CREST", 100, 100, ItemQuality.Unique),
+        _label("HARLEQUIN CREST", 110, 110, ItemQuality.Unique),
+        _label("SHAKO", 100, 125, ItemQuality.Unique),
+        _label("SHAKO", 600, 400, ItemQuality.Unique),
+    ]
+    consolidate_quality(uniques, uniques)
+    assert [(item['text'], item['y']) for item in uniques] == [("HARLEQUIN CREST", 100), ("HARLEQUIN CREST", 110)]
+    assert uniques[0]['h'] == uniques[1]['h'] == 50
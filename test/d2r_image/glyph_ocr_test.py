@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+from d2r_image.data_models import OcrResult
+from d2r_image.glyph_ocr import FONT_PATH, MIN_CONFIDENCE, read_glyphs
+from ui import skills
+
+
+def _render(text: str, size: int) -> np.ndarray:
+    font = ImageFont.truetype(FONT_PATH, size)
+    img = Image.new("L", (size * len(text) + 20, size * 2), 0)
+    ImageDraw.Draw(img).text((7, size // 3), text, font=font, fill=220)
+    img = np.array(img)
+    # like text_intensity() with the gold threshold
+    img[img <= 76] = 0
+    return img
+
+
+@pytest.mark.parametrize("size", [12, 16, 24])
+def test_read_digits(size):
+    res = read_glyphs(_render("2500000", size))
+    assert res.text == "2500000"
+    assert res.confidence >= MIN_CONFIDENCE
+
+
+def test_read_experience_line():
+    res = read_glyphs(_render("EXPERIENCE: 1,234,567 / 2,000,000", 16), "0123456789EXPRIENC:,./")
+    assert res.text == "EXPERIENCE: 1,234,567 / 2,000,000"
+
+
+def test_read_nothing():
+    assert read_glyphs(np.zeros((20, 60), dtype=np.uint8)).confidence == 0
+
+
+def _skill_frame(text: str) -> np.ndarray:
+    # charges are drawn in the lower half of the right skill icon
+    lower, upper = (np.array(bound) for bound in Config().colors["skill_charges"])
+    color = cv2.cvtColor(np.uint8([[(lower + upper) // 2]]), cv2.COLOR_HSV2RGB)[0, 0].tolist()
+    img = Image.new("RGB", (1280, 720), 0)
+    x, y, w, h = Config().ui_roi["skill_right"]
+    ImageDraw.Draw(img).text((x + 8, y + h // 2 + 4), text, font=ImageFont.truetype(FONT_PATH, 14), fill=tuple(color))
+    return np.array(img)[:, :, ::-1].copy()
+
+
+def test_skill_charges_glyph_path(mocker):
+    image_to_text = mocker.patch.object(skills.ocr, "image_to_text")
+    assert skills.get_skill_charges(_skill_frame("37")) == 37
+    image_to_text.assert_not_called()
+
+
+def test_skill_charges_tesseract_fallback(mocker):
+    # glyphs outside the charset score low, the line goes to Tesseract
+    assert read_glyphs(_render("WXY", 16)).confidence < MIN_CONFIDENCE
+    image_to_text = mocker.patch.object(skills.ocr, "image_to_text", return_value=[OcrResult(text="12")])
+    assert skills.get_skill_charges(_skill_frame("WXY")) == 12
+    assert image_to_text.call_args.kwargs["digits_only"]
@@ -0,0 +1,38 @@
+import numpy as np
+from d2r_image import ground_loot_tracker
+from d2r_image.data_models import OcrResult
+from d2r_image.ground_loot_tracker import GroundLootTracker
+from label_images import draw_label
+
+
+def _frame(labels: list[tuple[str, int, int, str]]) -> np.ndarray:
+    img = np.zeros((400, 700, 3), dtype=np.uint8)
+    for label in labels:
+        draw_label(img, *label)
+    return img
+
+
+def test_tracker_reads_only_new_and_changed_labels(mocker):
+    read = []
+    def read_text_clusters(labels):
+        for label in labels:
+            read.append(label.color)
+            label.ocr_result = OcrResult(text=f"{label.color} {len(read)}")
+        return labels
+    mocker.patch.object(ground_loot_tracker, "read_text_clusters", side_effect=read_text_clusters)
+    mocker.patch.object(ground_loot_tracker, "build_ground_loot", side_effect=lambda labels, consolidate: labels)
+    tracker = GroundLootTracker()
+    labels = [("GRAND CHARM", 100, 100, "blue"), ("JAH RUNE", 300, 200, "orange"), ("SHAKO", 450, 300, "gold")]
+    first = {label.color: label.ocr_result.text for label in tracker.get_ground_loot(_frame(labels))}
+    assert sorted(read) == ["blue", "gold", "orange"]
+    # the charm was picked up and the camera moved, a new label came into view
+    read.clear()
+    moved = [(text, x - 37, y + 21, color) for text, x, y, color in labels[1:]] + [("RING", 200, 50, "yellow")]
+    second = {label.color: label.ocr_result.text for label in tracker.get_ground_loot(_frame(moved))}
+    assert read == ["yellow"]
+    assert second["orange"] == first["orange"] and second["gold"] == first["gold"]
+    # same position, different text
+    read.clear()
+    tracker.get_ground_loot(_frame(moved[:1] + [("SHAKI", 413, 321, "gold")] + moved[2:]))
+    assert read == ["gold"]
+    assert (tracker.stats.reused, tracker.stats.read) == (4, 5)
@@ -0,0 +1,41 @@
+import io
+from d2r_image import d2data_data
+from d2r_image.item_store import ItemStore, open_store, write_store
+
+
+def _store() -> ItemStore:
+    buffer = io.BytesIO()
+    write_store(buffer)
+    return ItemStore(buffer.getvalue())
+
+
+def test_tables_and_values_match_data_modules():
+    store = _store()
+    armor = store.table("armor")
+    assert list(armor) == list(d2data_data.ITEM_ARMOR)
+    assert armor.materialised() == 0
+    assert armor["shako"] == d2data_data.ITEM_ARMOR["shako"]
+    assert armor.materialised() == 1
+    assert dict(store.table("unique_items")) == d2data_data.ITEM_UNIQUE_ITEMS
+    assert store.value("ref_patterns") == d2data_data.REF_PATTERNS
+    # values are copies, the caller may change them
+    store.value("ref_patterns").clear()
+    assert store.value("ref_patterns") == d2data_data.REF_PATTERNS
+
+
+def test_indexes_share_records_with_tables():
+    store = _store()
+    assert store.index("bases_by_name")["SHAKO"] is store.table("armor")["shako"]
+    assert store.index("runes_by_name")["JAHRUNE"] is store.table("misc")["jahrune"]
+    assert store.index("unique_items_by_name")["HARLEQUINCREST"]["DisplayName"] == "Harlequin Crest"
+    assert "SHAKO" not in store.index("gems_by_name")
+
+
+def test_open_store(tmp_path):
+    path = tmp_path / "d2data.store"
+    assert open_store(str(path)) is None
+    with open(path, "wb") as f:
+        write_store(f)
+    assert open_store(str(path)).table("weapons")["phaseblade"] == d2data_data.ITEM_WEAPONS["phaseblade"]
+    path.write_bytes(b"not a store")
+    assert open_store(str(path)) is None
@@ -0,0 +1,32 @@
+import pytest
+import d2r_image.d2data_lookup as d2data_lookup
+from d2r_image.strings_store import base_items
+from utils.misc import find_best_match
+
+
+@pytest.mark.parametrize("text, field, display_name", [
+    ("SHAKO", "base", "Shako"),
+    ("JAH RUNE", "rune", "Jah Rune"),
+    ("GOLD", "consumable", "Gold"),
+    ("PERFECT SKULL", "gem", "Perfect Skull"),
+    ("HARLEQUIN CREST", "unique", "Harlequin Crest"),
+    ("TAL RASHA'S GUARDIANSHIP", "set_item", "Tal Rasha's Guardianship"),
+])
+def test_classify(text, field, display_name):
+    label_class = d2data_lookup.classify(text)
+    assert getattr(label_class, field)['DisplayName'] == display_name
+    assert [name for name, value in vars(label_class).items() if value] == [field]
+
+
+def test_classify_runeword():
+    # runewords only match their exact name, like Runeword(text)
+    assert d2data_lookup.classify("SPIRIT").runeword
+    assert not d2data_lookup.classify("SPIRIT ").runeword
+    assert d2data_lookup.classify("3500 GOLD") == d2data_lookup.LabelClass()
+
+
+@pytest.mark.parametrize("text", ["SHAKQ", "JAGGED WAR SCEPTRE", "ARCHONPLATE", "SUPERIOR", "X", ""])
+def test_fuzzy_base_item_match(text):
+    expected = find_best_match(text, list(base_items()))
+    res = d2data_lookup.fuzzy_base_item_match(text)
+    assert res == (expected.match if expected.score_normalized > 0.7 else text)
@@ -0,0 +1,18 @@
+import cv2
+import numpy as np
+from config import Config
+
+
+def draw_label(img: np.ndarray, text: str, x: int, y: int, color: str) -> int:
+    """
+    Draws a ground item label like the game does, text of the given Config().colors range on a black box
+    :param x: Left end of the text
+    :param y: Baseline of the text
+    :return: Right end of the box
+    """
+    lower, upper = (np.array(bound) for bound in Config().colors[color])
+    bgr = cv2.cvtColor(np.uint8([[(lower + upper) // 2]]), cv2.COLOR_HSV2BGR)[0, 0].tolist()
+    (w, h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    cv2.rectangle(img, (x - 6, y - h - 6), (x + w + 6, y + 6), (0, 0, 0), -1)
+    cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, bgr, 1, cv2.LINE_AA)
+    return x + w + 6
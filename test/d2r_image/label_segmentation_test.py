@@ -0,0 +1,21 @@
+import cv2
+import numpy as np
+from config import Config
+from d2r_image.processing_data import ITEM_COLORS
+from d2r_image.processing_helpers import find_item_labels
+from utils.misc import color_classes
+from label_images import draw_label
+
+
+def test_find_item_labels():
+    img = np.random.default_rng(0).integers(0, 60, (200, 600, 3), dtype=np.uint8)
+    draw_label(img, "GRAND CHARM", 40, 50, "blue")
+    # labels next to each other end up in one joined box and are separated by color
+    end = draw_label(img, "JAH RUNE", 40, 120, "orange")
+    draw_label(img, "SHAKO", end + 8, 120, "gold")
+    color_bits = color_classes(img, [Config().colors[key] for key in ITEM_COLORS])
+    labels = find_item_labels(color_bits, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    by_color = {color: (x, y) for x, y, _, _, color in labels}
+    assert len(labels) == 3 and sorted(by_color) == ["blue", "gold", "orange"]
+    assert by_color["orange"][0] < by_color["gold"][0]
+    assert by_color["orange"][1] == by_color["gold"][1] > by_color["blue"][1]
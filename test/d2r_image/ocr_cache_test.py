@@ -0,0 +1,31 @@
+import numpy as np
+from d2r_image.data_models import OcrResult
+from d2r_image.ocr_cache import OcrCache
+
+
+def test_ocr_cache_lru_and_copies():
+    cache = OcrCache(max_size=2)
+    label = np.zeros((10, 30), dtype=np.uint8)
+    label[3:7, 5:25] = 255
+    key = cache.key(label, ("ground", 7))
+    assert cache.get(key) is None
+    cache.put(key, OcrResult(text="JAH RUNE", word_confidences=[90, 91]))
+    # same pixels in a different buffer hit, other parameters do not
+    hit = cache.get(cache.key(label.copy(), ("ground", 7)))
+    assert hit.text == "JAH RUNE"
+    hit.word_confidences.append(0)
+    assert cache.get(key).word_confidences == [90, 91]
+    assert cache.get(cache.key(label, ("hover", 7))) is None
+    cache.put(cache.key(label, ("a",)), OcrResult(text="A"))
+    cache.put(cache.key(label, ("b",)), OcrResult(text="B"))
+    # least recently used entry was dropped
+    assert cache.get(key) is None
+    assert (cache.stats.hits, cache.stats.evictions) == (2, 1)
+
+
+def test_ocr_cache_max_age():
+    cache = OcrCache(max_age=0)
+    key = cache.key(np.ones((4, 4), dtype=np.uint8), ())
+    cache.put(key, OcrResult(text="X"))
+    assert cache.get(key) is None
+    assert len(cache) == 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from d2r_image import ocr
+from d2r_image.data_models import OcrResult
+from d2r_image.ocr import CascadeStats, image_to_text
+
+# {image id: (first read, second read)}, the id is the value of the image pixels
+READS = {
+    1: (OcrResult(text="JAH RUNE", mean_confidence=95, word_confidences=[95, 94]), None),
+    2: (OcrResult(text="SHAK0", mean_confidence=40, word_confidences=[40]), OcrResult(text="SHAKO", mean_confidence=90, word_confidences=[90])),
+    # good mean, one weak word
+    3: (OcrResult(text="GRAND CHARN", mean_confidence=70, word_confidences=[96, 44]), OcrResult(text="GRAND CHARNN", mean_confidence=50, word_confidences=[90, 10])),
+}
+
+
+@pytest.fixture
+def reads(mocker):
+    calls = []
+    def read_all(images, model, psm, word_list, scale, *args):
+        calls.append(([int(image[0, 0, 0]) for image in images], model, scale))
+        return [READS[int(image[0, 0, 0])][0 if scale == 1.0 else 1] for image in images]
+    mocker.patch.object(ocr, "_read_all", side_effect=read_all)
+    mocker.patch.object(ocr, "cascade_stats", CascadeStats())
+    return calls
+
+
+def _images(*ids):
+    return [np.full((10, 40, 3), i, dtype=np.uint8) for i in ids]
+
+
+def test_weak_reads_are_retried(reads):
+    res = image_to_text(_images(1, 2, 3), psm=7, retry_confidence=60, retry_model="slow")
+    assert reads == [([1, 2, 3], "hover-eng_inconsolata_inv_th_fast", 1.0), ([2, 3], "slow", ocr.RETRY_SCALE)]
+    # the more confident result is kept
+    assert [r.text for r in res] == ["JAH RUNE", "SHAKO", "GRAND CHARN"]
+    assert ocr.cascade_stats == CascadeStats(reads=3, retries=2, improved=1)
+
+
+def test_retry_disabled(reads):
+    res = image_to_text(_images(2, 3), psm=7, retry_confidence=0)
+    assert len(reads) == 1
+    assert [r.text for r in res] == ["SHAK0", "GRAND CHARN"]
+    assert ocr.cascade_stats == CascadeStats()
+
+
+def test_nothing_weak(reads):
+    image_to_text(_images(1, 1), psm=7, retry_confidence=60)
+    assert len(reads) == 1
+    assert ocr.cascade_stats == CascadeStats(reads=2)
@@ -0,0 +1,81 @@
+import threading
+import time
+import numpy as np
+from config import Config
+from d2r_image import ocr
+from d2r_image.data_models import OcrResult
+
+
+def test_read_all_keeps_input_order(mocker):
+    chunks = []
+    def read_images(images, engine_key, preprocess, postprocess):
+        ids = [int(image[0, 0]) for image in images]
+        chunks.append(ids)
+        # the first chunk finishes last
+        time.sleep(0.05 if ids[0] == 0 else 0)
+        return [OcrResult(text=str(i)) for i in ids]
+    mocker.patch.object(ocr, "_read_images", side_effect=read_images)
+    mocker.patch.dict(Config().advanced_options, {"ocr_workers": 3})
+    mocker.patch.object(ocr, "_ocr_pool", None)
+    images = [np.full((10, 10), i, dtype=np.uint8) for i in range(7)]
+    try:
+        res = ocr._read_all(images, "model", 7, "", 1.0, True, False, True, 25, False, True, True, True)
+        assert [r.text for r in res] == [str(i) for i in range(7)]
+        # one uneven, contiguous chunk per worker
+        assert sorted(chunks) == [[0, 1], [2, 3], [4, 5, 6]]
+        # fewer images than workers
+        chunks.clear()
+        assert [r.text for r in ocr._read_all(images[:2], "model", 7, "", 1.0, True, False, True, 25, False, True, True, True)] == ["0", "1"]
+        assert sorted(chunks) == [[0], [1]]
+    finally:
+        ocr._ocr_pool.shutdown()
+
+
+def test_engine_pool_reuses_idle_engines(mocker):
+    created = []
+    def create_engine(*key):
+        created.append(mocker.MagicMock(name=str(key)))
+        return created[-1]
+    mocker.patch.object(ocr, "_create_engine", side_effect=create_engine)
+    mocker.patch.object(ocr, "_engines", {})
+    key = ("model", 7, "", False)
+    with ocr._engine(*key) as first:
+        # busy, a second user gets its own engine
+        with ocr._engine(*key) as second:
+            assert second is not first
+    with ocr._engine(*key) as again:
+        assert again in (first, second)
+    with ocr._engine("model", 6, "", False):
+        pass
+    assert len(created) == 3
+    first.Clear.assert_called()
+    # warm up only creates engines for configurations without an idle one
+    ocr.warm_up_engines([key, ("other", 7, "", False)])
+    assert len(created) == 4
+
+
+def test_engine_pool_threads(mocker):
+    mocker.patch.object(ocr, "_create_engine", side_effect=lambda *key: mocker.MagicMock())
+    mocker.patch.object(ocr, "_engines", {})
+    key = ("model", 7, "", False)
+    in_use = set()
+    shared = []
+    lock = threading.Lock()
+    def borrow():
+        for _ in range(50):
+            with ocr._engine(*key) as api:
+                with lock:
+                    if id(api) in in_use:
+                        shared.append(api)
+                    in_use.add(id(api))
+                time.sleep(0.0005)
+                with lock:
+                    in_use.remove(id(api))
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # an engine is never handed to two users at once
+    assert shared == []
+    assert 1 <= len(ocr._engines[key]) <= 4
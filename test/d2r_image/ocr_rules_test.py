@@ -0,0 +1,45 @@
+import threading
+import pytest
+from d2r_image import ocr
+
+
+# expected values are the output of the former hand written fixes, quirks included
+@pytest.mark.parametrize("ocr_string, expected_string", [
+    ("SIIPER MANA POTION", "SUPER MANA POTION"),
+    ("S11PER MANA POTION", "SUPER MANA POTION"),
+    ("+32I TO MANA ATTACK RATING", "+321 TO MANA ATTACK RATING"),
+    ("W1RT'S LEG", "WIRT'S LEG"),
+    (" I TO 5 DEFENSE", " 1 TO 5 DEFENSE"),
+    ("+1 TO S DEFENSE\nS I\nI S", "+1 TO 5 DEFENSE\nS 1\n1 S"),
+    (" O TO 5 DEFENSE\nO O\nO", " 0 TO 5 DEFENSE\n0 0\nO"),
+    ("DEFENSE: II", "DEFENSE: 11"),
+    ("I I I I I I", "I 1 1 1 1 I"),
+    ("DEFENSE:\nI I\nI", "DEFENSE:\n1 1\nI"),
+    # keys with spaces never match a single word
+    ("SUPERIOR QU AB", "SUPERIOR QU AB"),
+    ("JAR RUNE", "JAR RUNE"),
+    # a matched word is replaced everywhere in the text
+    ("YO YOUR SKILLS", "TO TOUR SKILLS"),
+    ("MONARCHI\nDEFENSE: 148", "MONARCH\nDEFENSE: 148"),
+])
+def test_fix_rules(ocr_string, expected_string):
+    assert ocr._check_known_errors(ocr._fix_regexps(ocr_string)) == expected_string
+
+
+def test_fix_rule_hits():
+    ocr.rule_stats.hits.clear()
+    ocr._check_known_errors(ocr._fix_regexps("SIIPER MANA POTION\nYO I I "))
+    assert ocr.rule_stats.hits == {"II_U": 1, "SOLITARY_I": 2, "YO": 1}
+
+
+def test_fix_rule_hits_threads():
+    ocr.rule_stats.hits.clear()
+    def fix():
+        for _ in range(2000):
+            ocr._check_known_errors(ocr._fix_regexps("SIIPER MANA POTION\nYO"))
+    threads = [threading.Thread(target=fix) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ocr.rule_stats.hits == {"II_U": 8000, "YO": 8000}
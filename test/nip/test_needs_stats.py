@@ -0,0 +1,30 @@
+import pytest
+import bnip.actions as bnip_actions
+from bnip.NTIPAliasClassID import NTIPAliasClassID
+from bnip.NTIPAliasQuality import NTIPAliasQuality
+from bnip.transpile import generate_expression_object
+
+
+def _ring(quality: str) -> dict:
+    # item data as parsed from the name and base lines of the tooltip
+    return {
+        "NTIPAliasIdName": "RING",
+        "NTIPAliasType": [],
+        "NTIPAliasClassID": int(NTIPAliasClassID["ring"]),
+        "NTIPAliasClass": 0,
+        "NTIPAliasQuality": int(NTIPAliasQuality[quality]),
+        "NTIPAliasStat": {},
+        "NTIPAliasFlag": {"0x10": True, "0x400000": False},
+    }
+
+
+@pytest.mark.parametrize("expressions, quality, expected", [
+    (["[name] == ring && [quality] == unique"], "unique", False),
+    (["[name] == ring && [quality] == rare # [strength] >= 5"], "unique", False),
+    (["[name] == ring && [quality] == rare # [strength] >= 5"], "rare", True),
+    (["[name] == ring && [flag] == ethereal"], "rare", True),
+    (["[name] == ring && [quality] == unique", "[name] == ring && [quality] == magic # [dexterity] >= 5"], "magic", True),
+])
+def test_needs_stats(mocker, expressions, quality, expected):
+    mocker.patch.object(bnip_actions, "bnip_expressions", [generate_expression_object(e) for e in expressions])
+    assert bnip_actions.needs_stats(_ring(quality)) == expected
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import screen
+from utils.frame import cached_gray, cached_hsv, find_frame
+
+
+class BlankCapture:
+    def grab(self, region):
+        return np.zeros((region["height"], region["width"], 4), dtype=np.uint8)
+
+
+@pytest.fixture
+def fake_capture(mocker):
+    mocker.patch.object(screen, "capture_backend", BlankCapture())
+    screen.set_window_position(0, 0)
+    screen.frame_buffer.clear()
+
+
+def test_grab_reuses_recent_frame(fake_capture):
+    frame = screen.grab_frame(force_new=True)
+    assert screen.grab_frame().frame_id == frame.frame_id
+    assert screen.grab_frame(force_new=True).frame_id > frame.frame_id
+
+
+def test_frames_are_read_only(fake_capture):
+    img = screen.grab(force_new=True)
+    assert img.shape == (720, 1280, 3)
+    with pytest.raises(ValueError):
+        img[0, 0] = (255, 255, 255)
+
+
+def test_grab_roi(fake_capture):
+    health, mana = screen.grab(force_new=True, roi=[[309, 610, 7, 101], [961, 610, 7, 101]])
+    assert health.shape == mana.shape == (101, 7, 3)
+    assert health.flags.c_contiguous
+    # a fresh full frame is cropped instead of capturing again
+    screen.grab(force_new=True)
+    assert screen.grab(roi=[600, 600, 90, 90]).shape == (90, 90, 3)
+
+
+def test_grab_registered_rois(fake_capture):
+    screen.register_roi("test_roi", [0, 0, 10, 5])
+    try:
+        assert screen.grab_registered_rois(force_new=True)["test_roi"].shape == (5, 10, 3)
+    finally:
+        screen.unregister_roi("test_roi")
+    assert "test_roi" not in screen.grab_registered_rois(force_new=True)
+
+
+def test_frame_newer_than(fake_capture):
+    frame = screen.grab_frame(force_new=True)
+    assert screen.frame_newer_than(frame.frame_id) is None
+    assert screen.frame_newer_than(frame.frame_id - 1).frame_id == frame.frame_id
+
+
+def test_frame_producer(fake_capture):
+    screen.start_frame_producer()
+    try:
+        first = screen.wait_for_frame(timeout=1)
+        second = screen.wait_for_frame(first.frame_id, timeout=1)
+        assert second.frame_id > first.frame_id
+        assert second.age < 1
+    finally:
+        screen.stop_frame_producer()
+    assert not screen.frame_producer_running()
+
+
+def test_frame_derived_images_are_cached(fake_capture):
+    frame = screen.grab_frame(force_new=True)
+    region = frame.img[10:30, 20:60]
+    assert find_frame(region) == (frame, (20, 10, 40, 20))
+    assert find_frame(np.zeros((20, 40, 3), dtype=np.uint8)) is None
+    gray = cached_gray(region)
+    assert gray.shape == (20, 40)
+    assert cached_gray(region) is gray
+    hsv = cached_hsv(frame.img)
+    assert cached_hsv(frame.img) is hsv
+    # once the full frame is converted, regions are cropped from it
+    assert cached_hsv(region).base is hsv
+    assert not hsv.flags.writeable
@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 import pytest
 import template_finder
 from utils.misc import is_in_roi
@@ -58,6 +59,50 @@ def test_search_all_multiple_templates():
     matches = template_finder.search_all([empty, slash], image, threshold=0.98)
     assert len(matches) == 4
 
+def test_search_batch_keeps_template_order():
+    """
+    Test that searching many templates on the worker pool still returns the first match in the order of the list
+    """
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (200, 300, 3), dtype=np.uint8)
+    templates = [np.ascontiguousarray(image[y:y+20, x:x+20]) for x, y in [(10, 10), (100, 50), (200, 150)]]
+    noise = [rng.integers(0, 255, (20, 20, 3), dtype=np.uint8) for _ in range(6)]
+    match = template_finder.search([*noise, templates[1], templates[0]], image, threshold=0.9)
+    assert match.region == [100, 50, 20, 20]
+    match = template_finder.search([*noise, *templates], image, threshold=0.9, roi=[150, 100, 150, 100], use_grayscale=True)
+    assert match.region == [200, 150, 20, 20]
+    assert not template_finder.search(noise, image, threshold=0.9).valid
+
+def test_search_pyramid_matches_full_resolution():
+    """
+    Test that coarse to fine matching finds the same position and score as matching at full resolution
+    """
+    rng = np.random.default_rng(1)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), (0, 0), 3)
+    image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+    for x, y in [(17, 33), (400, 200), (580, 300)]:
+        template = np.ascontiguousarray(image[y:y+50, x:x+60])
+        full = template_finder.search(template, image, threshold=0.5, use_grayscale=True)
+        pyramid = template_finder.search(template, image, threshold=0.5, use_grayscale=True, use_pyramid=True)
+        assert pyramid.region == full.region == [x, y, 60, 50]
+        assert pyramid.score == pytest.approx(full.score, abs=1e-4)
+
+def test_search_all_single_pass():
+    """
+    Test that all instances are extracted from one response map, including max_results and cross template suppression
+    """
+    rng = np.random.default_rng(2)
+    image = rng.integers(0, 60, (200, 300, 3), dtype=np.uint8)
+    item = rng.integers(100, 255, (20, 20, 3), dtype=np.uint8)
+    for x, y in [(10, 10), (40, 10), (200, 150)]:
+        image[y:y+20, x:x+20] = item
+    assert sorted(m.region[:2] for m in template_finder.search_all(item, image, threshold=0.98)) == [[10, 10], [40, 10], [200, 150]]
+    assert len(template_finder.search_all(item, image, threshold=0.98, max_results=2)) == 2
+    # the cropped item matches at the same places, but overlaps the better full item matches
+    part = np.ascontiguousarray(item[2:18, 2:18])
+    assert len(template_finder.search_all([part, item], image, threshold=0.98)) == 3
+    assert len(template_finder.search_all([part, item], image, threshold=0.98, cross_template_suppression=False)) == 6
+
 if __name__ == "__main__":
     image = cv2.imread("test/assets/stash_slots.png")
     empty = cv2.imread("test/assets/stash_slot_empty.png")
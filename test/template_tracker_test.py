@@ -0,0 +1,26 @@
+import numpy as np
+import template_finder
+from template_finder import Template
+from template_tracker import TemplateTracker
+import screen
+
+screen.set_window_position(0, 0)
+
+
+def _image_with_item(item: np.ndarray, x: int, y: int) -> np.ndarray:
+    image = np.random.default_rng(3).integers(0, 60, (300, 400, 3), dtype=np.uint8)
+    image[y:y+20, x:x+20] = item
+    return image
+
+
+def test_tracker_prefers_last_position(mocker):
+    item = np.random.default_rng(4).integers(100, 255, (20, 20, 3), dtype=np.uint8)
+    mocker.patch.object(template_finder, "stored_templates", return_value={"ITEM": Template(name="ITEM", img_bgr=item, img_gray=item[:, :, 0].copy())})
+    tracker = TemplateTracker(margin=10)
+    assert tracker.search("item", _image_with_item(item, 50, 50), threshold=0.95).region[:2] == [50, 50]
+    assert tracker.search("item", _image_with_item(item, 55, 48), threshold=0.95).region[:2] == [55, 48]
+    assert tracker.search("item", _image_with_item(item, 155, 148), shift=(100, 100), threshold=0.95).region[:2] == [155, 148]
+    # too far off the predicted position, found by the full search
+    assert tracker.search("item", _image_with_item(item, 300, 20), threshold=0.95).region[:2] == [300, 20]
+    stats = tracker.stats[None]
+    assert (stats.untracked, stats.hits, stats.misses) == (1, 2, 1)
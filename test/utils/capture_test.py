@@ -0,0 +1,34 @@
+import numpy as np
+from utils.capture import SessionWriter, ReplayCapture, read_session
+
+
+def _frames(count: int) -> list[np.ndarray]:
+    frames = []
+    for i in range(count):
+        img = np.zeros((72, 128, 3), dtype=np.uint8)
+        img[i:i+10, 2*i:2*i+20] = (10*i, 255, 40)
+        frames.append(img)
+    return frames
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "session.rec")
+    frames = _frames(5)
+    writer = SessionWriter(path, keyframe_interval=3)
+    for i, img in enumerate(frames):
+        writer.write(img, 0.04 * i)
+    writer.close()
+
+    recorded = list(read_session(path))
+    assert [ts for ts, _ in recorded] == [0.04 * i for i in range(5)]
+    assert all(np.array_equal(img, frames[i]) for i, (_, img) in enumerate(recorded))
+
+    replay = ReplayCapture(path, realtime=False)
+    full = {"left": 0, "top": 0, "width": 128, "height": 72}
+    for img in frames:
+        assert np.array_equal(replay.grab(full), img)
+        # regions do not advance the replay
+        assert np.array_equal(replay.grab({"left": 4, "top": 2, "width": 30, "height": 12}), img[2:14, 4:34])
+    assert not replay.finished
+    replay.grab(full)
+    assert replay.finished
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+import pytest
+from utils.erode_benchmark import reference_erode_to_black
+from utils.misc import erode_to_black
+
+
+def _random_images():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        h, w = rng.integers(1, 60, 2)
+        # sparse bright pixels give many small regions, some touching the border only diagonally
+        yield rng.integers(0, 30, (h, w, 3), dtype=np.uint8) * rng.integers(1, 3, (h, w, 1), dtype=np.uint8)
+    for _ in range(3):
+        yield cv2.GaussianBlur(rng.integers(0, 60, (360, 640, 3), dtype=np.uint8), (5, 5), 0)
+
+
+@pytest.mark.parametrize("img", list(_random_images()), ids=lambda img: "x".join(map(str, img.shape[:2])))
+def test_erode_to_black_matches_reconstruction(img):
+    assert np.array_equal(erode_to_black(img), reference_erode_to_black(img))
+
+
+def test_erode_to_black_label():
+    img = np.zeros((30, 100, 3), dtype=np.uint8)
+    # label text inside a dark box, clutter at the edges
+    cv2.putText(img, "SHAKO", (20, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    img[:, :8] = 200
+    img[25:, 60:] = 90
+    res = erode_to_black(img, 14)
+    assert not res[:, :8].any() and not res[25:, 60:].any()
+    assert np.array_equal(res[5:24, 15:70], img[5:24, 15:70])
+    assert img[:, :8].all()
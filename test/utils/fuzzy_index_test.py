@@ -0,0 +1,20 @@
+from utils.fuzzy_index import FuzzyIndex
+from utils.misc import find_best_match
+
+WORDS = ["SUPERIOR", "(SUPERIOR", "ZWEIHANDER", "PERFECT", "RUBY", "RUNE", "BOW", "RUNE BOW", "JAH", "QUHAB", "A"]
+
+
+def test_fuzzy_index_same_as_scan(tmp_path):
+    path = str(tmp_path / "words.index.json")
+    FuzzyIndex.open(path, WORDS)
+    # second open loads the persisted index
+    index = FuzzyIndex.open(path, WORDS)
+    for query in ["SUPERIER", "superior", "ZWEIHANDRE", "RUBV", "RUNE BONG", "JAR", "QU AB", "XXXXXXXXXX", "", "'"]:
+        assert index.best_match(query) == find_best_match(query, WORDS), query
+
+
+def test_fuzzy_index_rebuilds_for_other_words(tmp_path):
+    path = str(tmp_path / "words.index.json")
+    FuzzyIndex.open(path, WORDS)
+    index = FuzzyIndex.open(path, WORDS + ["SUPERIER"])
+    assert index.best_match("SUPERIER").score == 0
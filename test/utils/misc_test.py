@@ -1,6 +1,8 @@
+import cv2
+import numpy as np
 import pytest
 from logger import Logger
-from utils.misc import load_template
+from utils.misc import color_classes, color_filter, color_mask, load_template
 import utils.download_test_assets # downloads assets if they don't already exist, doesn't need to be called
 
 class TestUtilsMisc:
@@ -16,3 +18,25 @@ class TestUtilsMisc:
         template_img = load_template(path)
         success = template_img is not None
         assert(success == should_be_success)
+
+
+    @pytest.mark.parametrize("color_range", [
+        [np.array([20, 75, 140]), np.array([26, 95, 230])],
+        # hue wraps around below 0 and above 180
+        [np.array([-9, 100, 25]), np.array([9, 255, 255])],
+        [np.array([170, 110, 20]), np.array([188, 255, 255])],
+    ])
+    def test_color_mask(self, color_range):
+        img = np.random.default_rng(0).integers(0, 256, (64, 256, 3), dtype=np.uint8)
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV).astype(int)
+        lower, upper = color_range
+        hue = hsv[..., 0]
+        if lower[0] < 0 or upper[0] > 180:
+            in_hue = (hue >= lower[0] % 180) | (hue <= upper[0] % 180)
+        else:
+            in_hue = (hue >= lower[0]) & (hue <= upper[0])
+        expected = in_hue & np.all((hsv[..., 1:] >= lower[1:]) & (hsv[..., 1:] <= upper[1:]), axis=2)
+        mask = color_mask(img, color_range)
+        assert np.array_equal(mask > 0, expected)
+        assert np.array_equal(color_filter(img, color_range)[0], mask)
+        assert np.array_equal(color_classes(img, [color_range, color_range]), np.where(expected, 3, 0))
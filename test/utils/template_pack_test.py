@@ -0,0 +1,42 @@
+import os
+import cv2
+import numpy as np
+from utils.template_pack import TemplatePack, template_variants, write_pack
+
+
+def test_template_pack(tmp_path):
+    os.makedirs(tmp_path / "assets" / "templates")
+    img = np.full((12, 20, 4), 200, dtype=np.uint8)
+    img[:3, :3, 3] = 0
+    cv2.imwrite(str(tmp_path / "assets" / "templates" / "some_template.png"), img)
+    cv2.imwrite(str(tmp_path / "assets" / "templates" / "other.png"), np.full((5, 5, 4), 255, dtype=np.uint8))
+    pack_path = str(tmp_path / "templates.pack")
+    assert write_pack(pack_path, ["assets/templates"], root=str(tmp_path)) == 2
+
+    pack = TemplatePack(pack_path)
+    assert set(pack) == {"SOME_TEMPLATE", "OTHER"}
+    assert pack.is_current(["assets/templates"], root=str(tmp_path))
+    expected = template_variants(img)
+    for name, arr in pack["SOME_TEMPLATE"].items():
+        assert np.array_equal(arr, expected[name])
+    assert pack["OTHER"]["alpha_mask"] is None
+
+    cv2.imwrite(str(tmp_path / "assets" / "templates" / "new.png"), img)
+    assert not pack.is_current(["assets/templates"], root=str(tmp_path))
+
+
+def test_template_pack_ignores_mtime_only_changes(tmp_path):
+    os.makedirs(tmp_path / "assets" / "templates")
+    file_path = tmp_path / "assets" / "templates" / "some_template.png"
+    cv2.imwrite(str(file_path), np.full((5, 5, 4), 255, dtype=np.uint8))
+    pack_path = str(tmp_path / "templates.pack")
+    write_pack(pack_path, ["assets/templates"], root=str(tmp_path))
+    # e.g. unzipped release
+    os.utime(file_path, (1000000000, 1000000000))
+    assert TemplatePack(pack_path).is_current(["assets/templates"], root=str(tmp_path))
+    # same size, different content
+    data = bytearray(file_path.read_bytes())
+    data[-20] ^= 0xFF
+    file_path.write_bytes(bytes(data))
+    os.utime(file_path, (1000000000, 1000000000))
+    assert not TemplatePack(pack_path).is_current(["assets/templates"], root=str(tmp_path))